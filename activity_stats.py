@@ -0,0 +1,93 @@
+import argparse
+import os
+import sqlite3
+from datetime import date, timedelta
+
+import db_manager as dbm
+
+# post_daily_stats 는 db_manager.ensure_activity_stats 의 트리거가 유지한다.
+# 여기서는 그 집계만 읽으므로 글 수와 관계없이 블로그별 일 수만큼만 읽는다.
+
+
+def _has_table(conn, name: str) -> bool:
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,)).fetchone() is not None
+
+
+def load_daily(paths: list[str] | None = None) -> list[tuple[str, str, int, int]]:
+    # [(blog_name, date, posts, chars)] — 모든 posts_*.db 의 일별 집계
+    out = []
+    for path in paths if paths is not None else dbm.list_post_db_paths():
+        conn = sqlite3.connect(path, check_same_thread=False)
+        try:
+            if not _has_table(conn, "posts"):
+                continue
+            if not _has_table(conn, "post_daily_stats"):
+                # 트리거가 설치되기 전에 만들어진 DB: 한 번 설치하면서 채운다
+                dbm.ensure_activity_stats(conn)
+            out.extend(conn.execute("SELECT blog_name, date, posts, chars FROM post_daily_stats").fetchall())
+        finally:
+            conn.close()
+    return out
+
+
+def blog_totals(daily) -> list[dict]:
+    totals: dict[str, dict] = {}
+    for blog_name, d, posts, chars in daily:
+        t = totals.setdefault(blog_name, {"blog_name": blog_name, "posts": 0, "chars": 0,
+                                          "first_date": d, "last_date": d})
+        t["posts"] += posts
+        t["chars"] += chars
+        t["first_date"] = min(t["first_date"], d)
+        t["last_date"] = max(t["last_date"], d)
+    for t in totals.values():
+        t["avg_chars"] = t["chars"] // t["posts"] if t["posts"] else 0
+    return sorted(totals.values(), key=lambda t: t["last_date"], reverse=True)
+
+
+def weekly_posts(daily, weeks: int = 26, today: date | None = None) -> dict[str, dict[str, int]]:
+    # {주 시작일(월요일): {blog_name: 글 수}} — 최근 weeks 주, 글이 없는 주도 0 으로 채운다
+    today = today or date.today()
+    this_monday = today - timedelta(days=today.weekday())
+    first = this_monday - timedelta(weeks=weeks - 1)
+    names = sorted({r[0] for r in daily})
+    out = {(first + timedelta(weeks=i)).isoformat(): dict.fromkeys(names, 0) for i in range(weeks)}
+    for blog_name, d, posts, _chars in daily:
+        try:
+            day = date.fromisoformat(d)
+        except ValueError:
+            continue
+        if day < first:
+            continue
+        monday = (day - timedelta(days=day.weekday())).isoformat()
+        if monday in out:
+            out[monday][blog_name] += posts
+    return out
+
+
+def rebuild(paths: list[str] | None = None) -> dict[str, int]:
+    # 트리거 설치 + 기존 글로 집계를 다시 만든다. {path: 글 수}
+    result = {}
+    for path in paths if paths is not None else dbm.list_post_db_paths():
+        conn = sqlite3.connect(path, check_same_thread=False)
+        try:
+            if not _has_table(conn, "posts"):
+                continue
+            dbm.ensure_activity_stats(conn)
+            conn.executescript(f"BEGIN;{dbm.REBUILD_ACTIVITY_STATS_SQL}COMMIT;")
+            result[path] = conn.execute("SELECT COALESCE(SUM(posts), 0) FROM post_daily_stats").fetchone()[0]
+        finally:
+            conn.close()
+        dbm.bump_write_generation(path)
+    return result
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Rebuild the per-blog daily activity aggregates in posts_*.db")
+    ap.add_argument("paths", nargs="*", help="posts_*.db files (default: all in the current directory)")
+    args = ap.parse_args(argv)
+    for path, n in rebuild([os.path.abspath(p) for p in args.paths] or None).items():
+        print(f"{os.path.basename(path)}: {n} posts")
+
+
+if __name__ == "__main__":
+    main()
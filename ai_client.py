@@ -0,0 +1,120 @@
+import threading
+import time
+from typing import Callable, Iterator
+
+# 앞에서부터 시도하고 실패하면 다음 모델로 넘어간다
+GEMINI_MODELS = [
+    "models/gemini-flash-latest",
+    "models/gemini-2.5-flash",
+    "models/gemini-pro-latest",
+]
+
+SAMPLE_ANSWER = """### [핵심 논거]
+- 저자는 **금리 인하 기대**와 **달러 약세**를 현재 시장 현상의 근본 원인으로 봅니다.
+
+---
+
+### [인과 관계]
+- 유동성 확대가 위험자산 선호로 이어지고, 수출 기업의 환차익이 줄어듭니다.
+
+---
+
+### [투자 인사이트]
+- 성장주와 원자재 섹터에 주목하되, 환율 민감 업종의 실적 변동성에 유의해야 합니다.
+
+---
+
+### 결론
+- 금리 사이클 전환 초입
+- 유동성 수혜 자산 선별
+- 환율 리스크 관리
+"""
+
+
+# genai 는 import 만 1초 가까이 걸리므로 처음 분석할 때 한 번만 불러와 설정하고,
+# 모델 객체도 (이름, 키) 별로 만들어 둔 것을 재사용한다.
+_clients: dict[tuple[str, str], object] = {}
+_clients_lock = threading.Lock()
+_configured_key = None
+
+
+def _client(name: str, api_key: str):
+    global _configured_key
+    with _clients_lock:
+        m = _clients.get((name, api_key))
+        if m is None:
+            import google.generativeai as genai
+            if _configured_key != api_key:
+                genai.configure(api_key=api_key)
+                _configured_key = api_key
+            m = _clients[(name, api_key)] = genai.GenerativeModel(name)
+        return m
+
+
+class GeminiModel:
+    def __init__(self, name: str, api_key: str):
+        self.name = name
+        self.api_key = api_key
+
+    def stream(self, parts: list[str]) -> Iterator[str]:
+        resp = _client(self.name, self.api_key).generate_content(parts, stream=True)
+        for chunk in resp:
+            try:
+                text = chunk.text
+            except Exception:
+                # 안전 필터 등으로 text 가 없는 청크
+                text = ""
+            if text:
+                yield text
+
+
+class FakeModel:
+    # 네트워크 없이 스트리밍 경로를 돌려 보기 위한 모델 (벤치마크/로컬 확인용)
+    def __init__(self, name: str = "fake", text: str = SAMPLE_ANSWER, first_token_delay: float = 0.8,
+                 chunk_chars: int = 24, chunk_delay: float = 0.04, fail: bool = False):
+        self.name = name
+        self.text = text
+        self.first_token_delay = first_token_delay
+        self.chunk_chars = chunk_chars
+        self.chunk_delay = chunk_delay
+        self.fail = fail
+
+    def stream(self, parts: list[str]) -> Iterator[str]:
+        time.sleep(self.first_token_delay)
+        if self.fail:
+            raise RuntimeError(f"{self.name} unavailable")
+        for i in range(0, len(self.text), self.chunk_chars):
+            if i:
+                time.sleep(self.chunk_delay)
+            yield self.text[i:i + self.chunk_chars]
+
+
+def gemini_models(api_key: str, names: list[str] | None = None) -> list[GeminiModel]:
+    return [GeminiModel(n, api_key) for n in (names or GEMINI_MODELS)]
+
+
+def build_parts(system_prompt: str, context_text: str, question: str) -> list[str]:
+    return [system_prompt, f"Context:\n{context_text}", f"Question:\n{question}"]
+
+
+def stream_with_fallback(models, parts: list[str], on_model: Callable[[str], None] | None = None) -> Iterator[str]:
+    # 첫 청크가 나오기 전에 실패하면 다음 모델로 넘어간다.
+    # 이미 일부를 내보낸 뒤의 오류는 이어 붙일 수 없으므로 그대로 올린다.
+    last_err = None
+    for m in models:
+        started = False
+        try:
+            for text in m.stream(parts):
+                if not started:
+                    started = True
+                    if on_model:
+                        on_model(m.name)
+                yield text
+            if started:
+                return
+        except Exception as e:
+            if started:
+                raise
+            last_err = e
+    if last_err is not None:
+        raise last_err
@@ -1,13 +1,23 @@
 import streamlit as st
-import sqlite3
-import pandas as pd
 from datetime import date, timedelta, datetime
 from urllib.parse import urlparse
-from scraper import collect_blog_posts
 import db_manager as dbm
+import storage
+import bm25_index
+import llm_cache
+import ai_client
+import model_router
+import map_reduce
+import enrichment
+import indexing
+import activity_stats
+import query_cache
+import work_queue
+import crawl_log
 from typing import Optional, List, Dict
 from textwrap import shorten
 import os
+import time
 
 try:
     from dotenv import load_dotenv
@@ -31,36 +41,10 @@ except Exception:
             pass
 
 
-def get_conn():
-    return sqlite3.connect("data.db", check_same_thread=False)
-
-
-def ensure_db():
-    conn = get_conn()
-    cur = conn.cursor()
-    cur.execute(
-        """
-        CREATE TABLE IF NOT EXISTS blogs (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT NOT NULL,
-            url TEXT NOT NULL UNIQUE,
-            created_at TEXT NOT NULL
-        )
-        """
-    )
-    conn.commit()
-    conn.close()
-
-
-def load_blogs():
-    conn = get_conn()
-    try:
-        df = pd.read_sql_query(
-            "SELECT id, name, url FROM blogs ORDER BY id DESC", conn
-        )
-    finally:
-        conn.close()
-    st.session_state["blogs"] = df.to_dict("records") if not df.empty else []
+# AI 컨텍스트에 넣을 검색 결과의 토큰 예산
+AI_CONTEXT_TOKENS = 6000
+# 사이드바 수집 로그에 그리는 최대 줄 수
+LOG_TAIL = 200
 
 
 def is_valid_blog_url(u: str) -> bool:
@@ -76,31 +60,6 @@ def is_valid_blog_url(u: str) -> bool:
     return True
 
 
-def add_blog(name: str, url: str):
-    name = (name or "").strip()
-    url = (url or "").strip()
-    if not name:
-        st.sidebar.error("블로그 이름을 입력하세요")
-        return
-    if not is_valid_blog_url(url):
-        st.sidebar.error("유효한 네이버 블로그 URL을 입력하세요")
-        return
-    conn = get_conn()
-    try:
-        cur = conn.cursor()
-        cur.execute(
-            "INSERT INTO blogs(name, url, created_at) VALUES (?, ?, ?)",
-            (name, url, datetime.utcnow().isoformat()),
-        )
-        conn.commit()
-        st.sidebar.success("블로그가 추가되었습니다")
-        load_blogs()
-    except sqlite3.IntegrityError:
-        st.sidebar.warning("이미 등록된 블로그입니다")
-    finally:
-        conn.close()
-
-
 def init_state():
     if "api_provider" not in st.session_state:
         st.session_state["api_provider"] = "OpenAI"
@@ -132,9 +91,20 @@ def init_state():
 
 
 st.set_page_config(page_title="블로그 AI 분석기", layout="wide")
-dbm.ensure_blogs_table()
+
+
+@st.cache_resource
+def init_store():
+    # 스키마 확인과 훅 등록은 프로세스당 한 번만 (재실행마다 반복하지 않는다)
+    store = storage.get_storage()
+    store.ensure_schema()
+    dbm.register_post_commit_hook(indexing.index_new_posts)
+    return store
+
+
+store = init_store()
 init_state()
-st.session_state["blogs"] = dbm.load_blogs()
+st.session_state["blogs"] = store.load_blogs()
 
 
 with st.sidebar:
@@ -152,10 +122,10 @@ with st.sidebar:
             st.session_state["last_add_error"] = "입력 값을 확인하세요"
         else:
             try:
-                dbm.add_blog(name, url, datetime.utcnow().isoformat())
-                st.session_state["blogs"] = dbm.load_blogs()
+                store.add_blog(name, url, datetime.utcnow().isoformat())
+                st.session_state["blogs"] = store.load_blogs()
                 st.session_state["last_add_success"] = "블로그가 추가되었습니다"
-            except sqlite3.IntegrityError:
+            except storage.DuplicateBlogError:
                 st.session_state["last_add_warning"] = "이미 등록된 블로그입니다"
         st.session_state["blog_name_input"] = ""
         st.session_state["blog_url_input"] = ""
@@ -175,6 +145,7 @@ with st.sidebar:
     
     selected_targets = []
     if st.session_state["blogs"]:
+        import pandas as pd
         _df = pd.DataFrame(st.session_state["blogs"])
         target_data = _df[["name", "url"]].copy()
         target_data.insert(0, "선택", False)
@@ -212,76 +183,147 @@ with st.sidebar:
         if st.button("수집중단", use_container_width=True):
             st.session_state["cancel_scrape"] = True
 
+    st.checkbox("작업 큐로 보내기", key="use_work_queue",
+                help="이 프로세스에서 수집하지 않고 작업 큐에 넣습니다. `python work_queue.py worker` 로 실행한 워커들이 나눠서 수집합니다.")
+    if st.session_state.get("use_work_queue"):
+        qs = work_queue.queue_stats()
+        if qs["jobs"] or qs["tasks"]:
+            st.caption("작업 " + ", ".join(f"{k} {v}" for k, v in qs["jobs"].items())
+                       + " · 글 " + ", ".join(f"{k} {v}" for k, v in qs["tasks"].items()))
+
+    st.number_input("시간 예산 (분, 0 = 제한 없음)", min_value=0, step=10, key="crawl_budget_min",
+                    help="예산 안에 끝낼 수 있는 만큼만 우선순위대로 수집합니다")
+    st.radio("우선순위", ["최근 글 먼저", "블로그별 고르게"], key="crawl_priority", horizontal=True)
+
+    targets = []
+    if selected_targets:
+        targets = selected_targets
+    elif st.session_state.get("selected_blog_id"):
+         sel = [b for b in st.session_state["blogs"] if b["id"] == st.session_state["selected_blog_id"]]
+         if sel:
+             targets = sel
+    crawl_budget = (st.session_state.get("crawl_budget_min") or 0) * 60 or None
+    crawl_priority = "balanced" if st.session_state.get("crawl_priority") == "블로그별 고르게" else "recent"
+    # 대상/기간/예산/우선순위가 같을 때만 미리 세운 계획을 재사용한다
+    plan_key = (tuple(b["url"] for b in targets), tuple(st.session_state["date_range"]), crawl_budget, crawl_priority)
+
+    def plan_summary(p) -> str:
+        from crawl_planner import format_duration
+        lines = [f"새 글 {p['new']}개 · 예상 {format_duration(p['est_seconds'])}"]
+        if p["coverage"] < 1:
+            oldest = f" ({p['oldest_selected'].isoformat()} 이후)" if p["oldest_selected"] else ""
+            lines.append(f"예산 안에서 {len(p['tasks'])}/{p['new']}개 ({p['coverage']:.0%}){oldest} · "
+                         f"전체는 {format_duration(p['full_seconds'])}")
+        for b in p["blogs"]:
+            lines.append(f"- {b['name']}: 발견 {b['found']}, 저장됨 {b['known']}, 수집 {b['selected']}/{b['new']}")
+        return "  \n".join(lines)
+
+    if st.button("예상 시간 보기", use_container_width=True, disabled=bool(st.session_state.get("use_work_queue"))):
+        if not targets:
+            st.sidebar.error("수집할 블로그를 선택하세요")
+        else:
+            import crawl_planner
+            start_date, end_date = st.session_state["date_range"]
+            with st.spinner("글 목록 확인 중..."):
+                st.session_state["crawl_plan"] = (plan_key, crawl_planner.plan(
+                    targets, start_date, end_date, crawl_budget, crawl_priority))
+    saved_plan = st.session_state.get("crawl_plan")
+    if saved_plan and saved_plan[0] == plan_key:
+        st.caption(plan_summary(saved_plan[1]))
+
     if st.button("데이터 수집 시작", use_container_width=True):
-        targets = []
-        if selected_targets:
-            targets = selected_targets
-        elif st.session_state.get("selected_blog_id"):
-             sel = [b for b in st.session_state["blogs"] if b["id"] == st.session_state["selected_blog_id"]]
-             if sel:
-                 targets = sel
-        
         if not targets:
              st.sidebar.error("수집할 블로그를 선택하세요")
+        elif st.session_state.get("use_work_queue"):
+             start_date, end_date = st.session_state["date_range"]
+             for blog in targets:
+                 work_queue.enqueue_job(blog["name"], blog["url"], start_date, end_date)
+             st.sidebar.success(f"{len(targets)}개 블로그를 작업 큐에 넣었습니다")
         else:
              start_date, end_date = st.session_state["date_range"]
-             st.session_state["scrape_logs"] = []
+             # 레벨별 ring buffer: 수집이 길어져도 세션에 남는 로그 양이 일정하다
+             crawl_events = st.session_state["crawl_log"] = crawl_log.CrawlLog()
              st.session_state["cancel_scrape"] = False
              st.session_state["scraping"] = True
-             
-             total_saved = 0
-             total_found = 0
-             
+             # requests/BeautifulSoup 는 수집할 때만 불러온다
+             import crawl_planner
+             import http_transport
+
              with st.status("데이터 수집 중...", expanded=True) as status:
-                 for blog in targets:
-                     if st.session_state.get("cancel_scrape", False):
-                         status.write("⛔ 수집이 중단되었습니다.")
-                         break
-                     
-                     current_msg = status.empty()
-                     prog_bar = status.empty()
-                     current_msg.write(f"**[{blog['name']}]** 준비 중...")
-                     
-                     def cb(p):
-                         prog_bar.progress(p)
-
-                     def log_cb(msg):
-                         msg_str = str(msg)
-                         st.session_state["scrape_logs"].append(f"[{blog['name']}] {msg_str}")
-                         
-                         if msg_str.startswith("Title: "):
-                             t = msg_str.replace("Title: ", "").strip()
-                             current_msg.markdown(f"**[{blog['name']}]**\n📄 {t}")
-                         elif msg_str.startswith("Processing"):
-                             current_msg.markdown(f"**[{blog['name']}]**\n⏳ {msg_str}")
-                         elif msg_str.startswith("Found"):
-                             status.markdown(f"🔍 {msg_str}")
-                         elif "error" in msg_str.lower() or "fatal" in msg_str.lower():
-                             status.markdown(f"⚠️ {msg_str}")
-
-                     def should_stop():
-                         return bool(st.session_state.get("cancel_scrape", False))
-
-                     res = collect_blog_posts(blog["name"], blog["url"], start_date, end_date, cb, log_cb, should_stop)
-                     prog_bar.empty()
-                     
-                     saved = res.get("saved", 0)
-                     found = res.get("total", 0)
-                     duplicates = res.get("duplicates", 0)
-                     
-                     total_saved += saved
-                     total_found += found
-                     
-                     current_msg.empty()
-                     status.write(f"✅ **{blog['name']}**: 총 {found}개 발견, {saved}개 저장 ({duplicates}개 중복 스킵)")
-
-                 if not st.session_state.get("cancel_scrape", False):
-                     status.update(label="수집 완료!", state="complete", expanded=False)
-                 else:
+                 current_msg = status.empty()
+                 prog_bar = status.empty()
+
+                 def log_cb(name, msg):
+                     msg_str = str(msg)
+                     crawl_events.add(name, msg_str)
+
+                     if msg_str.startswith("Title: "):
+                         t = msg_str.replace("Title: ", "").strip()
+                         current_msg.markdown(f"**[{name}]**\n📄 {t}")
+                     elif msg_str.startswith("Processing"):
+                         current_msg.markdown(f"**[{name}]**\n⏳ {msg_str}")
+                     elif msg_str.startswith("Found"):
+                         status.markdown(f"🔍 **[{name}]** {msg_str}")
+                     elif "error" in msg_str.lower() or "fatal" in msg_str.lower():
+                         status.markdown(f"⚠️ {msg_str}")
+
+                 def should_stop():
+                     return bool(st.session_state.get("cancel_scrape", False))
+
+                 def on_progress(frac, eta_seconds):
+                     prog_bar.progress(frac, text=f"{frac:.0%} · 남은 시간 약 {crawl_planner.format_duration(eta_seconds)}")
+
+                 try:
+                     if saved_plan and saved_plan[0] == plan_key:
+                         crawl_plan = saved_plan[1]
+                     else:
+                         current_msg.write("글 목록 확인 중...")
+                         crawl_plan = crawl_planner.plan(targets, start_date, end_date, crawl_budget, crawl_priority,
+                                                         log_cb=log_cb)
+                     # 실행한 계획은 다시 쓰지 않는다 (저장된 글이 바뀜)
+                     st.session_state.pop("crawl_plan", None)
+                     status.markdown(plan_summary(crawl_plan))
+                     res = crawl_planner.execute(crawl_plan, on_progress, log_cb, should_stop)
+                 finally:
+                     # 예외나 재실행(수집중단)으로 빠져나가도 로그를 쓰고 수집 상태를 푼다
+                     crawl_events.close()
+                     st.session_state["scraping"] = False
+                 prog_bar.empty()
+                 current_msg.empty()
+
+                 for name, r in res["blogs"].items():
+                     skipped = r["known"] + r["duplicates"]
+                     status.write(f"✅ **{name}**: 총 {r['found']}개 발견, {r['saved']}개 저장 ({skipped}개 중복 스킵)")
+                 if res["cancelled"]:
+                     status.write("⛔ 수집이 중단되었습니다.")
                      status.update(label="수집 중단됨", state="error", expanded=False)
-                
+                 else:
+                     status.update(label="수집 완료!", state="complete", expanded=False)
+
+             net = http_transport.get_transport().stats()
+             st.sidebar.caption(f"요청 {net['requests']}회 · 새 연결 {net['connections']}개 "
+                                f"(재사용 {net['reuse_rate']:.0%}, {'HTTP/2' if net['http2'] else 'HTTP/1.1'}) · "
+                                f"받은 양 {net['bytes_read'] / 1024:,.0f}KB, 본문 뒤에서 끊음 {net['cutoffs']}회"
+                                + (f" ({net['bytes_saved'] / 1024:,.0f}KB 절약)" if net['bytes_saved'] else ""))
+             total_found = sum(r["found"] for r in res["blogs"].values())
+             total_saved = sum(r["saved"] for r in res["blogs"].values())
              st.sidebar.success(f"총 {total_found}개 중 {total_saved}개 저장 완료")
-             st.session_state["scraping"] = False
+
+    if st.button("수정된 글 다시 확인", use_container_width=True,
+                 help="저장한 글 중 오래 확인하지 않은 글을 다시 받아 바뀐 글만 갱신합니다 (블로그당 최대 30개)"):
+        if not targets:
+            st.sidebar.error("확인할 블로그를 선택하세요")
+        elif not isinstance(store, storage.SqliteStorage):
+            st.sidebar.error("SQLite 저장소에서만 지원합니다")
+        else:
+            import revalidate
+            with st.status("수정된 글 확인 중...", expanded=True) as status:
+                for blog in targets:
+                    rv = revalidate.revalidate_blog(
+                        blog["url"], should_stop_cb=lambda: bool(st.session_state.get("cancel_scrape", False)))
+                    status.write(f"🔁 **{blog['name']}**: {rv['checked']}개 확인, {rv['changed']}개 갱신"
+                                 f" (변경 없음 {rv['unchanged'] + rv['not_modified']}, 실패 {rv['failed']})")
+                status.update(label="확인 완료", state="complete", expanded=False)
 
 
 st.title("블로그 AI 분석기")
@@ -323,7 +365,51 @@ def style_header(text, bg_color="#f0f2f6", text_color="#31333f"):
     return f"""<span style='background-color: {bg_color}; color: {text_color}; padding: 4px 10px; border-radius: 5px; font-weight: bold; font-size: 1.05em;'>{text}</span>"""
 
 
-tab1, tab2 = st.tabs(["AI 분석 및 대화", "수집 데이터 조회"])
+def render_section(part):
+    # 예상되는 구조: ### [핵심 논거] ... --- ### [인과 관계] ... --- ### [투자 인사이트] ... --- ### 결론 ...
+    # 투자 인사이트 강조
+    if "### [투자 인사이트]" in part:
+        content = part.replace("### [투자 인사이트]", "").strip()
+        st.warning(f"### 💰 [투자 인사이트]\n\n{content}", icon="💰")
+    else:
+        # 헤더 스타일링
+        if "### [핵심 논거]" in part:
+            new_header = style_header("🎯 [핵심 논거]", "#e8f0fe", "#174ea6")
+            part = part.replace("### [핵심 논거]", new_header)
+            st.markdown(part, unsafe_allow_html=True)
+        elif "### [인과 관계]" in part:
+            new_header = style_header("🔗 [인과 관계]", "#e6f4ea", "#137333")
+            part = part.replace("### [인과 관계]", new_header)
+            st.markdown(part, unsafe_allow_html=True)
+        elif "### 결론" in part:
+            new_header = style_header("📝 결론", "#f1f3f4", "#202124")
+            part = part.replace("### 결론", new_header)
+            st.markdown(part, unsafe_allow_html=True)
+        else:
+            st.markdown(part)
+
+    st.write("") # 간격
+
+
+def render_answer(raw_ans, area, slots):
+    # '---' 로 나눈 섹션마다 자리를 하나씩 두고, 내용이 바뀐 섹션만 다시 그린다.
+    # 스트리밍 중에는 마지막 섹션만 계속 바뀌고, 앞 섹션은 한 번 그려진 뒤 그대로 남는다.
+    for i, part in enumerate(raw_ans.split("---")):
+        part = part.strip()
+        if i == len(slots):
+            slots.append([area.empty(), None])
+        slot = slots[i]
+        if slot[1] == part:
+            continue
+        slot[1] = part
+        if part:
+            with slot[0].container():
+                render_section(part)
+        else:
+            slot[0].empty()
+
+
+tab1, tab2, tab3, tab4 = st.tabs(["AI 분석 및 대화", "수집 데이터 조회", "활동 현황", "키워드 추이"])
 
 with tab1:
     # UX 개선: 가로 폭 제한 및 중앙 정렬
@@ -333,6 +419,13 @@ with tab1:
         st.header("AI 분석 및 대화")
         st.session_state.setdefault("ai_question", "")
         st.session_state["ai_question"] = st.text_area("AI 질문", value=st.session_state.get("ai_question", ""), height=120)
+        st.radio(
+            "분석 범위",
+            ["관련 글", "요약", "기간 전체"],
+            key="ai_mode",
+            horizontal=True,
+            help="요약: 미리 만들어 둔 글 요약으로 분석합니다 · 기간 전체: 기간 안의 모든 글을 요약한 뒤 통합해서 분석합니다 (처음 한 번은 오래 걸립니다)",
+        )
         
         def start_analysis():
             st.session_state["analyzing"] = True
@@ -357,16 +450,55 @@ with tab1:
                         sel_url = sel_list[0]["url"]
                 
                 start_date, end_date = st.session_state["date_range"]
-                posts_for_ai = dbm.query_posts_for_blog(sel_url, start_date, end_date, "")
+                question = st.session_state.get("ai_question", "")
+                if sel_url and st.session_state.get("ai_mode") == "기간 전체":
+                    # 글마다 요약(map)을 병렬로 만들고 예산 안에 들어올 때까지 통합(reduce)한다
+                    progress = st.progress(0.0, text="글 요약 준비 중...")
+
+                    def on_progress(stage, done, total):
+                        label = "글 요약" if stage == "map" else "요약 통합"
+                        progress.progress(done / total, text=f"{label} {done}/{total}")
+
+                    try:
+                        mr = map_reduce.build_context(
+                            store.iter_posts_for_blog(sel_url, start_date, end_date, ""),
+                            question, api_key=api_key, token_budget=AI_CONTEXT_TOKENS, on_progress=on_progress,
+                            summary_for=enrichment.summary_lookup(sel_url, start_date, end_date)
+                            if isinstance(store, storage.SqliteStorage) else None,
+                        )
+                        context_text = mr["context"]
+                        st.caption(f"글 {mr['units']}개 요약 (재사용 {mr['cached']}, 실패 {mr['failed']}) · 통합 {mr['levels']}단계")
+                    except Exception as e:
+                        st.error(f"요약 중 오류: {e}")
+                        context_text = ""
+                    progress.empty()
+                elif sel_url and st.session_state.get("ai_mode") == "요약" and isinstance(store, storage.SqliteStorage):
+                    # 원문 대신 수집 시 만들어 둔 글 요약으로 컨텍스트를 채운다 (요약이 없는 글은 관련 청크/본문 앞부분)
+                    enrichment.enrich_blog(sel_url)
+                    ec = enrichment.build_context(sel_url, question, start_date, end_date, AI_CONTEXT_TOKENS)
+                    context_text = ec["context"]
+                    st.caption(f"글 {ec['posts']}개 (요약 {ec['summarized']}개, 원문 {ec['posts'] - ec['summarized']}개) · 약 {ec['tokens']:,} 토큰")
+                elif sel_url and isinstance(store, storage.SqliteStorage):
+                    import near_dup
+                    # 질문과 관련된 청크를 BM25로 골라 토큰 예산 안에서 채운다
+                    context_text = bm25_index.build_context(
+                        sel_url, question, start_date, end_date, AI_CONTEXT_TOKENS,
+                        exclude_post_ids=near_dup.duplicate_post_ids(sel_url),
+                    )["context"]
+                else:
+                    # 커서에서 청크 단위로 읽다가 컨텍스트 한도에 도달하면 중단
+                    ctx_parts = []
+                    ctx_len = 0
+                    for r in store.iter_posts_for_blog(sel_url, start_date, end_date, ""):
+                        ctx_parts.append(str(r.content or ""))
+                        ctx_len += len(ctx_parts[-1]) + 2
+                        if ctx_len >= 8000:
+                            break
+                    context_text = "\n\n".join(ctx_parts)[:8000]
                 
-                if not posts_for_ai:
+                if not context_text.strip():
                     st.info("관련된 글이 없습니다.")
                 else:
-                    ctx_parts = []
-                    for r in posts_for_ai:
-                        ctx_parts.append(str(r.get("content", "")))
-                    context_text = "\n\n".join(ctx_parts)
-                    context_text = context_text[:8000]
                     system_prompt = """당신은 매크로 경제 및 산업 사이클을 분석하는 수석 투자 전략가입니다. 
 제공된 블로그 글들은 단순 종목 추천이 아니라, 시장 현상의 근본 원인을 파헤치는 글들입니다. 
 블로그 글에서 언급된 '현상'과 '원인'을 분리하고, 그 원인이 향후 어떤 산업이나 자산군에 영향을 미칠지 논리적으로 연결해야 합니다. 
@@ -396,80 +528,59 @@ with tab1:
    - 저자의 뷰를 바탕으로 한 투자 아이디어 3줄 요약
 
 답변은 전문적이고 통찰력 있게 작성하되, 블로그 내용을 벗어난 없는 사실을 지어내지 마세요."""
-                    question = st.session_state.get("ai_question", "")
-                    with st.spinner("AI 분석 중..."):
-                        ans = None
-                        try:
+                    ans = None
+                    st.session_state["ai_answer_cached"] = False
+                    cache = llm_cache.get_cache()
+                    key = llm_cache.cache_key("|".join(ai_client.GEMINI_MODELS), system_prompt, context_text, question)
+                    try:
+                        ans = cache.get(key)
+                        if ans is not None:
+                            st.session_state["ai_answer_cached"] = True
+                        else:
+                            st.markdown("## 💡 AI 분석 결과", unsafe_allow_html=True)
+                            status = st.empty()
+                            status.caption("AI 분석 중...")
+                            area = st.container()
+                            slots = []
+                            buf = []
+                            used = {}
+                            t0 = time.perf_counter()
                             try:
-                                import google.generativeai as genai
-                                genai.configure(api_key=api_key)
-                                model_names = [
-                                    "models/gemini-flash-latest",
-                                    "models/gemini-2.5-flash",
-                                    "models/gemini-pro-latest",
-                                ]
-                                last_err = None
-                                resp = None
-                                for mn in model_names:
-                                    try:
-                                        model = genai.GenerativeModel(mn)
-                                        resp = model.generate_content([
-                                            system_prompt,
-                                            f"Context:\n{context_text}",
-                                            f"Question:\n{question}",
-                                        ])
-                                        break
-                                    except Exception as _e:
-                                        last_err = _e
-                                        continue
-                                if resp is None and last_err is not None:
-                                    raise last_err
-                                ans = getattr(resp, "text", None) or str(resp)
+                                stream = model_router.get_router().stream(
+                                    ai_client.gemini_models(api_key),
+                                    ai_client.build_parts(system_prompt, context_text, question),
+                                    on_model=lambda name: used.setdefault("model", name),
+                                )
+                                for text in stream:
+                                    if not buf:
+                                        status.empty()
+                                    buf.append(text)
+                                    render_answer("".join(buf), area, slots)
+                                ans = "".join(buf)
+                                # 오류 응답은 저장하지 않고, 정상 응답만 캐시한다
+                                if ans.strip():
+                                    cache.put(key, used.get("model", ""), ans, time.perf_counter() - t0)
                             except Exception as e:
-                                ans = f"Gemini 호출 중 오류: {e}"
-                        finally:
-                            st.session_state["ai_answer"] = ans or "응답을 받을 수 없습니다."
-                            st.session_state["chat_history"].append({"role": "user", "content": question})
-                            st.session_state["chat_history"].append({"role": "assistant", "content": st.session_state["ai_answer"]})
-                            st.session_state["analyzing"] = False
-                            st.rerun()
+                                if buf:
+                                    ans = "".join(buf) + f"\n\n(응답이 중단되었습니다: {e})"
+                                else:
+                                    ans = f"Gemini 호출 중 오류: {e}"
+                    finally:
+                        st.session_state["ai_answer"] = ans or "응답을 받을 수 없습니다."
+                        st.session_state["chat_history"].append({"role": "user", "content": question})
+                        st.session_state["chat_history"].append({"role": "assistant", "content": st.session_state["ai_answer"]})
+                        st.session_state["analyzing"] = False
+                        st.rerun()
 
         if st.session_state.get("ai_answer"):
             # 디자인 개선: 제목 아이콘 및 스타일
             st.markdown("## 💡 AI 분석 결과", unsafe_allow_html=True)
             
-            raw_ans = st.session_state["ai_answer"]
-            
-            # 구조적 구분 및 강조
-            # 예상되는 구조: ### [핵심 논거] ... --- ### [인과 관계] ... --- ### [투자 인사이트] ... --- ### 결론 ...
-            
-            parts = raw_ans.split("---")
-            for part in parts:
-                part = part.strip()
-                if not part: continue
-                
-                # 투자 인사이트 강조
-                if "### [투자 인사이트]" in part:
-                    content = part.replace("### [투자 인사이트]", "").strip()
-                    st.warning(f"### 💰 [투자 인사이트]\n\n{content}", icon="💰")
-                else:
-                    # 헤더 스타일링
-                    if "### [핵심 논거]" in part:
-                        new_header = style_header("🎯 [핵심 논거]", "#e8f0fe", "#174ea6")
-                        part = part.replace("### [핵심 논거]", new_header)
-                        st.markdown(part, unsafe_allow_html=True)
-                    elif "### [인과 관계]" in part:
-                        new_header = style_header("🔗 [인과 관계]", "#e6f4ea", "#137333")
-                        part = part.replace("### [인과 관계]", new_header)
-                        st.markdown(part, unsafe_allow_html=True)
-                    elif "### 결론" in part:
-                        new_header = style_header("📝 결론", "#f1f3f4", "#202124")
-                        part = part.replace("### 결론", new_header)
-                        st.markdown(part, unsafe_allow_html=True)
-                    else:
-                        st.markdown(part)
-                
-                st.write("") # 간격
+            if st.session_state.get("ai_answer_cached"):
+                cs = llm_cache.get_cache().stats()
+                st.caption(f"저장된 응답을 재사용했습니다 · 적중률 {cs['hit_rate']:.0%} · 누적 절약 {cs['saved_seconds']:.1f}초")
+
+            render_answer(st.session_state["ai_answer"], st.container(), [])
 
         if st.session_state.get("chat_history"):
             st.divider()
@@ -497,6 +608,7 @@ with tab2:
             )
         with c2:
             st.text_input("검색어", key="search_query")
+            st.checkbox("의미 검색", key="semantic_search", help="표현이 달라도 뜻이 비슷한 글을 찾습니다")
 
         selected_blog_url = None
         if st.session_state.get("selected_blog_id") is not None:
@@ -507,12 +619,16 @@ with tab2:
         if selected_blog_url:
             if isinstance(view_picked, tuple) and len(view_picked) == 2:
                 v_start, v_end = view_picked
-                posts = dbm.query_posts_for_blog(
-                    selected_blog_url, 
-                    v_start, 
-                    v_end, 
-                    st.session_state.get("search_query", "")
-                )
+                search_q = st.session_state.get("search_query", "")
+                if st.session_state.get("semantic_search") and search_q.strip() and isinstance(store, storage.SqliteStorage):
+                    posts = dbm.semantic_search_posts(selected_blog_url, search_q, v_start, v_end)
+                else:
+                    posts = store.query_posts_for_blog(
+                        selected_blog_url, 
+                        v_start, 
+                        v_end, 
+                        search_q
+                    )
                 
                 if not posts:
                     st.info("데이터가 없습니다.")
@@ -551,6 +667,127 @@ with tab2:
         else:
             st.info("블로그를 선택하세요")
 
-if st.session_state.get("scrape_logs"):
+with tab3:
+    _, col_main, _ = st.columns([1, 2, 1])
+
+    with col_main:
+        st.header("활동 현황")
+        if not isinstance(store, storage.SqliteStorage):
+            st.info("활동 현황은 SQLite 저장소에서만 제공됩니다.")
+        else:
+            # 글 원문이 아니라 트리거로 유지되는 일별 집계(post_daily_stats)만 읽는다
+            daily = query_cache.load_activity()
+            if not daily:
+                st.info("데이터가 없습니다.")
+            else:
+                totals = activity_stats.blog_totals(daily)
+                m1, m2, m3 = st.columns(3)
+                m1.metric("전체 글", f"{sum(t['posts'] for t in totals):,}")
+                m2.metric("블로그", len(totals))
+                m3.metric("마지막 글", max(t["last_date"] for t in totals))
+
+                st.subheader("주별 글 수 (최근 26주)")
+                weekly = activity_stats.weekly_posts(daily)
+                names = sorted({t["blog_name"] for t in totals})
+                chart = {"week": list(weekly.keys())}
+                for n in names:
+                    chart[n] = [weekly[w][n] for w in weekly]
+                st.bar_chart(chart, x="week", y=names)
+
+                st.subheader("블로그별 요약")
+                st.dataframe(
+                    [
+                        {"블로그": t["blog_name"], "글 수": t["posts"], "평균 글자 수": t["avg_chars"],
+                         "첫 글": t["first_date"], "마지막 글": t["last_date"]}
+                        for t in totals
+                    ],
+                    hide_index=True,
+                )
+
+TREND_METRICS = {
+    "언급 횟수": "count",
+    "1000 토큰당 언급": "per_1k",
+    "언급한 글 수": "df",
+    "TF-IDF": "tfidf",
+}
+
+with tab4:
+    _, col_main, _ = st.columns([1, 2, 1])
+
+    with col_main:
+        st.header("키워드 추이")
+        trend_blog_url = None
+        if st.session_state.get("selected_blog_id") is not None:
+            sel = [b for b in st.session_state["blogs"] if b["id"] == st.session_state["selected_blog_id"]]
+            if sel:
+                trend_blog_url = sel[0]["url"]
+
+        if not isinstance(store, storage.SqliteStorage):
+            st.info("키워드 추이는 SQLite 저장소에서만 제공됩니다.")
+        elif not trend_blog_url:
+            st.info("블로그를 선택하세요")
+        else:
+            import keyword_trends
+            # 새로 저장된 글만 글-단어 행렬에 이어 붙인다
+            keyword_trends.ensure_index(trend_blog_url)
+
+            c1, c2, c3 = st.columns([2, 1, 1])
+            with c1:
+                trend_input = st.text_input("키워드 (쉼표로 구분)", key="trend_terms", placeholder="환율, 금리, 반도체")
+            with c2:
+                trend_freq = st.radio("단위", ["주", "월"], horizontal=True, key="trend_freq")
+            with c3:
+                trend_metric = st.selectbox("지표", list(TREND_METRICS), key="trend_metric")
+            trend_picked = st.date_input(
+                "분석 기간",
+                value=(date.today() - timedelta(days=365), date.today()),
+                max_value=date.today(),
+                key="trend_range",
+            )
+            if isinstance(trend_picked, tuple) and len(trend_picked) == 2:
+                t_start, t_end = trend_picked
+                terms = list(dict.fromkeys(
+                    keyword_trends.normalize_term(t) for t in (trend_input or "").split(",") if t.strip()
+                ))
+                if terms:
+                    trend = keyword_trends.term_trend(
+                        trend_blog_url, terms, t_start, t_end,
+                        freq="W" if trend_freq == "주" else "M", metric=TREND_METRICS[trend_metric],
+                    )
+                    if trend["periods"]:
+                        chart = {"기간": trend["periods"], **trend["series"]}
+                        st.line_chart(chart, x="기간", y=terms)
+                    else:
+                        st.info("기간 안에 글이 없습니다.")
+
+                col_top, col_co = st.columns(2)
+                with col_top:
+                    st.subheader("기간 주요 단어")
+                    top = keyword_trends.top_terms(trend_blog_url, t_start, t_end, k=20)
+                    if top:
+                        st.dataframe([{"단어": t, "글 수": n} for t, _score, n in top], hide_index=True)
+                    else:
+                        st.caption("데이터가 없습니다.")
+                with col_co:
+                    if terms:
+                        st.subheader(f"'{terms[0]}' 와 함께 나온 단어")
+                        co = keyword_trends.cooccurring(trend_blog_url, terms[0], t_start, t_end)
+                        if co:
+                            st.dataframe([{"단어": t, "함께 나온 글": n, "lift": round(l, 2)} for t, n, l in co],
+                                         hide_index=True)
+                        else:
+                            st.caption("함께 나온 단어가 없습니다.")
+
+crawl_events = st.session_state.get("crawl_log")
+if crawl_events is not None or os.path.exists(crawl_log.DB_PATH):
     with st.sidebar.expander("수집 로그"):
-        st.text("\n".join(st.session_state["scrape_logs"]))
+        log_levels = st.multiselect("레벨", crawl_log.LEVELS, default=["info", "warning", "error"], key="log_levels")
+        log_blog = st.selectbox("블로그", ["전체", *[b["name"] for b in st.session_state["blogs"]]], key="log_blog")
+        log_blog = None if log_blog == "전체" else log_blog
+        if crawl_events is None or st.toggle("저장된 기록 보기", key="log_from_db"):
+            events = crawl_log.history(log_blog, log_levels or None, LOG_TAIL)
+        else:
+            st.caption(" · ".join(f"{lv} {n:,}" for lv, n in crawl_events.counts().items() if n))
+            events = crawl_events.tail(LOG_TAIL, log_blog, log_levels or None)
+        # 최근 LOG_TAIL 개만 그린다
+        st.text("\n".join(crawl_log.format_event(e) for e in events) or "기록이 없습니다.")
@@ -0,0 +1,246 @@
+import heapq
+import math
+import os
+import threading
+from collections import Counter
+from datetime import date
+
+import db_manager as dbm
+from text_utils import estimate_tokens, split_chunks, tokenize_ko
+
+K1 = 1.2
+B = 0.75
+CHUNK_CHARS = 800
+
+# 이 프로세스에서 이미 색인 테이블을 만든 DB (db_manager 의 스키마 가드처럼, 파일이 지워지면 다시 만든다)
+_tables_ready: set[str] = set()
+_tables_ready_lock = threading.Lock()
+
+
+def ensure_index_tables(conn):
+    conn.executescript(
+        """
+        CREATE TABLE IF NOT EXISTS bm25_chunks (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            post_id INTEGER NOT NULL,
+            date TEXT NOT NULL,
+            ord INTEGER NOT NULL,
+            text TEXT NOT NULL,
+            length INTEGER NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS bm25_chunks_date ON bm25_chunks(date);
+        CREATE INDEX IF NOT EXISTS bm25_chunks_post ON bm25_chunks(post_id);
+        CREATE TABLE IF NOT EXISTS bm25_postings (
+            term TEXT NOT NULL,
+            chunk_id INTEGER NOT NULL,
+            tf INTEGER NOT NULL,
+            PRIMARY KEY (term, chunk_id)
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS bm25_postings_chunk ON bm25_postings(chunk_id);
+        CREATE TABLE IF NOT EXISTS bm25_meta (
+            key TEXT PRIMARY KEY,
+            value INTEGER NOT NULL
+        );
+        """
+    )
+
+
+def _ensure_tables_once(conn, path: str):
+    path = os.path.abspath(path)
+    with _tables_ready_lock:
+        if path in _tables_ready and os.path.exists(path):
+            return
+    ensure_index_tables(conn)
+    with _tables_ready_lock:
+        _tables_ready.add(path)
+
+
+def _meta(conn, key: str) -> int:
+    row = conn.execute("SELECT value FROM bm25_meta WHERE key = ?", (key,)).fetchone()
+    return int(row[0]) if row else 0
+
+
+def _set_meta(conn, key: str, value: int):
+    conn.execute(
+        "INSERT INTO bm25_meta(key, value) VALUES (?, ?) ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+        (key, int(value)),
+    )
+
+
+def _index_post(conn, post_id: int, d: str, title: str, content: str) -> tuple[int, int]:
+    n_chunks = 0
+    total_len = 0
+    for ord_, text in enumerate(split_chunks(content, CHUNK_CHARS)):
+        # 제목은 첫 청크에만 붙여서 제목 검색이 본문 앞부분으로 연결되게 한다.
+        terms = tokenize_ko(f"{title}\n{text}" if ord_ == 0 else text)
+        if not terms:
+            continue
+        cur = conn.execute(
+            "INSERT INTO bm25_chunks(post_id, date, ord, text, length) VALUES (?, ?, ?, ?, ?)",
+            (post_id, d, ord_, text, len(terms)),
+        )
+        chunk_id = cur.lastrowid
+        conn.executemany(
+            "INSERT INTO bm25_postings(term, chunk_id, tf) VALUES (?, ?, ?)",
+            [(t, chunk_id, tf) for t, tf in Counter(terms).items()],
+        )
+        n_chunks += 1
+        total_len += len(terms)
+    return n_chunks, total_len
+
+
+def remove_posts(conn, post_ids: list[int]):
+    # 수정/삭제된 글의 청크를 지우고 통계를 되돌린다 (다시 색인하려면 _index_post 호출)
+    for pid in post_ids:
+        rows = conn.execute("SELECT id, length FROM bm25_chunks WHERE post_id = ?", (pid,)).fetchall()
+        if not rows:
+            continue
+        conn.executemany("DELETE FROM bm25_postings WHERE chunk_id = ?", [(cid,) for cid, _ in rows])
+        conn.execute("DELETE FROM bm25_chunks WHERE post_id = ?", (pid,))
+        _set_meta(conn, "n_chunks", _meta(conn, "n_chunks") - len(rows))
+        _set_meta(conn, "total_len", _meta(conn, "total_len") - sum(r[1] for r in rows))
+
+
+def reindex_posts(blog_url: str, post_ids: list[int]):
+    conn = dbm.get_post_conn_for(blog_url)
+    try:
+        _ensure_tables_once(conn, dbm.post_db_path_for(blog_url))
+        conn.execute("PRAGMA busy_timeout=30000")
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            remove_posts(conn, post_ids)
+            for pid in post_ids:
+                row = conn.execute("SELECT id, date, title, content FROM posts WHERE id = ?", (pid,)).fetchone()
+                if row:
+                    n, total = _index_post(conn, *row)
+                    _set_meta(conn, "n_chunks", _meta(conn, "n_chunks") + n)
+                    _set_meta(conn, "total_len", _meta(conn, "total_len") + total)
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+    finally:
+        conn.close()
+
+
+def update_index(blog_url: str, batch_size: int = 200) -> int:
+    # posts.id 가 마지막으로 색인한 id 보다 큰 글만 색인한다.
+    dbm.ensure_posts_table_for(blog_url)
+    conn = dbm.get_post_conn_for(blog_url)
+    indexed = 0
+    try:
+        _ensure_tables_once(conn, dbm.post_db_path_for(blog_url))
+        conn.execute("PRAGMA busy_timeout=30000")
+        while True:
+            # last_post_id 읽기부터 meta 갱신까지 한 쓰기 트랜잭션으로 묶는다.
+            # 동시에 불린 다른 update_index(저장 후 훅, 질문 처리)는 기다렸다가 그 뒤의 글만 색인한다
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                last_id = _meta(conn, "last_post_id")
+                rows = conn.execute(
+                    "SELECT id, date, title, content FROM posts WHERE id > ? ORDER BY id LIMIT ?",
+                    (last_id, batch_size),
+                ).fetchall()
+                if not rows:
+                    conn.rollback()
+                    break
+                n_chunks = _meta(conn, "n_chunks")
+                total_len = _meta(conn, "total_len")
+                for pid, d, title, content in rows:
+                    n, total = _index_post(conn, pid, d, title or "", content or "")
+                    n_chunks += n
+                    total_len += total
+                    last_id = pid
+                _set_meta(conn, "n_chunks", n_chunks)
+                _set_meta(conn, "total_len", total_len)
+                _set_meta(conn, "last_post_id", last_id)
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+            indexed += len(rows)
+    finally:
+        conn.close()
+    return indexed
+
+
+def search(blog_url: str, query: str, start_date: date | None = None, end_date: date | None = None,
+           k: int = 30) -> list[dict]:
+    terms = list(dict.fromkeys(tokenize_ko(query)))
+    if not terms:
+        return []
+    conn = dbm.get_post_conn_for(blog_url)
+    try:
+        # 질문마다 DDL 을 돌리지 않는다: 아직 update_index 를 한 번도 안 한 DB 면 결과 없음
+        if conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'bm25_chunks'").fetchone() is None:
+            return []
+        n = _meta(conn, "n_chunks")
+        if n == 0:
+            return []
+        avgdl = _meta(conn, "total_len") / n
+        lo = start_date.isoformat() if start_date else "0000-00-00"
+        hi = end_date.isoformat() if end_date else "9999-99-99"
+        scores: dict[int, float] = {}
+        for term in terms:
+            df = conn.execute("SELECT COUNT(*) FROM bm25_postings WHERE term = ?", (term,)).fetchone()[0]
+            if df == 0:
+                continue
+            idf = math.log(1 + (n - df + 0.5) / (df + 0.5))
+            for chunk_id, tf, length in conn.execute(
+                "SELECT p.chunk_id, p.tf, c.length FROM bm25_postings p JOIN bm25_chunks c ON c.id = p.chunk_id "
+                "WHERE p.term = ? AND c.date BETWEEN ? AND ?",
+                (term, lo, hi),
+            ):
+                denom = tf + K1 * (1 - B + B * length / avgdl)
+                scores[chunk_id] = scores.get(chunk_id, 0.0) + idf * tf * (K1 + 1) / denom
+        top = heapq.nlargest(k, scores.items(), key=lambda x: x[1])
+        out = []
+        for chunk_id, score in top:
+            row = conn.execute(
+                "SELECT c.post_id, c.date, c.text, p.title FROM bm25_chunks c LEFT JOIN posts p ON p.id = c.post_id "
+                "WHERE c.id = ?",
+                (chunk_id,),
+            ).fetchone()
+            if row:
+                out.append({"chunk_id": chunk_id, "score": score, "post_id": row[0], "date": row[1],
+                            "text": row[2], "title": row[3] or ""})
+        return out
+    finally:
+        conn.close()
+
+
+def pack_chunks(chunks, token_budget: int) -> tuple[str, int, int]:
+    # 점수 순으로 넣되 예산을 넘는 청크는 건너뛴다. (context, 사용 토큰, 청크 수)
+    parts = []
+    used = 0
+    for c in chunks:
+        block = f"[{c['date']}] {c['title']}\n{c['text']}"
+        cost = estimate_tokens(block) + 2
+        if used + cost > token_budget:
+            continue
+        parts.append(block)
+        used += cost
+    return "\n\n".join(parts), used, len(parts)
+
+
+def build_context(blog_url: str, question: str, start_date: date, end_date: date,
+                  token_budget: int = 6000, k: int = 60, exclude_post_ids: set[int] | None = None) -> dict:
+    update_index(blog_url)
+    chunks = search(blog_url, question, start_date, end_date, k) if (question or "").strip() else []
+    if exclude_post_ids:
+        # 유사 중복으로 표시된 글은 같은 내용을 두 번 넣지 않도록 뺀다
+        chunks = [c for c in chunks if c["post_id"] not in exclude_post_ids]
+    mode = "bm25"
+    if not chunks:
+        # 질문이 비었거나 일치하는 청크가 없으면 최신 글 순으로 채운다.
+        mode = "recent"
+        chunks = []
+        budget_left = token_budget
+        for r in dbm.iter_posts_for_blog(blog_url, start_date, end_date, ""):
+            for text in split_chunks(r.content or "", CHUNK_CHARS):
+                chunks.append({"date": r.date, "title": r.title, "text": text})
+                budget_left -= estimate_tokens(text)
+            if budget_left <= 0:
+                break
+    text, used, n = pack_chunks(chunks, token_budget)
+    return {"context": text, "tokens": used, "chunks": n, "mode": mode}
@@ -0,0 +1,204 @@
+import argparse
+import itertools
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import deque, namedtuple
+
+# 수집 로그: 레벨마다 최근 N 개만 메모리에 두는 ring buffer + SQLite 기록.
+# 화면은 tail 만 그리므로 수집이 길어져도 세션 메모리와 재실행 시간이 일정하다.
+DB_PATH = "crawl_log.db"
+LEVELS = ("debug", "info", "warning", "error")
+# 메모리에 남기는 개수 (Delay/Sleep 같은 debug 는 적게)
+RETENTION = {"debug": 200, "info": 1000, "warning": 500, "error": 500}
+# SQLite 에 남기는 개수
+DB_RETENTION = {"debug": 5000, "info": 50000, "warning": 20000, "error": 20000}
+FLUSH_EVERY = 200
+
+Event = namedtuple("Event", "seq ts run_id blog level message")
+
+_DEBUG_PREFIXES = ("Delay ", "Sleep ", "PostList page ", "RSS items")
+_WARNING_PREFIXES = ("Status ", "Cancelled", "Skip: date parse failed", "Flag near-duplicate")
+_ERROR_PREFIXES = ("Fatal", "Request error")
+
+
+def level_for(message: str) -> str:
+    # scraper 의 log_cb 메시지 앞부분으로 레벨을 정한다
+    if message.startswith(_ERROR_PREFIXES):
+        return "error"
+    if message.startswith(_WARNING_PREFIXES):
+        return "warning"
+    if message.startswith(_DEBUG_PREFIXES):
+        return "debug"
+    return "info"
+
+
+def get_conn(path: str | None = None):
+    conn = sqlite3.connect(path or DB_PATH, timeout=30, check_same_thread=False)
+    conn.executescript(
+        """
+        CREATE TABLE IF NOT EXISTS crawl_events (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            ts REAL NOT NULL,
+            run_id TEXT NOT NULL,
+            blog TEXT NOT NULL,
+            level TEXT NOT NULL,
+            message TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS crawl_events_level ON crawl_events(level, id);
+        CREATE INDEX IF NOT EXISTS crawl_events_blog ON crawl_events(blog, id);
+        """
+    )
+    return conn
+
+
+class CrawlLog:
+    def __init__(self, run_id: str | None = None, path: str | None = None,
+                 retention: dict[str, int] | None = None, persist: bool = True):
+        self.run_id = run_id or uuid.uuid4().hex[:12]
+        self.path = path or DB_PATH
+        self.persist = persist
+        retention = retention or RETENTION
+        self._events = {lv: deque(maxlen=retention[lv]) for lv in LEVELS}
+        self._counts = dict.fromkeys(LEVELS, 0)
+        self._blogs: set[str] = set()
+        self._pending: list[Event] = []
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+
+    def add(self, blog: str, message: str, level: str | None = None) -> Event:
+        level = level or level_for(message)
+        with self._lock:
+            ev = Event(next(self._seq), time.time(), self.run_id, blog, level, message)
+            self._events[level].append(ev)
+            self._counts[level] += 1
+            self._blogs.add(blog)
+            if self.persist:
+                self._pending.append(ev)
+                flush = len(self._pending) >= FLUSH_EVERY
+            else:
+                flush = False
+        if flush:
+            self.flush()
+        return ev
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, []
+        if not pending:
+            return
+        conn = get_conn(self.path)
+        try:
+            with conn:
+                conn.executemany(
+                    "INSERT INTO crawl_events(ts, run_id, blog, level, message) VALUES (?, ?, ?, ?, ?)",
+                    [(e.ts, e.run_id, e.blog, e.level, e.message) for e in pending],
+                )
+        finally:
+            conn.close()
+
+    def close(self):
+        # 수집이 끝나면 남은 기록을 쓰고 보관 개수를 넘는 오래된 기록을 지운다
+        self.flush()
+        if self.persist:
+            prune(self.path)
+
+    def tail(self, n: int = 200, blog: str | None = None, levels=None) -> list[Event]:
+        # 레벨별 버퍼의 끝에서부터 n 개만 모아 seq 순으로 합친다
+        levels = levels or LEVELS
+        with self._lock:
+            picked = []
+            for lv in levels:
+                got = 0
+                for ev in reversed(self._events[lv]):
+                    if blog and ev.blog != blog:
+                        continue
+                    picked.append(ev)
+                    got += 1
+                    if got >= n:
+                        break
+        picked.sort(key=lambda e: e.seq)
+        return picked[-n:]
+
+    def counts(self) -> dict[str, int]:
+        with self._lock:
+            return dict(self._counts)
+
+    def blogs(self) -> list[str]:
+        with self._lock:
+            return sorted(self._blogs)
+
+    def __len__(self):
+        with self._lock:
+            return sum(len(d) for d in self._events.values())
+
+
+def format_event(ev: Event) -> str:
+    return f"{time.strftime('%H:%M:%S', time.localtime(ev.ts))} {ev.level[0].upper()} [{ev.blog}] {ev.message}"
+
+
+def history(blog: str | None = None, levels=None, limit: int = 200, run_id: str | None = None,
+            path: str | None = None) -> list[Event]:
+    # SQLite 에 남은 이전 수집 기록 (최근 limit 개, 오래된 것부터)
+    if not os.path.exists(path or DB_PATH):
+        return []
+    where, params = [], []
+    if blog:
+        where.append("blog = ?")
+        params.append(blog)
+    if levels:
+        where.append(f"level IN ({','.join('?' * len(levels))})")
+        params.extend(levels)
+    if run_id:
+        where.append("run_id = ?")
+        params.append(run_id)
+    conn = get_conn(path)
+    try:
+        rows = conn.execute(
+            f"SELECT id, ts, run_id, blog, level, message FROM crawl_events "
+            f"{'WHERE ' + ' AND '.join(where) if where else ''} ORDER BY id DESC LIMIT ?",
+            (*params, limit),
+        ).fetchall()
+    finally:
+        conn.close()
+    return [Event(*r) for r in reversed(rows)]
+
+
+def prune(path: str | None = None, retention: dict[str, int] | None = None) -> int:
+    retention = retention or DB_RETENTION
+    if not os.path.exists(path or DB_PATH):
+        return 0
+    conn = get_conn(path)
+    removed = 0
+    try:
+        with conn:
+            for lv, keep in retention.items():
+                removed += conn.execute(
+                    "DELETE FROM crawl_events WHERE level = ? AND id < "
+                    "(SELECT COALESCE(MIN(id), 0) FROM (SELECT id FROM crawl_events WHERE level = ? ORDER BY id DESC LIMIT ?))",
+                    (lv, lv, keep),
+                ).rowcount
+    finally:
+        conn.close()
+    return removed
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Show or prune the persisted crawl event log")
+    ap.add_argument("--blog")
+    ap.add_argument("--level", action="append", choices=LEVELS)
+    ap.add_argument("--run")
+    ap.add_argument("-n", type=int, default=100)
+    ap.add_argument("--prune", action="store_true", help="레벨별 보관 개수를 넘는 오래된 기록 삭제")
+    args = ap.parse_args(argv)
+    if args.prune:
+        print(f"removed {prune()} events")
+        return
+    for ev in history(args.blog, args.level, args.n, args.run):
+        print(format_event(ev))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+import os
+import random
+import time
+from datetime import date
+from urllib.parse import urlparse
+
+import db_manager as dbm
+import scraper
+import storage
+
+# 요청마다 대기 외에 드는 시간 (응답 + 파싱) 추정치
+REQUEST_SECONDS = 0.8
+# 이만큼 저장할 때마다 커밋 (색인 갱신 훅이 돈다)
+COMMIT_EVERY = 20
+PRIORITIES = ("recent", "balanced")
+
+
+def _mean(r: tuple[float, float]) -> float:
+    return (r[0] + r[1]) / 2
+
+
+def seconds_per_post() -> float:
+    # 글 하나 = 요청 전 대기 + 요청 + 저장 후 대기. 대기가 대부분이라 요청 수로 거의 정해진다
+    return _mean(scraper.FETCH_DELAY) + REQUEST_SECONDS + _mean(scraper.SAVE_DELAY)
+
+
+def format_duration(seconds: float) -> str:
+    seconds = int(round(seconds))
+    h, rem = divmod(seconds, 3600)
+    m, s = divmod(rem, 60)
+    if h:
+        return f"{h}시간 {m}분"
+    if m:
+        return f"{m}분 {s}초" if m < 10 and s else f"{m}분"
+    return f"{s}초"
+
+
+def link_key(link: str) -> str:
+    # m.blog / blog / RSS 링크를 "blogId/logNo" 로 맞춘다
+    return urlparse(link).path.strip("/")
+
+
+def known_links(blog_url: str) -> set[str]:
+    # 이미 저장된 글의 링크: 다시 받지 않아도 되는 글 (SQLite 만, Postgres 는 받은 뒤 중복으로 걸러진다)
+    if not isinstance(storage.get_storage(), storage.SqliteStorage):
+        return set()
+    if not os.path.exists(dbm.post_db_path_for(blog_url)):
+        return set()
+    conn = dbm.get_post_conn_for(blog_url)
+    try:
+        return {link_key(r[0]) for r in conn.execute("SELECT link FROM posts")}
+    except Exception:
+        return set()
+    finally:
+        conn.close()
+
+
+def plan_blog(blog_name: str, blog_url: str, start_date: date, end_date: date, log_cb=None) -> dict:
+    t0 = time.monotonic()
+    items = scraper.discover_post_items(blog_url, start_date, end_date, log_cb=log_cb)
+    known = known_links(blog_url)
+    new = [(link, d) for link, d in items if link_key(link) not in known]
+    return {
+        "name": blog_name,
+        "url": blog_url,
+        "found": len(items),
+        "known": len(items) - len(new),
+        "items": new,
+        "discover_seconds": time.monotonic() - t0,
+    }
+
+
+def _prioritize(blogs: list[dict], priority: str) -> list[tuple[dict, str, date | None]]:
+    # recent: 전체에서 최근 글부터 / balanced: 블로그를 번갈아 가며 각 블로그의 최근 글부터.
+    # 날짜를 모르는 글(RSS 없이 목록에서만 찾은 글)은 뒤로 보낸다
+    per_blog = [
+        sorted(((b, link, d) for link, d in b["items"]), key=lambda t: (t[2] is not None, t[2] or date.min),
+               reverse=True)
+        for b in blogs
+    ]
+    if priority == "balanced":
+        out = []
+        for i in range(max((len(x) for x in per_blog), default=0)):
+            out.extend(x[i] for x in per_blog if i < len(x))
+        return out
+    flat = [t for x in per_blog for t in x]
+    return sorted(flat, key=lambda t: (t[2] is not None, t[2] or date.min), reverse=True)
+
+
+def plan(blogs: list[dict], start_date: date, end_date: date, budget_seconds: float | None = None,
+         priority: str = "recent", log_cb=None) -> dict:
+    # blogs: [{"name", "url"}]. 링크 찾기는 실제로 요청을 보내므로 블로그마다 몇 번의 요청 시간이 든다
+    planned = []
+    for b in blogs:
+        planned.append(plan_blog(b["name"], b["url"], start_date, end_date,
+                                 log_cb=(lambda m, name=b["name"]: log_cb(name, m)) if log_cb else None))
+    queue = _prioritize(planned, priority)
+    per_post = seconds_per_post()
+    # 링크 찾기에 쓴 시간도 예산에서 뺀다
+    discover_seconds = sum(b["discover_seconds"] for b in planned)
+    if budget_seconds:
+        selected = queue[:max(0, int((budget_seconds - discover_seconds) // per_post))]
+    else:
+        selected = queue
+    for b in planned:
+        b["new"] = len(b["items"])
+        b["selected"] = sum(1 for t in selected if t[0] is b)
+        b["est_seconds"] = b["selected"] * per_post
+    return {
+        "blogs": planned,
+        "tasks": selected,
+        "start_date": start_date,
+        "end_date": end_date,
+        "priority": priority,
+        "budget_seconds": budget_seconds,
+        "new": len(queue),
+        "discover_seconds": discover_seconds,
+        "coverage": len(selected) / len(queue) if queue else 1.0,
+        "est_seconds": len(selected) * per_post,
+        "full_seconds": len(queue) * per_post,
+        "oldest_selected": min((t[2] for t in selected if t[2]), default=None),
+    }
+
+
+def execute(p: dict, progress_cb=None, log_cb=None, should_stop_cb=None) -> dict:
+    # 계획한 순서대로 글을 받는다. progress_cb(진행률 0~1, 남은 시간 초), log_cb(블로그명, 메시지)
+    import near_dup
+
+    store = storage.get_storage()
+    near_mode = near_dup.mode()
+    near_checker = near_dup.IngestChecker() if near_mode != "off" else None
+    writers = {}
+    result = {b["name"]: {"found": b["found"], "known": b["known"], "saved": 0, "duplicates": 0, "failed": 0}
+              for b in p["blogs"]}
+    tasks = p["tasks"]
+    per_post = seconds_per_post()
+    since_commit = 0
+    t0 = time.monotonic()
+    cancelled = False
+    try:
+        for i, (b, link, dd_hint) in enumerate(tasks):
+            if should_stop_cb and should_stop_cb():
+                cancelled = True
+                break
+            if progress_cb:
+                # 처음에는 추정치, 몇 개 받은 뒤에는 실제 평균으로 남은 시간을 계산
+                avg = (time.monotonic() - t0) / i if i >= 3 else per_post
+                progress_cb(i / max(len(tasks), 1), avg * (len(tasks) - i))
+
+            def blog_log(msg, name=b["name"]):
+                if log_cb:
+                    log_cb(name, msg)
+
+            blog_log(f"Processing [{i+1}/{len(tasks)}] {link}")
+            w = writers.get(b["url"])
+            if w is None:
+                store.ensure_posts_for(b["url"])
+                w = writers[b["url"]] = store.post_writer(b["url"])
+            try:
+                r = scraper.process_post(w, b["name"], link, dd_hint, p["start_date"], p["end_date"],
+                                         near_checker, near_mode, blog_log)
+            except Exception as e:
+                # 글 하나의 실패로 전체 수집을 멈추지 않는다
+                result[b["name"]]["failed"] += 1
+                blog_log(f"Request error {e.__class__.__name__}: {e}")
+                continue
+            if r == "duplicate":
+                result[b["name"]]["duplicates"] += 1
+            if r != "saved":
+                continue
+            result[b["name"]]["saved"] += 1
+            since_commit += 1
+            if since_commit >= COMMIT_EVERY:
+                for cw in writers.values():
+                    cw.commit()
+                since_commit = 0
+            delay = random.uniform(*scraper.SAVE_DELAY)
+            blog_log(f"Sleep {delay:.2f}s")
+            end = time.monotonic() + delay
+            while time.monotonic() < end:
+                if should_stop_cb and should_stop_cb():
+                    blog_log("Cancelled during sleep")
+                    break
+                time.sleep(min(0.1, max(0.0, end - time.monotonic())))
+        for w in writers.values():
+            w.commit()
+    except BaseException:
+        # 중단되어도 (Streamlit 재실행의 ScriptControlException 포함) 이미 저장으로 센 글은 커밋한다
+        for w in writers.values():
+            try:
+                w.commit()
+            except Exception:
+                pass
+        raise
+    finally:
+        for w in writers.values():
+            w.close()
+        if near_checker:
+            near_checker.close()
+    if progress_cb:
+        progress_cb(1.0, 0.0)
+    return {"blogs": result, "cancelled": cancelled, "seconds": time.monotonic() - t0}
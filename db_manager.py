@@ -1,7 +1,10 @@
 import sqlite3
-from datetime import date
-import pandas as pd
+from collections import namedtuple
+from contextlib import contextmanager
+from datetime import date, datetime, timezone
 import os
+import glob
+import threading
 from urllib.parse import urlparse, parse_qs
 
 
@@ -19,12 +22,104 @@ def _extract_blog_id(blog_url: str) -> str | None:
         return None
 
 
+def blog_key_for(blog_url: str) -> str:
+    return _extract_blog_id(blog_url) or "default"
+
+
 def _post_db_path(blog_url: str) -> str:
-    bid = _extract_blog_id(blog_url) or "default"
-    fname = f"posts_{bid}.db"
+    fname = f"posts_{blog_key_for(blog_url)}.db"
     return os.path.join(os.getcwd(), fname)
 
 
+def list_post_db_paths(base_dir: str | None = None) -> list[str]:
+    base = base_dir or os.getcwd()
+    return sorted(glob.glob(os.path.join(base, "posts_*.db")))
+
+
+def blog_id_from_db_path(path: str) -> str:
+    name = os.path.basename(path)
+    if name.startswith("posts_") and name.endswith(".db"):
+        return name[len("posts_"):-len(".db")]
+    return os.path.splitext(name)[0]
+
+
+def blog_db_path() -> str:
+    return os.path.abspath("data.db")
+
+
+def post_db_path_for(blog_url: str) -> str:
+    return _post_db_path(blog_url)
+
+
+# 프로세스 내 쓰기 세대(write generation). 같은 프로세스의 save_post/add_blog 가 올리고,
+# 다른 프로세스의 쓰기는 파일 mtime/size 로 감지한다. query_cache 의 캐시 키로 쓰인다.
+_write_generation: dict[str, int] = {}
+_write_generation_lock = threading.Lock()
+
+
+def bump_write_generation(path: str):
+    path = os.path.abspath(path)
+    with _write_generation_lock:
+        _write_generation[path] = _write_generation.get(path, 0) + 1
+
+
+def write_generation(path: str) -> tuple:
+    path = os.path.abspath(path)
+    stamp = [_write_generation.get(path, 0)]
+    for p in (path, path + "-wal"):
+        try:
+            st = os.stat(p)
+            stamp.extend((st.st_mtime_ns, st.st_size))
+        except OSError:
+            stamp.extend((0, 0))
+    return tuple(stamp)
+
+
+_file_locks: dict[str, threading.Lock] = {}
+_file_locks_guard = threading.Lock()
+
+
+@contextmanager
+def file_lock(path: str):
+    # posts_<id>.db 옆 색인 파일에 이어 쓸 때: 스레드끼리는 threading.Lock, 프로세스끼리는 path 에 OS 파일 잠금
+    path = os.path.abspath(path)
+    with _file_locks_guard:
+        lock = _file_locks.setdefault(path, threading.Lock())
+    with lock, open(path, "a+b") as f:
+        if os.name == "nt":
+            import msvcrt
+            f.seek(0)
+            while True:
+                try:
+                    # LK_LOCK 은 10초 동안 다시 시도한 뒤 OSError
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    pass
+            try:
+                yield
+            finally:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def _conn_path(conn) -> str | None:
+    try:
+        for _seq, name, fname in conn.execute("PRAGMA database_list").fetchall():
+            if name == "main":
+                return fname or None
+    except Exception:
+        pass
+    return None
+
+
 def get_blog_conn():
     return sqlite3.connect("data.db", check_same_thread=False)
 
@@ -37,7 +132,121 @@ def get_post_conn_for(blog_url: str):
     return sqlite3.connect(_post_db_path(blog_url), check_same_thread=False)
 
 
+def sync_enabled() -> bool:
+    return os.environ.get("SUPABASE_SYNC", "").strip().lower() in {"1", "true", "yes", "on"}
+
+
+# Supabase 쪽 자연키: posts 는 posts_dedup_key, blogs 는 url
+_SYNC_KEY_COLUMNS = {
+    "posts": ("blog_name", "title", "date"),
+    "blogs": ("url",),
+}
+
+
+def ensure_sync_outbox(conn, table: str):
+    # table 의 변경을 sync_outbox 에 기록하는 트리거를 설치 (sync_supabase.py 가 소비)
+    keys = _SYNC_KEY_COLUMNS[table]
+
+    def key_json(ref: str) -> str:
+        return "json_object(" + ", ".join(f"'{k}', {ref}.{k}" for k in keys) + ")"
+
+    key_changed = " OR ".join(f"old.{k} IS NOT new.{k}" for k in keys)
+    cur = conn.cursor()
+    cur.executescript(
+        f"""
+        CREATE TABLE IF NOT EXISTS sync_outbox (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            tbl TEXT NOT NULL,
+            row_id INTEGER NOT NULL,
+            op TEXT NOT NULL,
+            key TEXT NOT NULL,
+            changed_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%fZ', 'now'))
+        );
+        CREATE TRIGGER IF NOT EXISTS sync_{table}_ins AFTER INSERT ON {table} BEGIN
+            INSERT INTO sync_outbox(tbl, row_id, op, key) VALUES ('{table}', new.id, 'upsert', {key_json("new")});
+        END;
+        CREATE TRIGGER IF NOT EXISTS sync_{table}_rekey AFTER UPDATE ON {table} WHEN {key_changed} BEGIN
+            INSERT INTO sync_outbox(tbl, row_id, op, key) VALUES ('{table}', old.id, 'delete', {key_json("old")});
+        END;
+        CREATE TRIGGER IF NOT EXISTS sync_{table}_upd AFTER UPDATE ON {table} BEGIN
+            INSERT INTO sync_outbox(tbl, row_id, op, key) VALUES ('{table}', new.id, 'upsert', {key_json("new")});
+        END;
+        CREATE TRIGGER IF NOT EXISTS sync_{table}_del AFTER DELETE ON {table} BEGIN
+            INSERT INTO sync_outbox(tbl, row_id, op, key) VALUES ('{table}', old.id, 'delete', {key_json("old")});
+        END;
+        """
+    )
+
+
+REBUILD_ACTIVITY_STATS_SQL = """
+        DELETE FROM post_daily_stats;
+        INSERT INTO post_daily_stats(blog_name, date, posts, chars)
+        SELECT blog_name, date, COUNT(*), COALESCE(SUM(length(content)), 0) FROM posts GROUP BY blog_name, date;
+"""
+
+
+def ensure_activity_stats(conn):
+    # posts 의 (blog_name, date) 별 글 수/글자 수를 트리거로 유지한다 (activity_stats.py 가 읽음).
+    # 처음 만들 때는 기존 글로 채운다.
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'post_daily_stats'"
+    ).fetchone()
+    conn.executescript(
+        f"""
+        BEGIN;
+        CREATE TABLE IF NOT EXISTS post_daily_stats (
+            blog_name TEXT NOT NULL,
+            date TEXT NOT NULL,
+            posts INTEGER NOT NULL,
+            chars INTEGER NOT NULL,
+            PRIMARY KEY (blog_name, date)
+        ) WITHOUT ROWID;
+        CREATE TRIGGER IF NOT EXISTS stats_posts_ins AFTER INSERT ON posts BEGIN
+            INSERT INTO post_daily_stats(blog_name, date, posts, chars)
+            VALUES (new.blog_name, new.date, 1, length(new.content))
+            ON CONFLICT(blog_name, date) DO UPDATE SET posts = posts + 1, chars = chars + excluded.chars;
+        END;
+        CREATE TRIGGER IF NOT EXISTS stats_posts_del AFTER DELETE ON posts BEGIN
+            UPDATE post_daily_stats SET posts = posts - 1, chars = chars - length(old.content)
+            WHERE blog_name = old.blog_name AND date = old.date;
+            DELETE FROM post_daily_stats WHERE blog_name = old.blog_name AND date = old.date AND posts <= 0;
+        END;
+        CREATE TRIGGER IF NOT EXISTS stats_posts_upd AFTER UPDATE OF blog_name, date, content ON posts BEGIN
+            UPDATE post_daily_stats SET posts = posts - 1, chars = chars - length(old.content)
+            WHERE blog_name = old.blog_name AND date = old.date;
+            DELETE FROM post_daily_stats WHERE blog_name = old.blog_name AND date = old.date AND posts <= 0;
+            INSERT INTO post_daily_stats(blog_name, date, posts, chars)
+            VALUES (new.blog_name, new.date, 1, length(new.content))
+            ON CONFLICT(blog_name, date) DO UPDATE SET posts = posts + 1, chars = chars + excluded.chars;
+        END;
+        {"" if exists else REBUILD_ACTIVITY_STATS_SQL}
+        COMMIT;
+        """
+    )
+
+
+# 이 프로세스에서 이미 만든 스키마 (파일이 지워지면 다시 만든다)
+_schema_ready: set[str] = set()
+_schema_ready_lock = threading.Lock()
+
+
+def _schema_is_ready(path: str) -> bool:
+    path = os.path.abspath(path)
+    with _schema_ready_lock:
+        if path in _schema_ready and os.path.exists(path):
+            return True
+        _schema_ready.discard(path)
+        return False
+
+
+def _mark_schema_ready(path: str):
+    with _schema_ready_lock:
+        _schema_ready.add(os.path.abspath(path))
+
+
 def ensure_blogs_table():
+    if _schema_is_ready(blog_db_path()):
+        return
     conn = get_blog_conn()
     cur = conn.cursor()
     cur.execute(
@@ -50,8 +259,11 @@ def ensure_blogs_table():
         )
         """
     )
+    if sync_enabled():
+        ensure_sync_outbox(conn, "blogs")
     conn.commit()
     conn.close()
+    _mark_schema_ready(blog_db_path())
 
 
 def ensure_posts_table():
@@ -70,11 +282,16 @@ def ensure_posts_table():
         )
         """
     )
+    if sync_enabled():
+        ensure_sync_outbox(conn, "posts")
     conn.commit()
     conn.close()
 
 
 def ensure_posts_table_for(blog_url: str):
+    path = post_db_path_for(blog_url)
+    if _schema_is_ready(path):
+        return
     conn = get_post_conn_for(blog_url)
     cur = conn.cursor()
     cur.execute(
@@ -90,19 +307,52 @@ def ensure_posts_table_for(blog_url: str):
         )
         """
     )
+    try:
+        # Postgres 의 posts_dedup_key 와 같은 중복 방지 키 (ingest_writer 의 INSERT OR IGNORE 가 의존)
+        cur.execute("CREATE UNIQUE INDEX IF NOT EXISTS posts_dedup_key ON posts(blog_name, title, date)")
+    except sqlite3.IntegrityError:
+        # 이미 중복 행이 들어 있는 옛 DB: 조회용 인덱스만 두고 writer 의 NOT EXISTS 로 막는다
+        cur.execute("CREATE INDEX IF NOT EXISTS posts_dedup_lookup ON posts(blog_name, title, date)")
+    if sync_enabled():
+        ensure_sync_outbox(conn, "posts")
     conn.commit()
+    # 읽기와 ingest_writer 의 쓰기가 서로 막지 않도록 WAL (DB 파일에 저장되는 설정)
+    conn.execute("PRAGMA journal_mode=WAL")
+    ensure_activity_stats(conn)
     conn.close()
+    _mark_schema_ready(path)
 
 
-def load_blogs():
-    conn = get_blog_conn()
+# 읽기 결과는 namedtuple(__slots__ = ()) 로 돌려준다: dict 보다 가볍고 필드 이름으로 접근 가능
+BlogRow = namedtuple("BlogRow", "id name url")
+PostRow = namedtuple("PostRow", "blog_name title date content link created_at")
+ChatRow = namedtuple("ChatRow", "session_id role content timestamp")
+
+DEFAULT_CHUNK_SIZE = 500
+
+
+def _iter_rows(conn, sql: str, params, row_type, chunk_size: int = DEFAULT_CHUNK_SIZE):
+    # 연결은 제너레이터가 소진되거나 close() 될 때 닫힌다.
     try:
-        df = pd.read_sql_query("SELECT id, name, url FROM blogs ORDER BY id DESC", conn)
-        return df.to_dict("records") if not df.empty else []
+        cur = conn.execute(sql, params)
+        while True:
+            rows = cur.fetchmany(chunk_size)
+            if not rows:
+                break
+            for r in rows:
+                yield row_type._make(r)
     finally:
         conn.close()
 
 
+def iter_blogs(chunk_size: int = DEFAULT_CHUNK_SIZE):
+    return _iter_rows(get_blog_conn(), "SELECT id, name, url FROM blogs ORDER BY id DESC", (), BlogRow, chunk_size)
+
+
+def load_blogs():
+    return [r._asdict() for r in iter_blogs()]
+
+
 def add_blog(name: str, url: str, created_at: str):
     conn = get_blog_conn()
     try:
@@ -112,96 +362,147 @@ def add_blog(name: str, url: str, created_at: str):
             (name, url, created_at),
         )
         conn.commit()
+        bump_write_generation(blog_db_path())
     finally:
         conn.close()
 
 
+def _posts_sql(start_date: date, end_date: date, keyword: str, blog_name: str | None = None):
+    where = ["date BETWEEN ? AND ?"]
+    params = [start_date.isoformat(), end_date.isoformat()]
+    if blog_name:
+        where.append("blog_name = ?")
+        params.append(blog_name)
+    kw = (keyword or "").strip()
+    if kw:
+        where.append("(title LIKE ? OR content LIKE ?)" )
+        like = f"%{kw}%"
+        params.extend([like, like])
+    sql = (
+        "SELECT blog_name, title, date, content, link, created_at FROM posts WHERE "
+        + " AND ".join(where)
+        + " ORDER BY date DESC, created_at DESC"
+    )
+    return sql, params
+
+
+def iter_posts(blog_name: str | None, start_date: date, end_date: date, keyword: str,
+               chunk_size: int = DEFAULT_CHUNK_SIZE):
+    sql, params = _posts_sql(start_date, end_date, keyword, blog_name)
+    return _iter_rows(get_post_conn(), sql, params, PostRow, chunk_size)
+
+
 def query_posts(blog_name: str | None, start_date: date, end_date: date, keyword: str):
-    conn = get_post_conn()
+    return [r._asdict() for r in iter_posts(blog_name, start_date, end_date, keyword)]
+
+
+def _migrate_from_global_if_empty(conn, blog_url: str):
+    # auto-migrate from global DB if this blog DB is empty and global has data
     try:
-        where = ["date BETWEEN ? AND ?"]
-        params = [start_date.isoformat(), end_date.isoformat()]
+        cur = conn.cursor()
+        cur.execute("SELECT COUNT(*) FROM posts")
+        count = cur.fetchone()[0]
+    except Exception:
+        count = 0
+    if count != 0:
+        return
+    try:
+        # lookup blog_name by url from blogs table
+        bconn = get_blog_conn()
+        bcur = bconn.cursor()
+        bcur.execute("SELECT name FROM blogs WHERE url = ? LIMIT 1", (blog_url,))
+        row = bcur.fetchone()
+        bconn.close()
+        blog_name = row[0] if row else None
         if blog_name:
-            where.append("blog_name = ?")
-            params.append(blog_name)
-        kw = (keyword or "").strip()
-        if kw:
-            where.append("(title LIKE ? OR content LIKE ?)" )
-            like = f"%{kw}%"
-            params.extend([like, like])
-        sql = (
-            "SELECT blog_name, title, date, content, link, created_at FROM posts WHERE "
-            + " AND ".join(where)
-            + " ORDER BY date DESC, created_at DESC"
-        )
-        df = pd.read_sql_query(sql, conn, params=params)
-        return df.to_dict("records") if not df.empty else []
-    finally:
-        conn.close()
+            gconn = get_post_conn()
+            gcur = gconn.cursor()
+            gcur.execute("SELECT blog_name, title, date, content, link, created_at FROM posts WHERE blog_name = ?", (blog_name,))
+            rows = gcur.fetchall()
+            gconn.close()
+            if rows:
+                cur2 = conn.cursor()
+                for r in rows:
+                    # r: (blog_name, title, date, content, link, created_at)
+                    cur2.execute(
+                        "SELECT 1 FROM posts WHERE blog_name = ? AND title = ? AND date = ? LIMIT 1",
+                        (r[0], r[1], r[2]),
+                    )
+                    if cur2.fetchone() is None:
+                        cur2.execute(
+                            "INSERT INTO posts(blog_name, title, date, content, link, created_at) VALUES(?,?,?,?,?,?)",
+                            r,
+                        )
+                conn.commit()
+    except Exception:
+        pass
 
 
-def query_posts_for_blog(blog_url: str | None, start_date: date, end_date: date, keyword: str):
+def iter_posts_for_blog(blog_url: str | None, start_date: date, end_date: date, keyword: str,
+                        chunk_size: int = DEFAULT_CHUNK_SIZE):
     if not blog_url:
         # fallback to global db
-        return query_posts(None, start_date, end_date, keyword)
+        return iter_posts(None, start_date, end_date, keyword, chunk_size)
     # ensure table exists for this blog DB
     ensure_posts_table_for(blog_url)
     conn = get_post_conn_for(blog_url)
     try:
-        # auto-migrate from global DB if this blog DB is empty and global has data
-        try:
-            cur = conn.cursor()
-            cur.execute("SELECT COUNT(*) FROM posts")
-            count = cur.fetchone()[0]
-        except Exception:
-            count = 0
-        if count == 0:
-            try:
-                # lookup blog_name by url from blogs table
-                bconn = get_blog_conn()
-                bcur = bconn.cursor()
-                bcur.execute("SELECT name FROM blogs WHERE url = ? LIMIT 1", (blog_url,))
-                row = bcur.fetchone()
-                bconn.close()
-                blog_name = row[0] if row else None
-                if blog_name:
-                    gconn = get_post_conn()
-                    gcur = gconn.cursor()
-                    gcur.execute("SELECT blog_name, title, date, content, link, created_at FROM posts WHERE blog_name = ?", (blog_name,))
-                    rows = gcur.fetchall()
-                    gconn.close()
-                    if rows:
-                        cur2 = conn.cursor()
-                        for r in rows:
-                            # r: (blog_name, title, date, content, link, created_at)
-                            cur2.execute(
-                                "SELECT 1 FROM posts WHERE blog_name = ? AND title = ? AND date = ? LIMIT 1",
-                                (r[0], r[1], r[2]),
-                            )
-                            if cur2.fetchone() is None:
-                                cur2.execute(
-                                    "INSERT INTO posts(blog_name, title, date, content, link, created_at) VALUES(?,?,?,?,?,?)",
-                                    r,
-                                )
-                        conn.commit()
-            except Exception:
-                pass
-        where = ["date BETWEEN ? AND ?"]
-        params = [start_date.isoformat(), end_date.isoformat()]
-        kw = (keyword or "").strip()
-        if kw:
-            where.append("(title LIKE ? OR content LIKE ?)" )
-            like = f"%{kw}%"
-            params.extend([like, like])
-        sql = (
-            "SELECT blog_name, title, date, content, link, created_at FROM posts WHERE "
-            + " AND ".join(where)
-            + " ORDER BY date DESC, created_at DESC"
+        _migrate_from_global_if_empty(conn, blog_url)
+    except BaseException:
+        conn.close()
+        raise
+    sql, params = _posts_sql(start_date, end_date, keyword)
+    return _iter_rows(conn, sql, params, PostRow, chunk_size)
+
+
+def query_posts_for_blog(blog_url: str | None, start_date: date, end_date: date, keyword: str):
+    return [r._asdict() for r in iter_posts_for_blog(blog_url, start_date, end_date, keyword)]
+
+
+def semantic_search_posts(blog_url: str, query: str, start_date: date, end_date: date, k: int = 30) -> list[dict]:
+    # numpy 는 의미 검색을 실제로 쓸 때만 로드한다.
+    import semantic_index
+
+    semantic_index.update_index(blog_url)
+    hits = semantic_index.search(blog_url, query, start_date, end_date, k)
+    if not hits:
+        return []
+    conn = get_post_conn_for(blog_url)
+    try:
+        ids = [pid for pid, _ in hits]
+        cur = conn.execute(
+            "SELECT id, blog_name, title, date, content, link, created_at FROM posts WHERE id IN (%s)"
+            % ",".join("?" for _ in ids),
+            ids,
         )
-        df = pd.read_sql_query(sql, conn, params=params)
-        return df.to_dict("records") if not df.empty else []
+        by_id = {r[0]: PostRow._make(r[1:]) for r in cur.fetchall()}
     finally:
         conn.close()
+    out = []
+    for pid, score in hits:
+        row = by_id.get(pid)
+        if row is not None:
+            d = row._asdict()
+            d["score"] = score
+            out.append(d)
+    return out
+
+
+# 글이 커밋된 뒤 실행할 후처리 (색인 갱신 등). fn(blog_url) 형태.
+_post_commit_hooks: list = []
+
+
+def register_post_commit_hook(fn):
+    if fn not in _post_commit_hooks:
+        _post_commit_hooks.append(fn)
+
+
+def run_post_commit_hooks(blog_url: str):
+    for fn in list(_post_commit_hooks):
+        try:
+            fn(blog_url)
+        except Exception:
+            pass
 
 
 def is_duplicate(cur, blog_name: str, title: str, d: str) -> bool:
@@ -213,12 +514,21 @@ def is_duplicate(cur, blog_name: str, title: str, d: str) -> bool:
 
 
 def save_post(cur, blog_name: str, title: str, d: str, content: str, link: str):
+    # 커밋은 호출한 쪽에서 commit_posts 로 (쓰기 세대도 그때 올린다)
     cur.execute(
         "INSERT INTO posts(blog_name, title, date, content, link, created_at) VALUES(?,?,?,?,?,?)",
-        (blog_name, title, d, content, link, pd.Timestamp.utcnow().isoformat()),
+        (blog_name, title, d, content, link, datetime.now(timezone.utc).isoformat()),
     )
 
 
+def commit_posts(conn):
+    # 커밋 전에 세대를 올리면 다른 세션이 아직 보이지 않는 쓰기를 새 세대 키로 캐시할 수 있다
+    conn.commit()
+    path = _conn_path(conn)
+    if path:
+        bump_write_generation(path)
+
+
 def create_chats_table():
     conn = get_blog_conn()
     cur = conn.cursor()
@@ -243,21 +553,22 @@ def save_chat_history(session_id: str, role: str, content: str):
         cur = conn.cursor()
         cur.execute(
             "INSERT INTO chats(session_id, role, content, timestamp) VALUES (?, ?, ?, ?)",
-            (session_id, role, content, pd.Timestamp.now().isoformat()),
+            (session_id, role, content, datetime.now().isoformat()),
         )
         conn.commit()
     finally:
         conn.close()
 
 
+def iter_chat_history(session_id: str, chunk_size: int = DEFAULT_CHUNK_SIZE):
+    return _iter_rows(
+        get_blog_conn(),
+        "SELECT session_id, role, content, timestamp FROM chats WHERE session_id = ? ORDER BY timestamp ASC",
+        (session_id,),
+        ChatRow,
+        chunk_size,
+    )
+
+
 def load_chat_history(session_id: str):
-    conn = get_blog_conn()
-    try:
-        df = pd.read_sql_query(
-            "SELECT session_id, role, content, timestamp FROM chats WHERE session_id = ? ORDER BY timestamp ASC",
-            conn,
-            params=(session_id,),
-        )
-        return df.to_dict("records") if not df.empty else []
-    finally:
-        conn.close()
+    return [r._asdict() for r in iter_chat_history(session_id)]
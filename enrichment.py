@@ -0,0 +1,256 @@
+import argparse
+import hashlib
+import os
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta, timezone
+
+import db_manager as dbm
+from text_utils import estimate_tokens, tokenize_ko
+
+KEYWORDS_PER_POST = 10
+TITLE_WEIGHT = 3
+BATCH_SIZE = 200
+# 요약이 없는 글은 본문 앞부분을 이만큼 넣는다 (BM25 청크와 비슷한 길이)
+EXCERPT_CHARS = 800
+# 요약에 실패한 글은 이 시간 동안 다시 시도하지 않고, 이 횟수만큼 실패하면 CLI 의 --retry-failed 로만 다시 시도한다
+SUMMARY_RETRY_HOURS = 24
+SUMMARY_MAX_ATTEMPTS = 3
+
+
+def ensure_enrichment_table(conn):
+    conn.executescript(
+        """
+        CREATE TABLE IF NOT EXISTS post_enrichment (
+            post_id INTEGER PRIMARY KEY,
+            content_hash TEXT NOT NULL,
+            keywords TEXT NOT NULL,
+            token_count INTEGER NOT NULL,
+            summary TEXT,
+            summary_tokens INTEGER,
+            summary_model TEXT,
+            summary_attempts INTEGER NOT NULL DEFAULT 0,
+            summary_failed_at TEXT,
+            enriched_at TEXT NOT NULL
+        );
+        """
+    )
+    # 실패 기록 열이 없던 테이블
+    cols = {r[1] for r in conn.execute("PRAGMA table_info(post_enrichment)")}
+    if "summary_attempts" not in cols:
+        conn.execute("ALTER TABLE post_enrichment ADD COLUMN summary_attempts INTEGER NOT NULL DEFAULT 0")
+        conn.execute("ALTER TABLE post_enrichment ADD COLUMN summary_failed_at TEXT")
+        conn.commit()
+
+
+def content_hash(title: str, content: str) -> str:
+    return hashlib.sha1(f"{title}\n{content}".encode("utf-8")).hexdigest()
+
+
+def extract_keywords(title: str, content: str, n: int = KEYWORDS_PER_POST) -> list[str]:
+    tf = Counter(tokenize_ko(content, bigrams=False))
+    for t in tokenize_ko(title, bigrams=False):
+        tf[t] += TITLE_WEIGHT
+    return [t for t, _ in tf.most_common(n)]
+
+
+def forget_posts(conn, post_ids: list[int]):
+    # 내용이 바뀐 글은 지워 두면 다음 enrich_blog 에서 다시 처리된다
+    ensure_enrichment_table(conn)
+    conn.executemany("DELETE FROM post_enrichment WHERE post_id = ?", [(pid,) for pid in post_ids])
+
+
+def summaries_enabled() -> bool:
+    # 요약은 글마다 Gemini 호출이 들어가므로 켜야만 수집 직후에 만든다
+    v = os.environ.get("ENRICH_SUMMARIES", "").strip().lower()
+    return v in {"1", "true", "yes", "on"} and bool(os.environ.get("GEMINI_API_KEY"))
+
+
+def _summarize(models, d: str, title: str, content: str) -> tuple[str, str]:
+    # map_reduce 의 요약(map) 단계와 같은 프롬프트/단위를 써서 요약 캐시를 함께 쓴다
+    import map_reduce
+    units = map_reduce.map_units([dbm.PostRow("", title, d, content, "", "")])
+    outs = [map_reduce._cached_call(models, map_reduce.MAP_PROMPT_VERSION, map_reduce.MAP_PROMPT, u)[0] for u in units]
+    return "\n".join(o.strip() for o in outs if o.strip()), map_reduce.MAP_PROMPT_VERSION
+
+
+def enrich_blog(blog_url: str, summarize: bool = False, api_key: str | None = None, models=None,
+                workers: int = 4, limit: int | None = None, retry_failed: bool = False) -> dict:
+    # 아직 처리하지 않은 글만 처리한다. summarize=True 면 요약이 없는 글도 채운다.
+    # 요약에 실패했던 글은 SUMMARY_RETRY_HOURS 가 지난 뒤, SUMMARY_MAX_ATTEMPTS 번까지만 다시 시도한다
+    # (retry_failed=True 면 바로 다시 시도)
+    stats = {"keywords": 0, "summaries": 0, "failed": 0}
+    db_path = dbm.post_db_path_for(blog_url)
+    if not os.path.exists(db_path):
+        return stats
+    if summarize and models is None:
+        import ai_client
+        models = ai_client.gemini_models(api_key or os.environ.get("GEMINI_API_KEY", ""))
+    conn = dbm.get_post_conn_for(blog_url)
+    try:
+        ensure_enrichment_table(conn)
+        cond = "e.post_id IS NULL"
+        params: list = []
+        if summarize and retry_failed:
+            cond += " OR e.summary IS NULL"
+        elif summarize:
+            cond += (" OR (e.summary IS NULL AND e.summary_attempts < ? "
+                     "AND (e.summary_failed_at IS NULL OR e.summary_failed_at < ?))")
+            cutoff = datetime.now(timezone.utc) - timedelta(hours=SUMMARY_RETRY_HOURS)
+            params = [SUMMARY_MAX_ATTEMPTS, cutoff.isoformat()]
+        last_id = 0
+        done = 0
+        while limit is None or done < limit:
+            n = BATCH_SIZE if limit is None else min(BATCH_SIZE, limit - done)
+            rows = conn.execute(
+                "SELECT p.id, p.date, p.title, p.content FROM posts p "
+                "LEFT JOIN post_enrichment e ON e.post_id = p.id "
+                f"WHERE p.id > ? AND ({cond}) ORDER BY p.id LIMIT ?",
+                (last_id, *params, n),
+            ).fetchall()
+            if not rows:
+                break
+            last_id = rows[-1][0]
+            todo = [(pid, d, title or "", content or "") for pid, d, title, content in rows]
+            summaries = {}
+            if summarize and todo:
+                with ThreadPoolExecutor(max_workers=max(1, workers)) as ex:
+                    futures = {ex.submit(_summarize, models, d, title, content): pid for pid, d, title, content in todo}
+                    for fut, pid in futures.items():
+                        try:
+                            summaries[pid] = fut.result()
+                        except Exception:
+                            stats["failed"] += 1
+            now = datetime.now(timezone.utc).isoformat()
+            for pid, d, title, content in todo:
+                summary, model = summaries.get(pid, (None, None))
+                failed_at = now if summarize and pid not in summaries else None
+                conn.execute(
+                    "INSERT INTO post_enrichment(post_id, content_hash, keywords, token_count, summary, "
+                    "summary_tokens, summary_model, summary_attempts, summary_failed_at, enriched_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT(post_id) DO UPDATE SET content_hash = excluded.content_hash, "
+                    "keywords = excluded.keywords, token_count = excluded.token_count, "
+                    "summary = excluded.summary, summary_tokens = excluded.summary_tokens, "
+                    "summary_model = excluded.summary_model, "
+                    "summary_attempts = CASE WHEN excluded.summary_failed_at IS NULL THEN 0 "
+                    "ELSE post_enrichment.summary_attempts + 1 END, "
+                    "summary_failed_at = excluded.summary_failed_at, "
+                    "enriched_at = excluded.enriched_at",
+                    (pid, content_hash(title, content), ",".join(extract_keywords(title, content)), estimate_tokens(content),
+                     summary, estimate_tokens(summary) if summary else None, model,
+                     0 if failed_at is None else 1, failed_at, now),
+                )
+                stats["keywords"] += 1
+                if summary:
+                    stats["summaries"] += 1
+            conn.commit()
+            done += len(todo)
+    finally:
+        conn.close()
+    return stats
+
+
+def load_summaries(blog_url: str, start_date: date, end_date: date) -> dict[tuple[str, str], tuple[str, str]]:
+    # (title, date) -> (content_hash, summary). 요약이 있는 글만.
+    db_path = dbm.post_db_path_for(blog_url)
+    if not os.path.exists(db_path):
+        return {}
+    conn = dbm.get_post_conn_for(blog_url)
+    try:
+        ensure_enrichment_table(conn)
+        rows = conn.execute(
+            "SELECT p.title, p.date, e.content_hash, e.summary FROM posts p JOIN post_enrichment e ON e.post_id = p.id "
+            "WHERE p.date BETWEEN ? AND ? AND e.summary IS NOT NULL",
+            (start_date.isoformat(), end_date.isoformat()),
+        ).fetchall()
+    finally:
+        conn.close()
+    return {(t, d): (h, s) for t, d, h, s in rows}
+
+
+def summary_lookup(blog_url: str, start_date: date, end_date: date):
+    # map_reduce.build_context(summary_for=...) 에 넘길 함수. 내용이 바뀐 글은 None.
+    known = load_summaries(blog_url, start_date, end_date)
+
+    def summary_for(r) -> str | None:
+        hit = known.get((r.title, r.date))
+        if hit and hit[0] == content_hash(r.title or "", str(r.content or "")):
+            return hit[1]
+        return None
+
+    return summary_for
+
+
+def build_context(blog_url: str, question: str, start_date: date, end_date: date,
+                  token_budget: int = 6000) -> dict:
+    # 원문 대신 미리 만든 요약을 질문 관련도(BM25) -> 최신 순으로 채운다.
+    # 요약이 없는 글(ENRICH_SUMMARIES 를 끈 기본 설정)은 질문과 가장 관련된 BM25 청크, 없으면 본문 앞부분을 넣는다.
+    import bm25_index
+    conn = dbm.get_post_conn_for(blog_url)
+    try:
+        ensure_enrichment_table(conn)
+        rows = conn.execute(
+            "SELECT p.id, p.date, p.title, e.summary, substr(p.content, 1, ?) FROM posts p "
+            "LEFT JOIN post_enrichment e ON e.post_id = p.id WHERE p.date BETWEEN ? AND ? "
+            "ORDER BY p.date DESC, p.id DESC",
+            (EXCERPT_CHARS, start_date.isoformat(), end_date.isoformat()),
+        ).fetchall()
+    finally:
+        conn.close()
+    by_id = {r[0]: r for r in rows}
+    order = []
+    best_chunk: dict[int, str] = {}
+    if (question or "").strip():
+        bm25_index.update_index(blog_url)
+        for c in bm25_index.search(blog_url, question, start_date, end_date, k=200):
+            if c["post_id"] in by_id and c["post_id"] not in best_chunk:
+                order.append(c["post_id"])
+                best_chunk[c["post_id"]] = c["text"]
+    seen = set(order)
+    order.extend(r[0] for r in rows if r[0] not in seen)
+
+    parts = []
+    used = 0
+    summarized = 0
+    for pid in order:
+        _pid, d, title, summary, excerpt = by_id[pid]
+        text = (summary or best_chunk.get(pid) or excerpt or "").strip()
+        if not text:
+            continue
+        block = f"[{d}] {title}\n{text}"
+        cost = estimate_tokens(block) + 2
+        if used + cost > token_budget:
+            continue
+        parts.append(block)
+        used += cost
+        summarized += 1 if summary else 0
+    return {"context": "\n\n".join(parts), "tokens": used, "posts": len(parts), "summarized": summarized}
+
+
+def _blog_url_for_path(path: str) -> str:
+    return f"https://blog.naver.com/{dbm.blog_id_from_db_path(path)}"
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Compute per-post keywords, token counts and summaries for posts_*.db")
+    ap.add_argument("--blog", help="blog URL (default: every posts_*.db in the current directory)")
+    ap.add_argument("--no-summaries", action="store_true", help="키워드/토큰 수만 계산")
+    ap.add_argument("--workers", type=int, default=4)
+    ap.add_argument("--limit", type=int, help="블로그당 최대 처리 글 수")
+    ap.add_argument("--retry-failed", action="store_true", help="요약에 실패했던 글도 대기 시간/횟수와 상관없이 다시 시도")
+    args = ap.parse_args(argv)
+
+    summarize = not args.no_summaries
+    if summarize and not os.environ.get("GEMINI_API_KEY"):
+        raise SystemExit("GEMINI_API_KEY is required for summaries (or pass --no-summaries)")
+    urls = [args.blog] if args.blog else [_blog_url_for_path(p) for p in dbm.list_post_db_paths()]
+    for url in urls:
+        stats = enrich_blog(url, summarize=summarize, workers=args.workers, limit=args.limit,
+                            retry_failed=args.retry_failed)
+        print(f"{dbm.blog_key_for(url)}: keywords {stats['keywords']}, summaries {stats['summaries']}, "
+              f"failed {stats['failed']}")
+
+
+if __name__ == "__main__":
+    main()
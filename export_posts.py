@@ -0,0 +1,259 @@
+import argparse
+import csv
+import json
+import os
+import sqlite3
+import sys
+from datetime import date
+
+import db_manager as dbm
+
+EXPORT_COLUMNS = ["source", "id", "blog_name", "title", "date", "content", "link", "created_at"]
+DEFAULT_STATE_FILE = ".export_state.json"
+
+
+def load_watermarks(state_path: str) -> dict:
+    if not state_path or not os.path.exists(state_path):
+        return {}
+    try:
+        with open(state_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return data if isinstance(data, dict) else {}
+    except Exception:
+        return {}
+
+
+def save_watermarks(state_path: str, marks: dict):
+    tmp = state_path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(marks, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, state_path)
+
+
+def select_db_files(blogs: list[str] | None, base_dir: str | None = None) -> list[tuple[str, list[str]]]:
+    # (파일, blog_name 필터) 목록. --blog 값이 posts_<id>.db 의 id와 일치하면 그 파일 전체를,
+    # 아니면 blog_name 필터로 나머지 파일에서 찾는다
+    paths = dbm.list_post_db_paths(base_dir)
+    if not blogs:
+        return [(p, []) for p in paths]
+    by_id = {dbm.blog_id_from_db_path(p): p for p in paths}
+    picked = {by_id[b] for b in blogs if b in by_id}
+    names = [b for b in blogs if b not in by_id]
+    out = [(p, []) for p in sorted(picked)]
+    if names:
+        out += [(p, names) for p in paths if p not in picked]
+    return sorted(out)
+
+
+def watermark_key(path: str, start_date: date | None, end_date: date | None, blog_names: list[str]) -> str:
+    # 필터가 있으면 필터별로 따로 둔다 (필터에 걸러진 행을 건너뛴 채로 watermark 가 넘어가지 않게)
+    key = os.path.basename(path)
+    if start_date or end_date or blog_names:
+        key += "|" + json.dumps([start_date and start_date.isoformat(), end_date and end_date.isoformat(),
+                                 sorted(blog_names)], ensure_ascii=False)
+    return key
+
+
+def iter_export_rows(
+    db_path: str,
+    start_date: date | None = None,
+    end_date: date | None = None,
+    blog_names: list[str] | None = None,
+    after_id: int = 0,
+    chunk_size: int = 1000,
+):
+    source = dbm.blog_id_from_db_path(db_path)
+    conn = sqlite3.connect(db_path)
+    try:
+        cur = conn.cursor()
+        cur.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='posts'")
+        if cur.fetchone() is None:
+            return
+        where = ["id > ?"]
+        params: list = [int(after_id or 0)]
+        if start_date:
+            where.append("date >= ?")
+            params.append(start_date.isoformat())
+        if end_date:
+            where.append("date <= ?")
+            params.append(end_date.isoformat())
+        if blog_names:
+            where.append("blog_name IN (%s)" % ",".join("?" for _ in blog_names))
+            params.extend(blog_names)
+        cur.execute(
+            "SELECT id, blog_name, title, date, content, link, created_at FROM posts WHERE "
+            + " AND ".join(where)
+            + " ORDER BY id ASC",
+            params,
+        )
+        while True:
+            rows = cur.fetchmany(chunk_size)
+            if not rows:
+                break
+            yield [(source,) + tuple(r) for r in rows]
+    finally:
+        conn.close()
+
+
+class JsonlSink:
+    def __init__(self, path: str):
+        self.f = open(path, "w", encoding="utf-8")
+
+    def write(self, rows: list[tuple]):
+        for r in rows:
+            self.f.write(json.dumps(dict(zip(EXPORT_COLUMNS, r)), ensure_ascii=False))
+            self.f.write("\n")
+
+    def close(self):
+        self.f.close()
+
+
+class CsvSink:
+    def __init__(self, path: str):
+        # utf-8-sig: 엑셀에서 한글이 깨지지 않도록 BOM 포함
+        self.f = open(path, "w", encoding="utf-8-sig", newline="")
+        self.w = csv.writer(self.f)
+        self.w.writerow(EXPORT_COLUMNS)
+
+    def write(self, rows: list[tuple]):
+        self.w.writerows(rows)
+
+    def close(self):
+        self.f.close()
+
+
+class ParquetSink:
+    def __init__(self, path: str, row_group_size: int = 50000):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise SystemExit("Parquet export requires pyarrow (pip install pyarrow)")
+        self.pa = pa
+        self.schema = pa.schema([
+            ("source", pa.string()),
+            ("id", pa.int64()),
+            ("blog_name", pa.string()),
+            ("title", pa.string()),
+            ("date", pa.string()),
+            ("content", pa.string()),
+            ("link", pa.string()),
+            ("created_at", pa.string()),
+        ])
+        self.writer = pq.ParquetWriter(path, self.schema, compression="zstd")
+        self.row_group_size = max(1, int(row_group_size))
+        self.pending: list[tuple] = []
+
+    def write(self, rows: list[tuple]):
+        self.pending.extend(rows)
+        while len(self.pending) >= self.row_group_size:
+            self._flush(self.pending[: self.row_group_size])
+            self.pending = self.pending[self.row_group_size:]
+
+    def _flush(self, rows: list[tuple]):
+        if not rows:
+            return
+        cols = list(zip(*rows))
+        table = self.pa.Table.from_arrays(
+            [self.pa.array(list(c), type=f.type) for c, f in zip(cols, self.schema)],
+            schema=self.schema,
+        )
+        self.writer.write_table(table, row_group_size=len(rows))
+
+    def close(self):
+        self._flush(self.pending)
+        self.pending = []
+        self.writer.close()
+
+
+def open_sink(path: str, fmt: str, row_group_size: int):
+    if fmt == "parquet":
+        return ParquetSink(path, row_group_size)
+    if fmt == "jsonl":
+        return JsonlSink(path)
+    if fmt == "csv":
+        return CsvSink(path)
+    raise SystemExit(f"Unknown format: {fmt}")
+
+
+def guess_format(path: str) -> str:
+    ext = os.path.splitext(path)[1].lower()
+    return {".parquet": "parquet", ".pq": "parquet", ".jsonl": "jsonl", ".ndjson": "jsonl", ".csv": "csv"}.get(ext, "jsonl")
+
+
+def export_posts(
+    output: str,
+    fmt: str | None = None,
+    start_date: date | None = None,
+    end_date: date | None = None,
+    blogs: list[str] | None = None,
+    chunk_size: int = 1000,
+    row_group_size: int = 50000,
+    incremental: bool = False,
+    state_path: str = DEFAULT_STATE_FILE,
+    base_dir: str | None = None,
+    log=print,
+) -> dict:
+    fmt = fmt or guess_format(output)
+    files = select_db_files(blogs, base_dir)
+    marks = load_watermarks(state_path) if incremental else {}
+    new_marks = dict(marks)
+    counts: dict[str, int] = {}
+    sink = open_sink(output, fmt, row_group_size)
+    try:
+        for path, blog_names in files:
+            key = watermark_key(path, start_date, end_date, blog_names)
+            after = int(marks.get(key, 0)) if incremental else 0
+            n = 0
+            for rows in iter_export_rows(path, start_date, end_date, blog_names, after, chunk_size):
+                sink.write(rows)
+                n += len(rows)
+                # rows are ordered by id, so the last row carries the new watermark
+                new_marks[key] = max(int(new_marks.get(key, 0)), int(rows[-1][1]))
+            counts[os.path.basename(path)] = n
+            if log:
+                log(f"{os.path.basename(path)}: exported {n} rows (after id {after})")
+    finally:
+        sink.close()
+    # watermark는 출력 파일이 정상적으로 닫힌 뒤에만 갱신
+    if incremental:
+        save_watermarks(state_path, new_marks)
+    return {"files": len(files), "rows": sum(counts.values()), "per_file": counts}
+
+
+def _parse_date(s: str | None) -> date | None:
+    return date.fromisoformat(s) if s else None
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Stream posts from posts_*.db files to Parquet, JSONL or CSV")
+    ap.add_argument("output", help="output file path (.parquet, .jsonl, .csv)")
+    ap.add_argument("--format", choices=["parquet", "jsonl", "csv"], default=None)
+    ap.add_argument("--start", help="start date (YYYY-MM-DD)")
+    ap.add_argument("--end", help="end date (YYYY-MM-DD)")
+    ap.add_argument("--blog", action="append", help="blog id (posts_<id>.db) or blog name; repeatable")
+    ap.add_argument("--chunk-size", type=int, default=1000, help="rows per fetchmany() call")
+    ap.add_argument("--row-group-size", type=int, default=50000, help="Parquet row group size")
+    ap.add_argument("--incremental", action="store_true", help="only export rows with id above the saved watermark (kept per file and filter)")
+    ap.add_argument("--state", default=DEFAULT_STATE_FILE, help="watermark state file for --incremental")
+    ap.add_argument("--dir", default=None, help="directory containing posts_*.db (default: cwd)")
+    args = ap.parse_args(argv)
+
+    res = export_posts(
+        args.output,
+        fmt=args.format,
+        start_date=_parse_date(args.start),
+        end_date=_parse_date(args.end),
+        blogs=args.blog,
+        chunk_size=args.chunk_size,
+        row_group_size=args.row_group_size,
+        incremental=args.incremental,
+        state_path=args.state,
+        base_dir=args.dir,
+    )
+    print(f"Exported {res['rows']} rows from {res['files']} files to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,372 @@
+import codecs
+import os
+import socket
+import ssl
+import threading
+import time
+from collections import namedtuple
+from urllib.parse import urlparse
+
+# fetch() 아래의 HTTP 계층. httpx(+h2) 가 있으면 HTTP/2, 없으면 requests(HTTP/1.1) 로 동작한다.
+# 호스트마다 크기를 정한 연결 풀을 하나씩 두고 프로세스 내내 재사용한다 (블로그가 바뀌어도,
+# 한 블로그 수집이 실패해도 닫지 않는다). 핸드셰이크는 연결 재사용으로 줄인다: SSLContext(인증서 로딩)는
+# 공유하지만 TLS 세션 재개(resumption)는 하지 않는다.
+# DNS 결과는 이 Transport 의 httpx 연결에만 캐시한다 (socket.getaddrinfo 는 건드리지 않는다).
+POOL_PER_HOST = int(os.environ.get("HTTP_POOL_PER_HOST", "4"))
+KEEPALIVE_SECONDS = 60.0
+# getaddrinfo 는 레코드 TTL 을 알려주지 않으므로 짧게 잡고, 연결에 실패하면 바로 버린다
+DNS_TTL_SECONDS = 60.0
+TIMEOUT_SECONDS = 15.0
+# 본문을 끝까지 읽지 않고 조금씩 받는다. Content-Type 별 최대 크기 (넘으면 거기서 자른다)
+STREAM_CHUNK = 16 * 1024
+SIZE_CAPS = {
+    "text/html": 3 * 1024 * 1024,
+    "application/xhtml+xml": 3 * 1024 * 1024,
+    "text/xml": 5 * 1024 * 1024,
+    "application/xml": 5 * 1024 * 1024,
+    "application/rss+xml": 5 * 1024 * 1024,
+}
+DEFAULT_SIZE_CAP = 2 * 1024 * 1024
+# 중간에 끊으면 HTTP/1.1 연결은 버려진다 (HTTP/2 는 스트림만 닫힌다). 남은 양이 이보다 작으면 끝까지 읽고 연결을 살린다
+DRAIN_BELOW = 64 * 1024
+
+# text: 받은 만큼 디코딩한 본문, truncated: stop 신호나 크기 제한으로 중간에 끊었는지,
+# capped: 그중 크기 제한에 걸려 잘렸는지 (본문이 온전하지 않다)
+StreamResult = namedtuple("StreamResult", "status_code text headers truncated bytes_read capped")
+
+
+def size_cap_for(content_type: str | None) -> int:
+    return SIZE_CAPS.get((content_type or "").split(";")[0].strip().lower(), DEFAULT_SIZE_CAP)
+
+
+class DnsCache:
+    # (host, port) -> 주소 목록을 TTL 동안 재사용
+    def __init__(self, ttl: float = DNS_TTL_SECONDS):
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._cache: dict[tuple, tuple[float, list]] = {}
+        self._lock = threading.Lock()
+
+    def resolve(self, host: str, port: int) -> list[str]:
+        now = time.monotonic()
+        with self._lock:
+            hit = self._cache.get((host, port))
+            if hit and hit[0] > now:
+                self.hits += 1
+                return hit[1]
+        infos = socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+        addrs = list(dict.fromkeys(info[4][0] for info in infos))
+        with self._lock:
+            self.misses += 1
+            self._cache[(host, port)] = (now + self.ttl, addrs)
+        return addrs
+
+    def forget(self, host: str, port: int):
+        with self._lock:
+            self._cache.pop((host, port), None)
+
+
+def _caching_backend(dns: DnsCache):
+    # httpcore 의 네트워크 백엔드: 캐시한 주소로 TCP 연결만 맺는다 (SNI/인증서 확인은 원래 호스트 이름으로 한다)
+    import httpcore
+
+    class CachingBackend(httpcore.SyncBackend):
+        def connect_tcp(self, host, port, timeout=None, local_address=None, socket_options=None):
+            addrs = dns.resolve(host, port)
+            err = None
+            for addr in addrs:
+                try:
+                    return super().connect_tcp(addr, port, timeout, local_address, socket_options)
+                except httpcore.ConnectError as e:
+                    err = e
+            # 캐시한 주소가 모두 실패하면 다음 연결에서 다시 찾는다
+            dns.forget(host, port)
+            raise err or httpcore.ConnectError(f"no address for {host}")
+
+    return CachingBackend()
+
+
+def _pooled_transport(dns: DnsCache, ssl_context, http2: bool, pool_size: int):
+    # httpx.HTTPTransport 는 네트워크 백엔드를 바꿀 수 없으므로 httpcore.ConnectionPool 을 직접 감싼다
+    import httpcore
+    import httpx
+
+    def as_httpx_error(e: Exception, request):
+        # httpcore 예외를 같은 이름의 httpx 예외로 (없으면 TransportError)
+        return getattr(httpx, type(e).__name__, httpx.TransportError)(str(e), request=request)
+
+    class PoolStream(httpx.SyncByteStream):
+        def __init__(self, resp, request):
+            self.resp = resp
+            self.request = request
+
+        def __iter__(self):
+            try:
+                yield from self.resp.stream
+            except httpcore.TimeoutException as e:
+                raise as_httpx_error(e, self.request) from e
+            except (httpcore.NetworkError, httpcore.ProtocolError) as e:
+                raise as_httpx_error(e, self.request) from e
+
+        def close(self):
+            self.resp.close()
+
+    class PoolTransport(httpx.BaseTransport):
+        def __init__(self):
+            self.pool = httpcore.ConnectionPool(
+                ssl_context=ssl_context,
+                max_connections=pool_size,
+                max_keepalive_connections=pool_size,
+                keepalive_expiry=KEEPALIVE_SECONDS,
+                http1=True,
+                http2=http2,
+                network_backend=_caching_backend(dns),
+            )
+
+        def handle_request(self, request):
+            req = httpcore.Request(
+                method=request.method,
+                url=httpcore.URL(scheme=request.url.raw_scheme, host=request.url.raw_host,
+                                 port=request.url.port, target=request.url.raw_path),
+                headers=request.headers.raw,
+                content=request.stream,
+                extensions=request.extensions,
+            )
+            try:
+                resp = self.pool.handle_request(req)
+            except (httpcore.TimeoutException, httpcore.NetworkError, httpcore.ProtocolError,
+                    httpcore.UnsupportedProtocol) as e:
+                raise as_httpx_error(e, request) from e
+            return httpx.Response(resp.status, headers=resp.headers, stream=PoolStream(resp, request),
+                                  extensions=resp.extensions)
+
+        def close(self):
+            self.pool.close()
+
+    return PoolTransport()
+
+
+class HostStats:
+    __slots__ = ("requests", "connections", "tls_handshakes", "errors", "http2",
+                 "bytes_read", "bytes_saved", "cutoffs", "capped")
+
+    def __init__(self):
+        self.requests = 0
+        self.connections = 0
+        self.tls_handshakes = 0
+        self.errors = 0
+        self.http2 = 0
+        self.bytes_read = 0
+        # 일찍 끊어서 받지 않은 바이트 (Content-Length 를 알 때만 셀 수 있다)
+        self.bytes_saved = 0
+        self.cutoffs = 0
+        self.capped = 0
+
+
+class Transport:
+    def __init__(self, pool_per_host: int = POOL_PER_HOST, http2: bool | None = None):
+        self.pool_per_host = pool_per_host
+        self.dns = DnsCache()
+        self._clients: dict[str, object] = {}
+        self._stats: dict[str, HostStats] = {}
+        self._lock = threading.Lock()
+        try:
+            import httpx
+            self._httpx = httpx
+            self.backend = "httpx"
+        except ImportError:
+            self._httpx = None
+            self.backend = "requests"
+        self.http2 = False
+        if self._httpx is not None and http2 is not False:
+            try:
+                import h2  # noqa: F401  httpx 의 http2=True 에 필요
+                self.http2 = True
+            except ImportError:
+                pass
+        self._ssl = self._ssl_context()
+
+    def _ssl_context(self):
+        # 모든 호스트 클라이언트가 같은 SSLContext 를 쓴다 (인증서 로딩을 한 번만)
+        try:
+            import certifi
+            return ssl.create_default_context(cafile=certifi.where())
+        except ImportError:
+            return ssl.create_default_context()
+
+    def _stat(self, host: str) -> HostStats:
+        s = self._stats.get(host)
+        if s is None:
+            s = self._stats[host] = HostStats()
+        return s
+
+    def _client(self, host: str):
+        with self._lock:
+            c = self._clients.get(host)
+            if c is not None:
+                return c
+            if self._httpx is not None:
+                c = self._httpx.Client(
+                    transport=_pooled_transport(self.dns, self._ssl, self.http2, self.pool_per_host),
+                    timeout=TIMEOUT_SECONDS,
+                    follow_redirects=True,
+                )
+            else:
+                import requests
+                from requests.adapters import HTTPAdapter
+                c = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_per_host)
+                c.mount("https://", adapter)
+                c.mount("http://", adapter)
+            self._clients[host] = c
+            return c
+
+    def _trace(self, stats: HostStats):
+        # httpcore 의 trace 확장: 새 TCP 연결/TLS 핸드셰이크가 있을 때만 이벤트가 온다
+        def trace(event: str, info: dict):
+            if event == "connection.connect_tcp.complete":
+                stats.connections += 1
+            elif event == "connection.start_tls.complete":
+                stats.tls_handshakes += 1
+        return trace
+
+    def get(self, url: str, headers: dict | None = None, timeout: float = TIMEOUT_SECONDS):
+        # status_code / text / headers 를 가진 응답 (httpx.Response 또는 requests.Response)
+        host = urlparse(url).netloc
+        client = self._client(host)
+        with self._lock:
+            stats = self._stat(host)
+            stats.requests += 1
+        try:
+            if self._httpx is not None:
+                r = client.get(url, headers=headers, timeout=timeout, extensions={"trace": self._trace(stats)})
+                if r.http_version == "HTTP/2":
+                    stats.http2 += 1
+            else:
+                r = client.get(url, headers=headers, timeout=timeout)
+                self._count_requests_connections(client, stats)
+            return r
+        except Exception:
+            stats.errors += 1
+            raise
+
+    def get_stream(self, url: str, headers: dict | None = None, timeout: float = TIMEOUT_SECONDS,
+                   stop=None, max_bytes: int | None = None) -> StreamResult:
+        # 조금씩 받아 디코딩하면서 stop(새로 디코딩한 텍스트) 가 True 를 돌려주면 거기서 끊는다.
+        # 200 이 아니면 본문을 읽지 않는다
+        host = urlparse(url).netloc
+        client = self._client(host)
+        with self._lock:
+            stats = self._stat(host)
+            stats.requests += 1
+        try:
+            if self._httpx is not None:
+                with client.stream("GET", url, headers=headers, timeout=timeout,
+                                   extensions={"trace": self._trace(stats)}) as r:
+                    if r.http_version == "HTTP/2":
+                        stats.http2 += 1
+                    res = self._read_stream(r, r.iter_bytes(STREAM_CHUNK), lambda: r.num_bytes_downloaded,
+                                            r.encoding, stats, stop, max_bytes)
+            else:
+                r = client.get(url, headers=headers, timeout=timeout, stream=True)
+                try:
+                    res = self._read_stream(r, r.iter_content(STREAM_CHUNK), r.raw.tell,
+                                            r.encoding or r.apparent_encoding, stats, stop, max_bytes)
+                finally:
+                    r.close()
+                self._count_requests_connections(client, stats)
+            return res
+        except Exception:
+            stats.errors += 1
+            raise
+
+    def _read_stream(self, r, chunks, wire_bytes, encoding, stats: HostStats, stop, max_bytes) -> StreamResult:
+        if r.status_code != 200:
+            return StreamResult(r.status_code, "", r.headers, False, 0, False)
+        cap = max_bytes or size_cap_for(r.headers.get("Content-Type"))
+        try:
+            decoder = codecs.getincrementaldecoder(encoding or "utf-8")(errors="replace")
+        except LookupError:
+            decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        parts = []
+        size = 0
+        truncated = capped = False
+        for chunk in chunks:
+            if size + len(chunk) > cap:
+                chunk = chunk[:cap - size]
+                truncated = capped = True
+                stats.capped += 1
+            size += len(chunk)
+            text = decoder.decode(chunk)
+            parts.append(text)
+            if truncated:
+                break
+            if stop is not None and stop(text):
+                truncated = True
+                break
+        parts.append(decoder.decode(b"", final=True))
+        total = r.headers.get("Content-Length")
+        total = int(total) if total and total.isdigit() else None
+        if truncated and stop is not None and size < cap:
+            if total is not None and getattr(r, "http_version", "") != "HTTP/2" and total - wire_bytes() <= DRAIN_BELOW:
+                for _ in chunks:
+                    pass
+            else:
+                stats.cutoffs += 1
+        read = wire_bytes()
+        stats.bytes_read += read
+        if truncated and total is not None:
+            stats.bytes_saved += max(0, total - read)
+        return StreamResult(r.status_code, "".join(parts), r.headers, truncated, read, capped)
+
+    def _count_requests_connections(self, session, stats: HostStats):
+        # urllib3 풀의 누적 연결 수 (requests 경로에는 trace 가 없다)
+        try:
+            adapter = session.get_adapter("https://")
+            pools = adapter.poolmanager.pools
+            stats.connections = sum(pools[k].num_connections for k in list(pools.keys()))
+        except Exception:
+            pass
+
+    def stats(self) -> dict:
+        with self._lock:
+            hosts = {h: {k: getattr(s, k) for k in HostStats.__slots__} for h, s in self._stats.items()}
+        req = sum(h["requests"] for h in hosts.values())
+        conns = sum(h["connections"] for h in hosts.values())
+        return {
+            "backend": self.backend,
+            "http2": self.http2,
+            "requests": req,
+            "connections": conns,
+            # 요청 중 새 연결 없이 기존 연결을 쓴 비율
+            "reuse_rate": 1 - conns / req if req else 0.0,
+            "bytes_read": sum(h["bytes_read"] for h in hosts.values()),
+            "bytes_saved": sum(h["bytes_saved"] for h in hosts.values()),
+            "cutoffs": sum(h["cutoffs"] for h in hosts.values()),
+            "capped": sum(h["capped"] for h in hosts.values()),
+            "dns_hits": self.dns.hits,
+            "dns_misses": self.dns.misses,
+            "hosts": hosts,
+        }
+
+    def close(self):
+        with self._lock:
+            clients, self._clients = self._clients, {}
+        for c in clients.values():
+            try:
+                c.close()
+            except Exception:
+                pass
+
+
+_transport: Transport | None = None
+_transport_lock = threading.Lock()
+
+
+def get_transport() -> Transport:
+    global _transport
+    with _transport_lock:
+        if _transport is None:
+            _transport = Transport(http2=os.environ.get("HTTP2", "1").strip().lower() not in {"0", "false", "off"})
+        return _transport
@@ -0,0 +1,21 @@
+import bm25_index
+import enrichment
+
+SUMMARIES_PER_COMMIT = 20
+
+
+# 글을 커밋할 때마다 (db_manager 의 post-commit 훅) 검색/중복/키워드 색인을 새 글까지 갱신한다.
+# 앱과 작업 큐 워커가 같은 훅을 등록한다
+def index_new_posts(blog_url: str):
+    import keyword_trends
+    import near_dup
+    import semantic_index
+    bm25_index.update_index(blog_url)
+    semantic_index.update_index(blog_url)
+    keyword_trends.update_index(blog_url)
+    near_dup.index_blog(blog_url)
+    # 키워드/토큰 수는 항상, 글 요약은 ENRICH_SUMMARIES 를 켠 경우에만 커밋당 SUMMARIES_PER_COMMIT 개까지 만든다.
+    # 쌓인 글 전체 요약은 `python enrichment.py` 로 따로 돌린다
+    enrichment.enrich_blog(blog_url)
+    if enrichment.summaries_enabled():
+        enrichment.enrich_blog(blog_url, summarize=True, limit=SUMMARIES_PER_COMMIT)
@@ -0,0 +1,156 @@
+import os
+import queue
+import sqlite3
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from datetime import datetime, timezone
+
+import db_manager as dbm
+
+# posts_<id>.db 하나에 쓰기 스레드 하나. 여러 세션/수집기가 넣은 저장 요청을 큐로 받아
+# 짧은 트랜잭션으로 묶어서 쓰므로 'database is locked' 없이 동시에 수집할 수 있다.
+# 중복 확인도 이 스레드 안에서 INSERT 와 한 문장으로 처리한다.
+BATCH_SIZE = 200
+# 첫 요청 후 이만큼 더 기다리며 함께 쓸 요청을 모은다
+BATCH_WAIT = 0.05
+# flush/close 가 기다리는 동안 이 간격으로 쓰기 스레드가 살아 있는지 확인한다
+WAIT_POLL = 1.0
+
+_INSERT_SQL = (
+    "INSERT OR IGNORE INTO posts(blog_name, title, date, content, link, created_at) "
+    "SELECT ?, ?, ?, ?, ?, ? "
+    "WHERE NOT EXISTS (SELECT 1 FROM posts WHERE blog_name = ? AND title = ? AND date = ?)"
+)
+
+
+class IngestWriter:
+    def __init__(self, path: str):
+        self.path = os.path.abspath(path)
+        self._queue: queue.Queue = queue.Queue()
+        self.stats = {"batches": 0, "inserted": 0, "ignored": 0}
+        self._thread = threading.Thread(target=self._run, name=f"ingest:{os.path.basename(path)}", daemon=True)
+        self._thread.start()
+
+    def submit(self, blog_name: str, title: str, d: str, content: str, link: str,
+               created_at: str | None = None) -> Future:
+        # 결과: 새로 저장했으면 True, 이미 있는 글이면 False
+        fut = Future()
+        row = (blog_name, title, d, content, link, created_at or datetime.now(timezone.utc).isoformat())
+        self._queue.put(("save", row, fut))
+        if not self.alive:
+            self._fail_pending(RuntimeError(f"ingest writer for {self.path} is not running"))
+        return fut
+
+    @property
+    def alive(self) -> bool:
+        return self._thread.is_alive()
+
+    def flush(self):
+        # 이 호출 전에 넣은 요청이 모두 커밋될 때까지 기다린다
+        fut = Future()
+        self._queue.put(("flush", None, fut))
+        self._wait(fut)
+
+    def close(self):
+        # 남은 요청을 쓰고 스레드를 끝낸다 (get_writer 의 공유 writer 는 프로세스 내내 쓰므로 닫지 않는다)
+        if not self.alive:
+            return
+        fut = Future()
+        self._queue.put(("stop", None, fut))
+        self._wait(fut)
+        self._thread.join()
+
+    def _wait(self, fut: Future):
+        # 스레드가 죽었으면 끝나지 않을 결과를 무한정 기다리지 않는다
+        while True:
+            try:
+                return fut.result(timeout=WAIT_POLL)
+            except FutureTimeout:
+                if not self.alive and not fut.done():
+                    err = RuntimeError(f"ingest writer for {self.path} stopped")
+                    self._fail_pending(err)
+                    if not fut.done():
+                        fut.set_exception(err)
+
+    def _fail_pending(self, err: Exception):
+        while True:
+            try:
+                _kind, _row, fut = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            if not fut.done():
+                fut.set_exception(err)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+        except Exception:
+            conn.close()
+            raise
+        return conn
+
+    def _run(self):
+        # 연결 실패도 그 배치의 요청을 실패로 돌려주고, 다음 배치에서 다시 연결한다
+        conn = None
+        batch = []
+        try:
+            while True:
+                batch = [self._queue.get()]
+                try:
+                    while len(batch) < BATCH_SIZE:
+                        batch.append(self._queue.get(timeout=BATCH_WAIT))
+                except queue.Empty:
+                    pass
+                saves = [(row, fut) for kind, row, fut in batch if kind == "save"]
+                stop = any(kind == "stop" for kind, _row, _fut in batch)
+                results = []
+                try:
+                    if saves:
+                        if conn is None:
+                            conn = self._connect()
+                        with conn:
+                            cur = conn.cursor()
+                            for row, _fut in saves:
+                                cur.execute(_INSERT_SQL, row + row[:3])
+                                results.append(cur.rowcount == 1)
+                        dbm.bump_write_generation(self.path)
+                        self.stats["batches"] += 1
+                        self.stats["inserted"] += sum(results)
+                        self.stats["ignored"] += len(results) - sum(results)
+                except Exception as e:
+                    for _kind, _row, fut in batch:
+                        fut.set_exception(e)
+                    if stop:
+                        return
+                    continue
+                for (_row, fut), ok in zip(saves, results):
+                    fut.set_result(ok)
+                for kind, _row, fut in batch:
+                    if kind in ("flush", "stop"):
+                        fut.set_result(None)
+                if stop:
+                    return
+        finally:
+            if conn is not None:
+                conn.close()
+            err = RuntimeError(f"ingest writer for {self.path} stopped")
+            for _kind, _row, fut in batch:
+                if not fut.done():
+                    fut.set_exception(err)
+            self._fail_pending(err)
+
+
+_writers: dict[str, IngestWriter] = {}
+_writers_lock = threading.Lock()
+
+
+def get_writer(path: str) -> IngestWriter:
+    path = os.path.abspath(path)
+    with _writers_lock:
+        w = _writers.get(path)
+        if w is None or not w.alive:
+            # 스레드가 죽은 writer 는 새로 만든다 (남은 요청은 이미 실패로 돌려줬다)
+            w = _writers[path] = IngestWriter(path)
+        return w
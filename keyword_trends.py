@@ -0,0 +1,312 @@
+import json
+import math
+import os
+from collections import Counter
+from datetime import date
+
+import numpy as np
+
+import db_manager as dbm
+from text_utils import tokenize_ko
+
+# 글 x 단어 희소 행렬(CSR)을 posts_<id>.db 옆 파일에 이어 붙인다:
+#   .kw.indptr  int64 [docs]   각 글의 마지막 nnz 위치 (시작 0 은 생략)
+#   .kw.indices int32 [nnz]    단어 id
+#   .kw.data    int32 [nnz]    단어 빈도
+#   .kw.days    int32 [docs]   글 날짜 (date.toordinal)
+#   .kw.ids     int64 [docs]   posts.id
+#   .kw.vocab   단어 id 순서대로 한 줄에 하나
+#   .kw.json    커밋된 docs/nnz/vocab 수. 이보다 뒤는 기록 도중 중단된 잔여분.
+#   .kw.lock    이어 쓰는 동안 잡는 파일 잠금 (다른 프로세스와도 겹치지 않게)
+_SUFFIXES = {"indptr": (".kw.indptr", np.int64), "indices": (".kw.indices", np.int32),
+             "data": (".kw.data", np.int32), "days": (".kw.days", np.int32), "ids": (".kw.ids", np.int64)}
+_EPOCH = date(1970, 1, 1).toordinal()
+
+_loaded: dict[str, "Corpus"] = {}
+_indexed_generation: dict[str, tuple] = {}
+
+
+def _files(db_path: str) -> dict[str, str]:
+    base = os.path.splitext(db_path)[0]
+    files = {k: base + suf for k, (suf, _dt) in _SUFFIXES.items()}
+    files["vocab"] = base + ".kw.vocab"
+    files["meta"] = base + ".kw.json"
+    files["lock"] = base + ".kw.lock"
+    return files
+
+
+def _read_meta(files) -> dict:
+    try:
+        with open(files["meta"], "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        return {"docs": int(meta["docs"]), "nnz": int(meta["nnz"]), "vocab": int(meta["vocab"])}
+    except Exception:
+        return {"docs": 0, "nnz": 0, "vocab": 0}
+
+
+def _commit(files, docs: int, nnz: int, vocab: int):
+    tmp = files["meta"] + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"docs": docs, "nnz": nnz, "vocab": vocab, "tokenizer": "tokenize_ko-stems-v1"}, f)
+    os.replace(tmp, files["meta"])
+
+
+def _truncate(files, meta):
+    sizes = {"indptr": meta["docs"], "days": meta["docs"], "ids": meta["docs"],
+             "indices": meta["nnz"], "data": meta["nnz"]}
+    for k, n in sizes.items():
+        size = n * np.dtype(_SUFFIXES[k][1]).itemsize
+        if os.path.exists(files[k]) and os.path.getsize(files[k]) != size:
+            with open(files[k], "r+b") as f:
+                f.truncate(size)
+    if os.path.exists(files["vocab"]):
+        with open(files["vocab"], "r", encoding="utf-8") as f:
+            terms = f.read().splitlines()
+        if len(terms) != meta["vocab"]:
+            with open(files["vocab"], "w", encoding="utf-8") as f:
+                f.write("".join(t + "\n" for t in terms[:meta["vocab"]]))
+
+
+def _read_vocab(files, n: int) -> list[str]:
+    if n == 0:
+        return []
+    with open(files["vocab"], "r", encoding="utf-8") as f:
+        return f.read().split("\n")[:n]
+
+
+def update_index(blog_url: str, batch_size: int = 500) -> int:
+    db_path = dbm.post_db_path_for(blog_url)
+    if not os.path.exists(db_path):
+        return 0
+    files = _files(db_path)
+    added = 0
+    with dbm.file_lock(files["lock"]):
+        meta = _read_meta(files)
+        _truncate(files, meta)
+        vocab = _read_vocab(files, meta["vocab"])
+        term_ids = {t: i for i, t in enumerate(vocab)}
+        last_id = 0
+        if meta["docs"]:
+            ids = np.memmap(files["ids"], dtype=np.int64, mode="r", shape=(meta["docs"],))
+            last_id = int(ids[-1])
+            del ids
+        conn = dbm.get_post_conn_for(blog_url)
+        try:
+            while True:
+                rows = conn.execute(
+                    "SELECT id, date, title, content FROM posts WHERE id > ? ORDER BY id LIMIT ?",
+                    (last_id, batch_size),
+                ).fetchall()
+                if not rows:
+                    break
+                indptr, indices, data, days, ids, new_terms = [], [], [], [], [], []
+                nnz = meta["nnz"]
+                for pid, d, title, content in rows:
+                    tf = Counter(tokenize_ko(f"{title}\n{content}", bigrams=False))
+                    for t, c in tf.items():
+                        j = term_ids.get(t)
+                        if j is None:
+                            j = term_ids[t] = len(term_ids)
+                            new_terms.append(t)
+                        indices.append(j)
+                        data.append(c)
+                    nnz += len(tf)
+                    indptr.append(nnz)
+                    try:
+                        days.append(date.fromisoformat(d).toordinal())
+                    except Exception:
+                        days.append(0)
+                    ids.append(pid)
+                    last_id = pid
+                for k, vals in (("indptr", indptr), ("indices", indices), ("data", data), ("days", days), ("ids", ids)):
+                    with open(files[k], "ab") as f:
+                        f.write(np.asarray(vals, dtype=_SUFFIXES[k][1]).tobytes())
+                with open(files["vocab"], "a", encoding="utf-8") as f:
+                    f.write("".join(t + "\n" for t in new_terms))
+                meta = {"docs": meta["docs"] + len(rows), "nnz": nnz, "vocab": len(term_ids)}
+                _commit(files, meta["docs"], meta["nnz"], meta["vocab"])
+                added += len(rows)
+        finally:
+            conn.close()
+    return added
+
+
+def rebuild(blog_url: str) -> int:
+    # 파일은 뒤에 붙이기만 하므로 이미 색인한 글이 바뀌면 비우고 처음부터 다시 만든다
+    db_path = dbm.post_db_path_for(blog_url)
+    files = _files(db_path)
+    with dbm.file_lock(files["lock"]):
+        empty = {"docs": 0, "nnz": 0, "vocab": 0}
+        _commit(files, **empty)
+        _truncate(files, empty)
+    added = update_index(blog_url)
+    # 다시 만든 뒤 크기가 우연히 같아도 예전 Corpus 를 쓰지 않게 버린다
+    _loaded.pop(db_path, None)
+    return added
+
+
+def ensure_index(blog_url: str) -> int:
+    # DB 에 쓰기가 없었으면 파일도 열지 않는다 (화면 재실행마다 부르는 용도)
+    db_path = dbm.post_db_path_for(blog_url)
+    if not os.path.exists(db_path):
+        return 0
+    gen = dbm.write_generation(db_path)
+    if _indexed_generation.get(db_path) == gen:
+        return 0
+    added = update_index(blog_url)
+    _indexed_generation[db_path] = gen
+    return added
+
+
+class Corpus:
+    def __init__(self, files, meta):
+        self.meta = meta
+        n, nnz = meta["docs"], meta["nnz"]
+        self.vocab = _read_vocab(files, meta["vocab"])
+        self.term_ids = {t: i for i, t in enumerate(self.vocab)}
+        ends = np.fromfile(files["indptr"], dtype=np.int64, count=n)
+        self.indptr = np.concatenate([[0], ends]).astype(np.int64)
+        self.indices = np.fromfile(files["indices"], dtype=np.int32, count=nnz)
+        self.data = np.fromfile(files["data"], dtype=np.int32, count=nnz)
+        self.days = np.fromfile(files["days"], dtype=np.int32, count=n)
+        self.ids = np.fromfile(files["ids"], dtype=np.int64, count=n)
+        # nnz -> 글 번호, 글 길이(토큰 수), 단어별 df
+        self.row = np.repeat(np.arange(n, dtype=np.int32), np.diff(self.indptr))
+        self.doc_len = np.bincount(self.row, weights=self.data, minlength=n)
+        self.df = np.bincount(self.indices, minlength=len(self.vocab))
+        self._csc = None
+
+    @property
+    def csc(self):
+        # 단어 -> 그 단어가 나온 nnz 위치들. 단어별 추이 계산에 쓴다.
+        if self._csc is None:
+            order = np.argsort(self.indices, kind="stable")
+            ptr = np.zeros(len(self.vocab) + 1, dtype=np.int64)
+            np.cumsum(self.df, out=ptr[1:])
+            self._csc = (order, ptr)
+        return self._csc
+
+    def doc_mask(self, start_date: date | None, end_date: date | None) -> np.ndarray:
+        lo = start_date.toordinal() if start_date else 1
+        hi = end_date.toordinal() if end_date else date.max.toordinal()
+        return (self.days >= lo) & (self.days <= hi)
+
+    def term_positions(self, term: str) -> np.ndarray:
+        j = self.term_ids.get(term)
+        if j is None:
+            return np.empty(0, dtype=np.int64)
+        order, ptr = self.csc
+        return order[ptr[j]:ptr[j + 1]]
+
+
+def load(blog_url: str) -> Corpus | None:
+    db_path = dbm.post_db_path_for(blog_url)
+    files = _files(db_path)
+    meta = _read_meta(files)
+    if meta["docs"] == 0:
+        return None
+    c = _loaded.get(db_path)
+    if c is None or c.meta != meta:
+        c = _loaded[db_path] = Corpus(files, meta)
+    return c
+
+
+def _buckets(days: np.ndarray, freq: str) -> np.ndarray:
+    # 주(월요일 시작) 또는 월 단위 버킷 키: datetime64[D]
+    if freq == "M":
+        return (days.astype(np.int64) - _EPOCH).astype("datetime64[D]").astype("datetime64[M]").astype("datetime64[D]")
+    # date.toordinal() 의 1 은 월요일
+    monday = days.astype(np.int64) - (days.astype(np.int64) - 1) % 7
+    return (monday - _EPOCH).astype("datetime64[D]")
+
+
+def normalize_term(term: str) -> str:
+    # 입력한 단어를 색인과 같은 방식으로 자른다 ('환율이' -> '환율')
+    toks = tokenize_ko(term, bigrams=False)
+    return toks[0] if toks else (term or "").strip().lower()
+
+
+def term_trend(blog_url: str, terms: list[str], start_date: date | None = None, end_date: date | None = None,
+               freq: str = "W", metric: str = "count") -> dict:
+    # {"periods": [date...], "series": {term: [값...]}}
+    # metric: count(빈도) / per_1k(1000 토큰당 빈도) / df(언급한 글 수) / tfidf(기간 TF x 전체 IDF)
+    c = load(blog_url)
+    if c is None:
+        return {"periods": [], "series": {}}
+    mask = c.doc_mask(start_date, end_date)
+    keys = _buckets(c.days[mask], freq)
+    periods, inv = np.unique(keys, return_inverse=True)
+    doc_bucket = np.full(len(c.days), -1, dtype=np.int64)
+    doc_bucket[mask] = inv
+    tokens = np.bincount(inv, weights=c.doc_len[mask], minlength=len(periods))
+    n_docs = len(c.days)
+    series = {}
+    for term in terms:
+        pos = c.term_positions(term)
+        b = doc_bucket[c.row[pos]]
+        keep = b >= 0
+        b, counts = b[keep], c.data[pos][keep]
+        if metric == "df":
+            vals = np.bincount(b, minlength=len(periods)).astype(np.float64)
+        else:
+            vals = np.bincount(b, weights=counts, minlength=len(periods))
+            if metric == "per_1k":
+                vals = np.divide(vals * 1000.0, tokens, out=np.zeros_like(vals), where=tokens > 0)
+            elif metric == "tfidf":
+                j = c.term_ids.get(term)
+                idf = math.log((1 + n_docs) / (1 + (c.df[j] if j is not None else 0))) + 1
+                vals = np.divide(vals, tokens, out=np.zeros_like(vals), where=tokens > 0) * idf
+        series[term] = vals.tolist()
+    return {"periods": [p.item() for p in periods], "series": series}
+
+
+def top_terms(blog_url: str, start_date: date | None = None, end_date: date | None = None, k: int = 20,
+              min_df: int = 2) -> list[tuple[str, float, int]]:
+    # 기간 안에서 두드러진 단어: 기간 내 빈도 x 전체 IDF. [(단어, 점수, 기간 내 글 수)]
+    c = load(blog_url)
+    if c is None:
+        return []
+    nz = c.doc_mask(start_date, end_date)[c.row]
+    v = len(c.vocab)
+    tf = np.bincount(c.indices[nz], weights=c.data[nz], minlength=v)
+    df_win = np.bincount(c.indices[nz], minlength=v)
+    idf = np.log((1 + len(c.days)) / (1 + c.df)) + 1
+    score = np.where(df_win >= min_df, np.log1p(tf) * idf, 0.0)
+    k = min(k, int((score > 0).sum()))
+    if k <= 0:
+        return []
+    top = np.argpartition(-score, k - 1)[:k]
+    top = top[np.argsort(-score[top])]
+    return [(c.vocab[j], float(score[j]), int(df_win[j])) for j in top]
+
+
+def cooccurring(blog_url: str, term: str, start_date: date | None = None, end_date: date | None = None,
+                k: int = 15, min_df: int = 2) -> list[tuple[str, int, float]]:
+    # term 과 같은 글에 나온 단어. [(단어, 함께 나온 글 수, lift)] — lift = P(a,b) / (P(a) P(b))
+    c = load(blog_url)
+    if c is None:
+        return []
+    mask = c.doc_mask(start_date, end_date)
+    n = int(mask.sum())
+    j = c.term_ids.get(term)
+    if j is None or n == 0:
+        return []
+    has = np.zeros(len(c.days), dtype=bool)
+    has[c.row[c.term_positions(term)]] = True
+    has &= mask
+    n_term = int(has.sum())
+    if n_term == 0:
+        return []
+    v = len(c.vocab)
+    nz_win = mask[c.row]
+    df_win = np.bincount(c.indices[nz_win], minlength=v)
+    co = np.bincount(c.indices[has[c.row]], minlength=v)
+    co[j] = 0
+    lift = np.divide(co * float(n), df_win * float(n_term), out=np.zeros(v), where=df_win > 0)
+    score = np.where(co >= min_df, co * np.log1p(lift), 0.0)
+    k = min(k, int((score > 0).sum()))
+    if k <= 0:
+        return []
+    top = np.argpartition(-score, k - 1)[:k]
+    top = top[np.argsort(-score[top])]
+    return [(c.vocab[t], int(co[t]), float(lift[t])) for t in top]
@@ -0,0 +1,146 @@
+import hashlib
+import os
+import sqlite3
+import time
+
+DEFAULT_PATH = "llm_cache.db"
+# 글 요약처럼 입력 내용만으로 결정되는 결과는 만료 없이 따로 보관한다
+SUMMARY_PATH = "llm_summaries.db"
+
+
+def cache_key(model: str, system_prompt: str, context: str, question: str) -> str:
+    h = hashlib.sha256()
+    for part in (model, system_prompt, context, question):
+        data = (part or "").encode("utf-8")
+        # 길이를 함께 넣어 경계가 다른 입력이 같은 해시가 되지 않게 한다.
+        h.update(len(data).to_bytes(8, "big"))
+        h.update(data)
+    return h.hexdigest()
+
+
+class LLMCache:
+    # (모델, 시스템 프롬프트, 컨텍스트, 질문) -> 응답. TTL(None 이면 만료 없음)과 항목 수 상한(LRU)을 둔다.
+    def __init__(self, path: str = DEFAULT_PATH, ttl_seconds: float | None = 7 * 24 * 3600, max_entries: int = 2000):
+        self.path = path
+        self.ttl = ttl_seconds
+        self.max_entries = max_entries
+        conn = self._conn()
+        try:
+            conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS llm_cache (
+                    key TEXT PRIMARY KEY,
+                    model TEXT NOT NULL,
+                    answer TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_access REAL NOT NULL,
+                    latency REAL NOT NULL DEFAULT 0,
+                    hits INTEGER NOT NULL DEFAULT 0
+                );
+                CREATE INDEX IF NOT EXISTS llm_cache_last_access ON llm_cache(last_access);
+                CREATE TABLE IF NOT EXISTS llm_cache_stats (
+                    id INTEGER PRIMARY KEY CHECK (id = 1),
+                    hits INTEGER NOT NULL DEFAULT 0,
+                    misses INTEGER NOT NULL DEFAULT 0,
+                    saved_seconds REAL NOT NULL DEFAULT 0
+                );
+                INSERT OR IGNORE INTO llm_cache_stats(id) VALUES (1);
+                """
+            )
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _conn(self):
+        return sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+
+    def get(self, key: str) -> str | None:
+        now = time.time()
+        conn = self._conn()
+        try:
+            row = conn.execute("SELECT answer, created_at, latency FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            if row is not None and self.ttl is not None and now - row[1] > self.ttl:
+                conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                row = None
+            if row is None:
+                conn.execute("UPDATE llm_cache_stats SET misses = misses + 1 WHERE id = 1")
+                conn.commit()
+                return None
+            conn.execute("UPDATE llm_cache SET last_access = ?, hits = hits + 1 WHERE key = ?", (now, key))
+            conn.execute(
+                "UPDATE llm_cache_stats SET hits = hits + 1, saved_seconds = saved_seconds + ? WHERE id = 1",
+                (row[2],),
+            )
+            conn.commit()
+            return row[0]
+        finally:
+            conn.close()
+
+    def put(self, key: str, model: str, answer: str, latency: float):
+        now = time.time()
+        conn = self._conn()
+        try:
+            conn.execute(
+                "INSERT INTO llm_cache(key, model, answer, created_at, last_access, latency) VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET model = excluded.model, answer = excluded.answer, "
+                "created_at = excluded.created_at, last_access = excluded.last_access, latency = excluded.latency",
+                (key, model, answer, now, now, float(latency)),
+            )
+            self._evict(conn, now)
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _evict(self, conn, now: float):
+        if self.ttl is not None:
+            conn.execute("DELETE FROM llm_cache WHERE created_at < ?", (now - self.ttl,))
+        n = conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+        if n > self.max_entries:
+            conn.execute(
+                "DELETE FROM llm_cache WHERE key IN (SELECT key FROM llm_cache ORDER BY last_access ASC LIMIT ?)",
+                (n - self.max_entries,),
+            )
+
+    def stats(self) -> dict:
+        conn = self._conn()
+        try:
+            hits, misses, saved = conn.execute(
+                "SELECT hits, misses, saved_seconds FROM llm_cache_stats WHERE id = 1"
+            ).fetchone()
+            entries = conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+        finally:
+            conn.close()
+        total = hits + misses
+        return {
+            "entries": entries,
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / total if total else 0.0,
+            "saved_seconds": saved,
+        }
+
+
+_default: LLMCache | None = None
+_summaries: LLMCache | None = None
+
+
+def get_cache() -> LLMCache:
+    global _default
+    if _default is None:
+        _default = LLMCache(
+            os.environ.get("LLM_CACHE_PATH", DEFAULT_PATH),
+            ttl_seconds=float(os.environ.get("LLM_CACHE_TTL", 7 * 24 * 3600)),
+            max_entries=int(os.environ.get("LLM_CACHE_MAX_ENTRIES", 2000)),
+        )
+    return _default
+
+
+def get_summary_cache() -> LLMCache:
+    global _summaries
+    if _summaries is None:
+        _summaries = LLMCache(
+            os.environ.get("LLM_SUMMARY_CACHE_PATH", SUMMARY_PATH),
+            ttl_seconds=None,
+            max_entries=int(os.environ.get("LLM_SUMMARY_CACHE_MAX_ENTRIES", 200000)),
+        )
+    return _summaries
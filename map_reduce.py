@@ -0,0 +1,131 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Iterable
+
+import ai_client
+import llm_cache
+import model_router
+from text_utils import estimate_tokens, split_chunks
+
+# 동시에 보내는 요약 요청 수 (Gemini 분당 요청 한도를 넘지 않게)
+MAP_WORKERS = 6
+# 한 번의 요약 호출에 넣는 글 분량. 이보다 긴 글은 나눠서 요약한다.
+MAP_UNIT_CHARS = 12000
+# 한 번의 통합 호출에 넣는 요약 분량. 넘치면 묶음별로 통합한 뒤 다시 통합한다.
+REDUCE_TOKENS = 6000
+
+# 프롬프트를 바꾸면 버전도 올려서 이전 요약을 재사용하지 않게 한다
+MAP_PROMPT_VERSION = "map-v1"
+MAP_PROMPT = """다음 블로그 글을 투자 분석용으로 요약하세요.
+- 글에서 말하는 '현상'과 그 '근본 원인'
+- 원인이 이어질 산업/자산군 파급 효과
+- 언급된 섹터, 자산, 리스크
+5줄 이내의 bullet 로, 글에 없는 내용은 쓰지 마세요."""
+
+REDUCE_PROMPT = """다음은 여러 블로그 글의 요약입니다. 질문에 답하는 데 필요한 관점에서 하나의 요약으로 통합하세요.
+반복되는 주장은 합치고, 서로 다른 주장은 날짜와 함께 남기세요. 10줄 이내의 bullet 로 작성하세요."""
+
+
+def map_units(posts: Iterable) -> list[str]:
+    units = []
+    for r in posts:
+        head = f"[{r.date}] {r.title}"
+        content = str(r.content or "")
+        if len(content) <= MAP_UNIT_CHARS:
+            units.append(f"{head}\n{content}")
+        else:
+            pieces = split_chunks(content, MAP_UNIT_CHARS)
+            units.extend(f"{head} ({i + 1}/{len(pieces)})\n{p}" for i, p in enumerate(pieces))
+    return units
+
+
+def _cached_call(models, prompt_key: str, prompt: str, text: str, question: str = "") -> tuple[str, bool]:
+    # 입력 내용의 해시로 캐시하므로 같은 글/같은 요약 묶음은 다시 호출하지 않는다
+    cache = llm_cache.get_summary_cache()
+    key = llm_cache.cache_key(prompt_key, prompt, text, question)
+    hit = cache.get(key)
+    if hit is not None:
+        return hit, True
+    t0 = time.perf_counter()
+    parts = [prompt, f"Context:\n{text}"] + ([f"Question:\n{question}"] if question else [])
+    out, used = model_router.get_router().complete(models, parts)
+    if out.strip():
+        cache.put(key, used, out, time.perf_counter() - t0)
+    return out, False
+
+
+def _batches(texts: list[str], token_budget: int) -> list[list[str]]:
+    batches, cur, used = [], [], 0
+    for t in texts:
+        cost = estimate_tokens(t) + 2
+        if cur and used + cost > token_budget:
+            batches.append(cur)
+            cur, used = [], 0
+        cur.append(t)
+        used += cost
+    if cur:
+        batches.append(cur)
+    return batches
+
+
+def build_context(posts: Iterable, question: str, models=None, api_key: str | None = None,
+                  workers: int = MAP_WORKERS, token_budget: int = REDUCE_TOKENS,
+                  on_progress: Callable[[str, int, int], None] | None = None,
+                  summary_for: Callable | None = None) -> dict:
+    # 기간 안의 모든 글을 요약(map)하고, 예산 안에 들어올 때까지 묶음별로 통합(reduce)한다.
+    # 마지막 통합 결과가 기존 분석 프롬프트의 컨텍스트가 된다.
+    # summary_for(post) 가 미리 만든 요약(enrichment)을 돌려주면 그 글은 요약 호출 없이 쓴다.
+    if models is None:
+        models = ai_client.gemini_models(api_key)
+    units = []
+    pre = []
+    for r in posts:
+        s = summary_for(r) if summary_for else None
+        if s:
+            pre.append(f"[{r.date}] {r.title}\n{s.strip()}")
+        else:
+            units.extend(map_units([r]))
+    stats = {"units": len(units) + len(pre), "cached": len(pre), "calls": 0, "failed": 0, "levels": 0}
+    errors = []
+    if not units and not pre:
+        return {"context": "", **stats}
+
+    def run_all(stage, fn, items):
+        results = [None] * len(items)
+        done = 0
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as ex:
+            futures = {ex.submit(fn, it): i for i, it in enumerate(items)}
+            for fut in as_completed(futures):
+                try:
+                    out, cached = fut.result()
+                    stats["cached" if cached else "calls"] += 1
+                except Exception as e:
+                    # 일부 글의 요약이 실패해도 나머지로 계속 진행한다
+                    out = ""
+                    stats["failed"] += 1
+                    errors.append(e)
+                results[futures[fut]] = out
+                done += 1
+                if on_progress:
+                    on_progress(stage, done, len(items))
+        return results
+
+    mapped = run_all("map", lambda u: _cached_call(models, MAP_PROMPT_VERSION, MAP_PROMPT, u), units) if units else []
+    # 요약 앞에 글 머리(날짜/제목)를 붙여 통합 단계에서도 출처가 남게 한다
+    texts = pre + [f"{u.split(chr(10), 1)[0]}\n{m.strip()}" for u, m in zip(units, mapped) if (m or "").strip()]
+    if not texts and errors:
+        raise errors[-1]
+
+    while sum(estimate_tokens(t) + 2 for t in texts) > token_budget and len(texts) > 1:
+        stats["levels"] += 1
+        batches = _batches(texts, token_budget)
+        if len(batches) == len(texts):
+            # 요약 하나하나가 예산을 넘으면 더 줄일 수 없다
+            break
+        texts = run_all(f"reduce {stats['levels']}",
+                        lambda b: _cached_call(models, "reduce-v1", REDUCE_PROMPT, "\n\n".join(b), question),
+                        batches)
+        texts = [t for t in texts if t.strip()]
+        if not texts and errors:
+            raise errors[-1]
+    return {"context": "\n\n".join(texts), **stats}
@@ -1,211 +1,283 @@
+import argparse
+import json
 import os
 import sqlite3
-import pandas as pd
-from supabase import create_client, Client
-from dotenv import load_dotenv
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 
-# Load env
-load_dotenv()
+import requests
+from requests.adapters import HTTPAdapter
 
-url: str = os.environ.get("SUPABASE_URL")
-key: str = os.environ.get("SUPABASE_KEY")
+import db_manager as dbm
+from export_posts import iter_export_rows
 
-if not url or not key or "your_supabase" in url:
-    print("Please set SUPABASE_URL and SUPABASE_KEY in .env file first.")
-    exit(1)
+try:
+    from dotenv import load_dotenv
+    load_dotenv()
+except Exception:
+    pass
 
-supabase: Client = create_client(url, key)
+DEFAULT_CHECKPOINT = ".migrate_checkpoint.json"
+# supabase_setup.sql 의 posts_dedup_key 와 동일해야 함
+POST_CONFLICT_KEY = "blog_name,title,date"
+POST_COLUMNS = ["blog_name", "title", "date", "content", "link", "created_at"]
 
-def get_sqlite_conn(db_name):
-    return sqlite3.connect(db_name)
 
-def migrate_blogs():
-    print("Migrating Blogs...")
-    conn = get_sqlite_conn("data.db")
+class PostgrestError(RuntimeError):
+    pass
+
+
+class PostgrestClient:
+    # Supabase(/rest/v1) 또는 로컬 PostgREST 에 직접 요청한다.
+    def __init__(self, base_url: str, api_key: str | None = None, access_token: str | None = None,
+                 pool_size: int = 8, timeout: float = 60, max_retries: int = 5):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(1, pool_size))
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers["Content-Type"] = "application/json"
+        if api_key:
+            self.session.headers["apikey"] = api_key
+        token = access_token or api_key
+        if token:
+            self.session.headers["Authorization"] = f"Bearer {token}"
+
+    def _request(self, method: str, table: str, params=None, body=None, prefer: str | None = None):
+        headers = {"Prefer": prefer} if prefer else {}
+        data = json.dumps(body, ensure_ascii=False).encode("utf-8") if body is not None else None
+        # max_retries 가 0 이하여도 한 번은 요청한다
+        attempts = max(1, self.max_retries)
+        for attempt in range(attempts):
+            try:
+                r = self.session.request(
+                    method, f"{self.base_url}/{table}", params=params, data=data,
+                    headers=headers, timeout=self.timeout,
+                )
+                if r.status_code < 400:
+                    return r.json() if r.content else []
+                # 4xx (429 제외)는 재시도해도 결과가 같으므로 바로 실패
+                if r.status_code != 429 and r.status_code < 500:
+                    raise PostgrestError(f"{method} {table}: HTTP {r.status_code} {r.text[:300]}")
+                last_err = PostgrestError(f"{method} {table}: HTTP {r.status_code} {r.text[:300]}")
+            except (requests.ConnectionError, requests.Timeout) as e:
+                last_err = e
+            if attempt + 1 < attempts:
+                time.sleep(min(30.0, 0.5 * (2 ** attempt)))
+        raise last_err
+
+    def select(self, table: str, params: dict):
+        return self._request("GET", table, params=params)
+
+    def upsert(self, table: str, rows: list[dict], on_conflict: str,
+               ignore_duplicates: bool = False, returning: bool = False):
+        if not rows:
+            return []
+        resolution = "ignore-duplicates" if ignore_duplicates else "merge-duplicates"
+        prefer = f"resolution={resolution},return={'representation' if returning else 'minimal'}"
+        return self._request("POST", table, params={"on_conflict": on_conflict}, body=rows, prefer=prefer)
+
+    def delete(self, table: str, filters: dict):
+        return self._request("DELETE", table, params=filters, prefer="return=minimal")
+
+    def close(self):
+        self.session.close()
+
+
+def connect_from_env(rest_url: str | None = None, pool_size: int = 8, email: str | None = None,
+                     password: str | None = None) -> tuple[PostgrestClient, str | None]:
+    # rest_url 이 주어지면 로컬 PostgREST 스탠드인으로 보고 인증을 생략
+    if rest_url:
+        return PostgrestClient(rest_url, pool_size=pool_size), None
+    url = os.environ.get("SUPABASE_URL")
+    key = os.environ.get("SUPABASE_KEY")
+    if not url or not key or "your_supabase" in url:
+        raise SystemExit("Please set SUPABASE_URL and SUPABASE_KEY in .env file first.")
+    access_token = None
+    user_id = None
+    if email and password:
+        r = requests.post(
+            f"{url.rstrip('/')}/auth/v1/token",
+            params={"grant_type": "password"},
+            headers={"apikey": key, "Content-Type": "application/json"},
+            json={"email": email, "password": password},
+            timeout=30,
+        )
+        if r.status_code >= 400:
+            raise SystemExit(f"Login failed: HTTP {r.status_code} {r.text[:200]}")
+        body = r.json()
+        access_token = body.get("access_token")
+        user_id = (body.get("user") or {}).get("id")
+        print(f"Logged in as {user_id}")
+    client = PostgrestClient(f"{url.rstrip('/')}/rest/v1", api_key=key, access_token=access_token, pool_size=pool_size)
+    return client, user_id
+
+
+def load_checkpoint(path: str) -> dict:
+    if not path or not os.path.exists(path):
+        return {}
     try:
-        df = pd.read_sql_query("SELECT name, url, created_at FROM blogs", conn)
-    except Exception as e:
-        print(f"Error reading blogs: {e}")
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return data if isinstance(data, dict) else {}
+    except Exception:
         return {}
-    finally:
-        conn.close()
 
-    if df.empty:
-        print("No blogs found.")
-        return {}
 
-    # Since we need a user_id for RLS policy "Users can insert their own blogs",
-    # but we are running this script likely as a service_role or we need to sign in.
-    # If we use ANON key, we need to sign in.
-    # For migration, it's easier to disable RLS temporarily or use SERVICE_ROLE key.
-    # Assuming user provides ANON key, we might need to sign in or just try inserting.
-    # If RLS is strict (auth.uid() = user_id), we need a user.
-    # Let's ask user to provide email/pass or use service role?
-    # Or we can just insert and see. If RLS blocks, we tell user.
-    
-    # Actually, the user script usually runs with their own credentials.
-    # Let's try to sign in if credentials are in env, else prompt?
-    # Or just assume the user will disable RLS for migration or use Service Role Key.
-    
-    # We will just attempt insert. If it fails, we print error.
-    
-    # We need to map blog_name/url to new ID.
-    blog_map = {} # name -> id
-    
-    for _, row in df.iterrows():
-        data = {
-            "name": row["name"],
-            "url": row["url"],
-            "created_at": row["created_at"],
-            # "user_id": ??? -> We need a user_id. 
-            # If we don't provide it, and column is NOT NULL, it fails.
-            # My SQL said: user_id uuid references auth.users not null.
-            # So we MUST have a user_id.
-        }
-        
-        # We need a logged in user.
-        print(f"Preparing to upload blog: {row['name']}")
-        
-    return df
-
-def main():
-    print("Migration Script")
-    print("Note: You must have RLS disabled or provide a Service Role Key to bypass RLS,")
-    print("OR ensure you are logged in. (This script uses basic insert).")
-    print("Also, 'blogs' table requires 'user_id'. This script assumes you handle auth or defaults.")
-    
-    # Actually, without user_id, insert will fail.
-    # I should update the SQL to make user_id optional OR provide a way to set it.
-    # Or the script asks for email/password to login first.
-    
-    email = input("Enter your Supabase User Email: ")
-    password = input("Enter your Supabase User Password: ")
-    
-    try:
-        session = supabase.auth.sign_in_with_password({"email": email, "password": password})
-        user_id = session.user.id
-        print(f"Logged in as {user_id}")
-    except Exception as e:
-        print(f"Login failed: {e}")
-        return
+def save_checkpoint(path: str, data: dict):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)
 
-    # 1. Migrate Blogs
-    blog_map = {} # url -> id
-    conn = get_sqlite_conn("data.db")
+
+def migrate_blogs(client: PostgrestClient, user_id: str | None, batch_size: int = 500) -> dict[str, int]:
+    # blogs 는 url 기준으로 upsert 하고, 응답으로 name -> id 맵을 한 번에 만든다.
+    name_map: dict[str, int] = {}
+    if not os.path.exists("data.db"):
+        return name_map
+    conn = sqlite3.connect("data.db")
     try:
-        # Check if table exists
-        cursor = conn.cursor()
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='blogs'")
-        if not cursor.fetchone():
+        cur = conn.cursor()
+        cur.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='blogs'")
+        if not cur.fetchone():
             print("No blogs table in data.db")
-        else:
-            df = pd.read_sql_query("SELECT name, url, created_at FROM blogs", conn)
-            for _, row in df.iterrows():
-                # Check if exists
-                res = supabase.table("blogs").select("id").eq("url", row["url"]).execute()
-                if res.data:
-                    print(f"Blog {row['name']} already exists.")
-                    blog_map[row["url"]] = res.data[0]['id']
-                else:
-                    payload = {
-                        "name": row["name"],
-                        "url": row["url"],
-                        "created_at": row["created_at"],
-                        "user_id": user_id
-                    }
-                    res = supabase.table("blogs").insert(payload).execute()
-                    if res.data:
-                        blog_id = res.data[0]['id']
-                        blog_map[row["url"]] = blog_id
-                        print(f"Uploaded blog: {row['name']}")
-                    else:
-                        print(f"Failed to upload blog: {row['name']}")
+            return name_map
+        cur.execute("SELECT name, url, created_at FROM blogs ORDER BY id")
+        while True:
+            rows = cur.fetchmany(batch_size)
+            if not rows:
+                break
+            payload = []
+            for name, url, created_at in rows:
+                item = {"name": name, "url": url, "created_at": created_at}
+                if user_id:
+                    item["user_id"] = user_id
+                payload.append(item)
+            res = client.upsert("blogs", payload, on_conflict="url", returning=True)
+            for b in res or []:
+                name_map[b["name"]] = b["id"]
     finally:
         conn.close()
+    print(f"Blogs upserted: {len(name_map)}")
+    return name_map
 
-    # 2. Migrate Posts
-    # Posts are scattered in posts_*.db or blog_data.db (global)
-    # The current app uses blog_data.db for global posts or posts_*.db for specific.
-    # Let's look at db_manager.py logic. It seems to use both?
-    # We will look for all .db files starting with posts_
-    
-    import glob
-    files = glob.glob("posts_*.db")
-    # Also blog_data.db
-    if os.path.exists("blog_data.db"):
-        files.append("blog_data.db")
-        
-    for db_file in files:
-        print(f"Processing {db_file}...")
-        conn = get_sqlite_conn(db_file)
+
+def _post_payload(rows: list[tuple], name_map: dict[str, int]) -> list[dict]:
+    # 같은 배치 안에서 키가 겹치면 PostgREST upsert 가 실패하므로 마지막 값만 남긴다.
+    by_key: dict[tuple, dict] = {}
+    for r in rows:
+        # r: (source, id, blog_name, title, date, content, link, created_at)
+        item = dict(zip(POST_COLUMNS, r[2:]))
+        item["blog_id"] = name_map.get(item["blog_name"])
+        by_key[(item["blog_name"], item["title"], item["date"])] = item
+    return list(by_key.values())
+
+
+def migrate_posts_file(client: PostgrestClient, db_path: str, name_map: dict[str, int], checkpoint: dict,
+                       checkpoint_path: str, batch_size: int = 500, workers: int = 4,
+                       update_existing: bool = False) -> int:
+    key = os.path.basename(db_path)
+    after_id = int(checkpoint.get(key, 0))
+    sent = 0
+    # 배치는 id 순서로 만들어지지만 완료 순서는 뒤섞이므로,
+    # 앞선 배치가 모두 끝난 지점까지만 체크포인트를 전진시킨다.
+    pending_ids: list[int] = []
+    done_ids: set[int] = set()
+    in_flight = {}
+
+    def advance():
+        nonlocal pending_ids
+        moved = False
+        while pending_ids and pending_ids[0] in done_ids:
+            last = pending_ids.pop(0)
+            done_ids.discard(last)
+            checkpoint[key] = last
+            moved = True
+        if moved:
+            save_checkpoint(checkpoint_path, checkpoint)
+
+    def collect(futs):
+        nonlocal sent
+        for f in futs:
+            last_id, n = in_flight.pop(f)
+            f.result()
+            done_ids.add(last_id)
+            sent += n
+        advance()
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
         try:
-            # Check if posts table exists
-            cursor = conn.cursor()
-            cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='posts'")
-            if not cursor.fetchone():
-                continue
-                
-            df = pd.read_sql_query("SELECT blog_name, title, date, content, link, created_at FROM posts", conn)
-            if df.empty:
-                continue
-                
-            records = []
-            for _, row in df.iterrows():
-                # Find blog_id. We need to find the blog url for this post to get ID.
-                # But post row only has blog_name.
-                # We can try to look up blog by name in our map (which is url -> id).
-                # We need name -> id map too.
-                
-                # Let's fetch all blogs from Supabase to build name map
-                pass 
-                
-            # To be efficient, let's bulk insert per file
-            # But we need blog_id.
-            # If we can't find blog_id, we might skip or insert with null (if allowed).
-            # My SQL: blog_id bigint references ... (nullable? No, I didn't say NOT NULL).
-            # Let's check SQL.
-            # blog_id bigint references public.blogs(id) on delete cascade
-            # It is nullable by default.
-            
-            # Let's try to match by name.
-            # First, get all blogs from Supabase
-            sb_blogs = supabase.table("blogs").select("id, name, url").execute()
-            name_map = {b['name']: b['id'] for b in sb_blogs.data}
-            
-            batch = []
-            for _, row in df.iterrows():
-                bid = name_map.get(row['blog_name'])
-                
-                # Check duplication
-                # It's expensive to check every post. 
-                # We'll just insert and ignore error if we had unique constraint (we don't).
-                # To avoid dupes, we might want to check existence.
-                # For now, let's just insert.
-                
-                post_data = {
-                    "blog_name": row["blog_name"],
-                    "title": row["title"],
-                    "date": row["date"],
-                    "content": row["content"],
-                    "link": row["link"],
-                    "created_at": row["created_at"],
-                    "blog_id": bid
-                }
-                batch.append(post_data)
-                
-                if len(batch) >= 100:
-                    supabase.table("posts").insert(batch).execute()
-                    print(f"Uploaded {len(batch)} posts from {db_file}")
-                    batch = []
-            
-            if batch:
-                supabase.table("posts").insert(batch).execute()
-                print(f"Uploaded {len(batch)} posts from {db_file}")
-
-        except Exception as e:
-            print(f"Error processing {db_file}: {e}")
-        finally:
-            conn.close()
+            for rows in iter_export_rows(db_path, after_id=after_id, chunk_size=batch_size):
+                payload = _post_payload(rows, name_map)
+                last_id = int(rows[-1][1])
+                fut = pool.submit(client.upsert, "posts", payload, POST_CONFLICT_KEY, not update_existing)
+                in_flight[fut] = (last_id, len(rows))
+                pending_ids.append(last_id)
+                if len(in_flight) >= workers:
+                    finished, _ = wait(list(in_flight), return_when=FIRST_COMPLETED)
+                    collect(finished)
+            if in_flight:
+                finished, _ = wait(list(in_flight))
+                collect(finished)
+        except BaseException:
+            for f in in_flight:
+                f.cancel()
+            raise
+    print(f"{key}: upserted {sent} rows (resumed after id {after_id})")
+    return sent
+
+
+def post_db_files() -> list[str]:
+    files = dbm.list_post_db_paths()
+    if os.path.exists("blog_data.db"):
+        files.append(os.path.abspath("blog_data.db"))
+    return files
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Migrate local SQLite blogs/posts to Supabase (PostgREST)")
+    ap.add_argument("--batch-size", type=int, default=500, help="rows per upsert request")
+    ap.add_argument("--workers", type=int, default=4, help="concurrent upsert requests")
+    ap.add_argument("--checkpoint", default=DEFAULT_CHECKPOINT, help="per-file progress file")
+    ap.add_argument("--reset", action="store_true", help="ignore the checkpoint and start over")
+    ap.add_argument("--update-existing", action="store_true",
+                    help="overwrite rows that already exist (default: keep existing rows)")
+    ap.add_argument("--rest-url", default=os.environ.get("POSTGREST_URL"),
+                    help="PostgREST base URL (e.g. http://localhost:3000) instead of SUPABASE_URL")
+    ap.add_argument("--user-id", default=os.environ.get("SUPABASE_USER_ID"), help="owner uuid for blogs.user_id")
+    ap.add_argument("--email", default=os.environ.get("SUPABASE_EMAIL"))
+    ap.add_argument("--password", default=os.environ.get("SUPABASE_PASSWORD"))
+    args = ap.parse_args(argv)
+
+    print("Migration Script")
+    email, password = args.email, args.password
+    if not args.rest_url and not args.user_id and not (email and password):
+        # 'blogs.user_id' 는 NOT NULL 이므로 RLS 를 통과하려면 로그인이 필요
+        email = input("Enter your Supabase User Email: ")
+        password = input("Enter your Supabase User Password: ")
+
+    client, login_user_id = connect_from_env(args.rest_url, pool_size=args.workers, email=email, password=password)
+    user_id = args.user_id or login_user_id
+    checkpoint = {} if args.reset else load_checkpoint(args.checkpoint)
+    started = time.monotonic()
+    total = 0
+    try:
+        name_map = migrate_blogs(client, user_id, args.batch_size)
+        for db_file in post_db_files():
+            total += migrate_posts_file(
+                client, db_file, name_map, checkpoint, args.checkpoint,
+                batch_size=args.batch_size, workers=args.workers, update_existing=args.update_existing,
+            )
+    finally:
+        client.close()
+    elapsed = time.monotonic() - started
+    print(f"Done: {total} posts in {elapsed:.1f}s ({total / max(elapsed, 1e-9):.0f} rows/s)")
+    return 0
+
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -0,0 +1,222 @@
+import math
+import queue
+import threading
+import time
+from collections import deque
+from typing import Callable, Iterator
+
+# 실패 점수는 반감기마다 절반으로 줄어든다. 점수가 임계값을 넘으면 쿨다운 동안 뒤로 미룬다.
+FAILURE_HALF_LIFE = 300.0
+FAILURE_THRESHOLD = 1.5
+COOLDOWN_SECONDS = 120.0
+# 첫 청크 지연의 EWMA 가 가장 빠른 모델의 이 배수를 넘으면 느린 모델로 본다
+EWMA_ALPHA = 0.3
+SLOW_FACTOR = 3.0
+# 첫 청크가 최근 지연의 이 분위수를 넘도록 안 오면 다음 모델에 헤지 요청을 보낸다
+HEDGE_PERCENTILE = 0.9
+HEDGE_MIN_SAMPLES = 5
+HEDGE_MIN_DELAY = 0.5
+LATENCY_SAMPLES = 50
+
+
+class ModelHealth:
+    def __init__(self):
+        self.ewma = None
+        self.samples = deque(maxlen=LATENCY_SAMPLES)
+        self.failure_score = 0.0
+        self.failure_at = 0.0
+        self.cooldown_until = 0.0
+        self.successes = 0
+        self.failures = 0
+        self.hedges = 0
+
+    def decayed_failures(self, now: float) -> float:
+        if not self.failure_score:
+            return 0.0
+        return self.failure_score * math.pow(0.5, (now - self.failure_at) / FAILURE_HALF_LIFE)
+
+
+class ModelRouter:
+    def __init__(self, hedge: bool = True, clock: Callable[[], float] = time.monotonic):
+        self.hedge = hedge
+        self.clock = clock
+        self._health: dict[str, ModelHealth] = {}
+        self._lock = threading.Lock()
+
+    def _h(self, name: str) -> ModelHealth:
+        h = self._health.get(name)
+        if h is None:
+            h = self._health[name] = ModelHealth()
+        return h
+
+    def _add_latency(self, h: ModelHealth, latency: float):
+        h.samples.append(latency)
+        h.ewma = latency if h.ewma is None else EWMA_ALPHA * latency + (1 - EWMA_ALPHA) * h.ewma
+
+    def record_latency(self, name: str, latency: float):
+        # 헤지에서 진 시도의 첫 청크 지연. 이긴 시도만 기록하면 분위수가 빠른 쪽으로 치우친다
+        with self._lock:
+            self._add_latency(self._h(name), latency)
+
+    def record_success(self, name: str, latency: float):
+        with self._lock:
+            h = self._h(name)
+            h.successes += 1
+            self._add_latency(h, latency)
+            now = self.clock()
+            h.failure_score = h.decayed_failures(now) * 0.5
+            h.failure_at = now
+
+    def record_failure(self, name: str):
+        with self._lock:
+            h = self._h(name)
+            h.failures += 1
+            now = self.clock()
+            h.failure_score = h.decayed_failures(now) + 1.0
+            h.failure_at = now
+            if h.failure_score >= FAILURE_THRESHOLD:
+                h.cooldown_until = now + COOLDOWN_SECONDS
+
+    def order(self, models: list) -> list:
+        # 설정된 우선순위를 유지하되, 쿨다운 중인 모델과 눈에 띄게 느린 모델은 뒤로 보낸다.
+        # 뒤로 보낸 모델도 마지막 수단으로는 시도한다.
+        now = self.clock()
+        with self._lock:
+            ewmas = [self._h(m.name).ewma for m in models]
+            known = [e for e in ewmas if e is not None]
+            fastest = min(known) if known else None
+
+            def key(i):
+                h = self._h(models[i].name)
+                cooling = h.cooldown_until > now
+                slow = fastest is not None and h.ewma is not None and h.ewma > SLOW_FACTOR * fastest
+                return (cooling, slow, i)
+
+            return [models[i] for i in sorted(range(len(models)), key=key)]
+
+    def hedge_delay(self, name: str) -> float | None:
+        with self._lock:
+            xs = sorted(self._h(name).samples)
+        if len(xs) < HEDGE_MIN_SAMPLES:
+            return None
+        return max(HEDGE_MIN_DELAY, xs[min(len(xs) - 1, int(len(xs) * HEDGE_PERCENTILE))])
+
+    def stats(self) -> dict[str, dict]:
+        now = self.clock()
+        with self._lock:
+            return {
+                name: {
+                    "ewma_latency": h.ewma,
+                    "failure_score": round(h.decayed_failures(now), 3),
+                    "cooling_down": h.cooldown_until > now,
+                    "successes": h.successes,
+                    "failures": h.failures,
+                    "hedges": h.hedges,
+                }
+                for name, h in self._health.items()
+            }
+
+    def stream(self, models: list, parts: list[str], on_model: Callable[[str], None] | None = None) -> Iterator[str]:
+        # 각 시도는 별도 스레드에서 돌고 청크를 큐로 보낸다. 첫 청크를 보낸 시도가 승자가 되고,
+        # 나머지는 다음 청크에서 멈춘다. 승자가 정해지기 전의 실패는 다음 모델로 넘어간다.
+        if not models:
+            raise ValueError("ModelRouter.stream needs at least one model")
+        models = self.order(models)
+        q: queue.Queue = queue.Queue()
+        stops: list[threading.Event] = []
+        started: list[float] = []
+        running: set[int] = set()
+        sampled: set[int] = set()
+        winner = None
+        last_err = None
+
+        def run(idx, m, stop):
+            first = True
+            try:
+                for text in m.stream(parts):
+                    if stop.is_set():
+                        if first:
+                            # 이미 진 시도: 큐로 보내지 않으므로 여기서 지연만 남긴다
+                            self.record_latency(m.name, self.clock() - started[idx])
+                        return
+                    first = False
+                    q.put((idx, "chunk", text))
+                q.put((idx, "done", None))
+            except Exception as e:
+                q.put((idx, "error", e))
+
+        def launch():
+            idx = len(stops)
+            stop = threading.Event()
+            stops.append(stop)
+            started.append(self.clock())
+            running.add(idx)
+            threading.Thread(target=run, args=(idx, models[idx], stop), daemon=True).start()
+
+        launch()
+        try:
+            while True:
+                timeout = None
+                if winner is None and self.hedge and len(stops) < len(models):
+                    latest = len(stops) - 1
+                    delay = self.hedge_delay(models[latest].name)
+                    if delay is not None:
+                        timeout = max(0.0, started[latest] + delay - self.clock())
+                try:
+                    idx, kind, val = q.get(timeout=timeout)
+                except queue.Empty:
+                    with self._lock:
+                        self._h(models[len(stops) - 1].name).hedges += 1
+                    launch()
+                    continue
+                if winner is not None and idx != winner:
+                    if kind == "chunk" and idx not in sampled:
+                        # 승자가 정해지기 직전에 첫 청크를 보낸 시도
+                        sampled.add(idx)
+                        self.record_latency(models[idx].name, self.clock() - started[idx])
+                    continue
+                if kind == "chunk":
+                    if winner is None:
+                        winner = idx
+                        self.record_success(models[idx].name, self.clock() - started[idx])
+                        for i, stop in enumerate(stops):
+                            if i != idx:
+                                stop.set()
+                        if on_model:
+                            on_model(models[idx].name)
+                    yield val
+                    continue
+                if winner == idx:
+                    if kind == "error":
+                        self.record_failure(models[idx].name)
+                        raise val
+                    return
+                # 첫 청크 전에 끝난 시도: 빈 응답도 실패로 본다
+                running.discard(idx)
+                self.record_failure(models[idx].name)
+                last_err = val if kind == "error" else RuntimeError(f"{models[idx].name}: empty response")
+                if not running:
+                    if len(stops) < len(models):
+                        launch()
+                    else:
+                        raise last_err
+        finally:
+            for stop in stops:
+                stop.set()
+
+    def complete(self, models: list, parts: list[str]) -> tuple[str, str]:
+        # 스트리밍 없이 전체 응답이 필요한 호출용. (응답, 사용한 모델)
+        used = {}
+        text = "".join(self.stream(models, parts, on_model=lambda name: used.setdefault("model", name)))
+        return text, used.get("model", "")
+
+
+_router: ModelRouter | None = None
+
+
+def get_router() -> ModelRouter:
+    # 프로세스 안에서 공유해야 Streamlit 재실행 사이에도 모델 상태가 유지된다
+    global _router
+    if _router is None:
+        _router = ModelRouter()
+    return _router
@@ -0,0 +1,369 @@
+import argparse
+import hashlib
+import os
+import re
+import sqlite3
+import zlib
+
+import numpy as np
+
+import db_manager as dbm
+
+DB_PATH = "near_dup.db"
+SHINGLE = 5
+NUM_PERM = 128
+# 16 밴드 x 8 행: 자카드 유사도 약 0.7 부터 후보로 잡힌다
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+THRESHOLD = 0.8
+# 너무 짧은 글은 우연히 겹치기 쉬워서 비교하지 않는다
+MIN_CHARS = 200
+
+# p < 2^31 이고 a, b, x 를 모두 p 미만으로 줄여 두면 a*x + b < 2^63 이라 uint64 에서 넘치지 않는다
+_P = np.uint64(2**31 - 1)
+_rng = np.random.default_rng(20240501)
+_A = _rng.integers(1, int(_P), NUM_PERM, dtype=np.uint64)
+_B = _rng.integers(0, int(_P), NUM_PERM, dtype=np.uint64)
+# 서명 계산이 바뀌면 올린다. 이전 버전으로 만든 near_dup.db 는 비우고 다시 색인한다
+SIG_VERSION = 2
+_WS_RE = re.compile(r"\s+")
+
+
+def mode() -> str:
+    # off: 사용 안 함 / flag: 저장하고 표시만 / skip: 수집 시 건너뜀
+    m = os.environ.get("NEAR_DUP_MODE", "flag").strip().lower()
+    return m if m in {"off", "flag", "skip"} else "flag"
+
+
+def get_conn():
+    conn = sqlite3.connect(DB_PATH, timeout=30, check_same_thread=False)
+    conn.executescript(
+        """
+        CREATE TABLE IF NOT EXISTS minhash_docs (
+            doc_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            blog_key TEXT NOT NULL,
+            post_id INTEGER NOT NULL,
+            blog_name TEXT NOT NULL,
+            title TEXT NOT NULL,
+            date TEXT NOT NULL,
+            sig BLOB NOT NULL,
+            dup_of INTEGER,
+            similarity REAL,
+            UNIQUE (blog_key, post_id)
+        );
+        CREATE TABLE IF NOT EXISTS minhash_bands (
+            band INTEGER NOT NULL,
+            bucket INTEGER NOT NULL,
+            doc_id INTEGER NOT NULL,
+            PRIMARY KEY (band, bucket, doc_id)
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS minhash_bands_doc ON minhash_bands(doc_id);
+        CREATE TABLE IF NOT EXISTS minhash_state (
+            blog_key TEXT PRIMARY KEY,
+            last_post_id INTEGER NOT NULL
+        );
+        """
+    )
+    if conn.execute("PRAGMA user_version").fetchone()[0] < SIG_VERSION:
+        with conn:
+            conn.execute("DELETE FROM minhash_bands")
+            conn.execute("DELETE FROM minhash_docs")
+            conn.execute("DELETE FROM minhash_state")
+            conn.execute(f"PRAGMA user_version = {SIG_VERSION}")
+    return conn
+
+
+def signature(text: str) -> np.ndarray | None:
+    t = _WS_RE.sub(" ", (text or "").lower()).strip()
+    if len(t) < MIN_CHARS:
+        return None
+    shingles = np.unique(np.fromiter(
+        (zlib.crc32(t[i:i + SHINGLE].encode("utf-8")) for i in range(len(t) - SHINGLE + 1)),
+        dtype=np.uint64,
+    )) % _P
+    # 순열 h(x) = (a*x + b) mod p 를 모든 shingle 에 한 번에 적용하고 최소값을 취한다
+    return ((np.outer(_A, shingles) + _B[:, None]) % _P).min(axis=1).astype(np.uint32)
+
+
+def band_keys(sig: np.ndarray) -> list[int]:
+    out = []
+    for b in range(BANDS):
+        h = hashlib.blake2b(sig[b * ROWS:(b + 1) * ROWS].tobytes(), digest_size=8).digest()
+        out.append(int.from_bytes(h, "big", signed=True))
+    return out
+
+
+def similarity(a: np.ndarray, b: np.ndarray) -> float:
+    return float(np.mean(a == b))
+
+
+def _candidates(conn, keys: list[int]) -> set[int]:
+    cands: set[int] = set()
+    for band, bucket in enumerate(keys):
+        cands.update(r[0] for r in conn.execute(
+            "SELECT doc_id FROM minhash_bands WHERE band = ? AND bucket = ?", (band, bucket)))
+    return cands
+
+
+def find_similar(conn, sig: np.ndarray, threshold: float = THRESHOLD, exclude: int | None = None,
+                 keys: list[int] | None = None) -> list[dict]:
+    # 밴드 버킷이 하나라도 같은 문서만 꺼내서 서명으로 유사도를 확인한다 (전체 비교 없음)
+    cands = _candidates(conn, keys or band_keys(sig))
+    cands.discard(exclude)
+    out = []
+    for doc_id in cands:
+        row = conn.execute(
+            "SELECT blog_key, post_id, blog_name, title, date, sig FROM minhash_docs WHERE doc_id = ?", (doc_id,)
+        ).fetchone()
+        if not row:
+            continue
+        s = similarity(sig, np.frombuffer(row[5], dtype=np.uint32))
+        if s >= threshold:
+            out.append({"doc_id": doc_id, "blog_key": row[0], "post_id": row[1], "blog_name": row[2],
+                        "title": row[3], "date": row[4], "similarity": s})
+    return sorted(out, key=lambda r: (-r["similarity"], r["doc_id"]))
+
+
+class IngestChecker:
+    # 수집 중 사용: 이미 색인된 글 + 이번 수집에서 저장했지만 아직 색인 전인 글과 비교
+    def __init__(self, threshold: float = THRESHOLD):
+        self.threshold = threshold
+        self.conn = None
+        self._pending: list[tuple[np.ndarray, list[int], str]] = []
+
+    def check(self, content: str) -> dict | None:
+        sig = signature(content)
+        if sig is None:
+            return None
+        keys = band_keys(sig)
+        if self.conn is None:
+            self.conn = get_conn()
+        hits = find_similar(self.conn, sig, self.threshold, keys=keys)
+        best = hits[0] if hits else None
+        for psig, pkeys, ptitle in self._pending:
+            if any(a == b for a, b in zip(keys, pkeys)):
+                s = similarity(sig, psig)
+                if s >= self.threshold and (best is None or s > best["similarity"]):
+                    best = {"doc_id": None, "title": ptitle, "similarity": s, "blog_name": "", "date": ""}
+        return best
+
+    def add(self, title: str, content: str):
+        sig = signature(content)
+        if sig is not None:
+            self._pending.append((sig, band_keys(sig), title))
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+
+def _insert_doc(conn, key: str, pid: int, blog_name: str, title: str, d: str, sig: np.ndarray) -> bool:
+    # 먼저 쓴 글을 원본으로 둔다: 비슷한 글이 더 최근이면 그쪽을 이 글의 중복으로 표시
+    keys = band_keys(sig)
+    hits = find_similar(conn, sig, keys=keys)
+    older = [h for h in hits if h["date"] <= d]
+    best = older[0] if older else None
+    cur = conn.execute(
+        "INSERT OR IGNORE INTO minhash_docs(blog_key, post_id, blog_name, title, date, sig, dup_of, similarity) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        (key, pid, blog_name, title, d, sig.tobytes(),
+         best["doc_id"] if best else None, best["similarity"] if best else None),
+    )
+    if cur.rowcount == 0:
+        return False
+    doc_id = cur.lastrowid
+    conn.executemany("INSERT OR IGNORE INTO minhash_bands(band, bucket, doc_id) VALUES (?, ?, ?)",
+                     [(b, k, doc_id) for b, k in enumerate(keys)])
+    if not best:
+        conn.executemany("UPDATE minhash_docs SET dup_of = ?, similarity = ? WHERE doc_id = ? AND dup_of IS NULL",
+                         [(doc_id, h["similarity"], h["doc_id"]) for h in hits])
+    return True
+
+
+def index_blog(blog_url: str, batch_size: int = 500) -> int:
+    # 새 글만 색인하면서 비슷한 글끼리 dup_of 로 연결한다
+    indexed = 0
+    db_path = dbm.post_db_path_for(blog_url)
+    if not os.path.exists(db_path):
+        return 0
+    key = dbm.blog_key_for(blog_url)
+    conn = get_conn()
+    pconn = dbm.get_post_conn_for(blog_url)
+    try:
+        row = conn.execute("SELECT last_post_id FROM minhash_state WHERE blog_key = ?", (key,)).fetchone()
+        last_id = row[0] if row else 0
+        while True:
+            rows = pconn.execute(
+                "SELECT id, blog_name, title, date, content FROM posts WHERE id > ? ORDER BY id LIMIT ?",
+                (last_id, batch_size),
+            ).fetchall()
+            if not rows:
+                break
+            for pid, blog_name, title, d, content in rows:
+                last_id = pid
+                sig = signature(content)
+                if sig is not None and _insert_doc(conn, key, pid, blog_name, title, d, sig):
+                    indexed += 1
+            conn.execute(
+                "INSERT INTO minhash_state(blog_key, last_post_id) VALUES (?, ?) "
+                "ON CONFLICT(blog_key) DO UPDATE SET last_post_id = excluded.last_post_id",
+                (key, last_id),
+            )
+            conn.commit()
+    finally:
+        pconn.close()
+        conn.close()
+    return indexed
+
+
+def remove_posts(blog_url: str, post_ids: list[int]):
+    # 내용이 바뀐 글은 지운 뒤 reindex_posts 로 다시 넣는다
+    key = dbm.blog_key_for(blog_url)
+    conn = get_conn()
+    try:
+        for pid in post_ids:
+            row = conn.execute("SELECT doc_id FROM minhash_docs WHERE blog_key = ? AND post_id = ?", (key, pid)).fetchone()
+            if not row:
+                continue
+            conn.execute("DELETE FROM minhash_bands WHERE doc_id = ?", (row[0],))
+            conn.execute("UPDATE minhash_docs SET dup_of = NULL, similarity = NULL WHERE dup_of = ?", (row[0],))
+            conn.execute("DELETE FROM minhash_docs WHERE doc_id = ?", (row[0],))
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def reindex_posts(blog_url: str, post_ids: list[int]):
+    remove_posts(blog_url, post_ids)
+    key = dbm.blog_key_for(blog_url)
+    conn = get_conn()
+    pconn = dbm.get_post_conn_for(blog_url)
+    try:
+        for pid in post_ids:
+            row = pconn.execute("SELECT blog_name, title, date, content FROM posts WHERE id = ?", (pid,)).fetchone()
+            sig = signature(row[3]) if row else None
+            if sig is not None:
+                _insert_doc(conn, key, pid, row[0], row[1], row[2], sig)
+        conn.commit()
+    finally:
+        pconn.close()
+        conn.close()
+
+
+def duplicate_post_ids(blog_url: str) -> set[int]:
+    # 이 블로그에서 다른 글의 중복으로 표시된 글 (AI 컨텍스트에서 제외할 때 사용)
+    if not os.path.exists(DB_PATH):
+        return set()
+    conn = get_conn()
+    try:
+        return {r[0] for r in conn.execute(
+            "SELECT post_id FROM minhash_docs WHERE blog_key = ? AND dup_of IS NOT NULL",
+            (dbm.blog_key_for(blog_url),),
+        )}
+    finally:
+        conn.close()
+
+
+def clusters(threshold: float = THRESHOLD) -> list[list[dict]]:
+    # 같은 밴드 버킷에 들어간 쌍을 유사도로 확인하고 union-find 로 묶는다
+    conn = get_conn()
+    try:
+        parent: dict[int, int] = {}
+
+        def find(x):
+            parent.setdefault(x, x)
+            while parent[x] != x:
+                parent[x] = parent[parent[x]]
+                x = parent[x]
+            return x
+
+        sigs: dict[int, np.ndarray] = {}
+
+        def sig_of(doc_id):
+            s = sigs.get(doc_id)
+            if s is None:
+                blob = conn.execute("SELECT sig FROM minhash_docs WHERE doc_id = ?", (doc_id,)).fetchone()[0]
+                s = sigs[doc_id] = np.frombuffer(blob, dtype=np.uint32)
+            return s
+
+        checked = set()
+        for (members,) in conn.execute(
+            "SELECT group_concat(doc_id) FROM minhash_bands GROUP BY band, bucket HAVING COUNT(*) > 1"
+        ):
+            ids = sorted(int(x) for x in members.split(","))
+            for i, a in enumerate(ids):
+                for b in ids[i + 1:]:
+                    if (a, b) in checked or find(a) == find(b):
+                        continue
+                    checked.add((a, b))
+                    if similarity(sig_of(a), sig_of(b)) >= threshold:
+                        ra, rb = find(a), find(b)
+                        parent[max(ra, rb)] = min(ra, rb)
+
+        groups: dict[int, list[int]] = {}
+        for x in parent:
+            groups.setdefault(find(x), []).append(x)
+        out = []
+        for root, ids in groups.items():
+            if len(ids) < 2:
+                continue
+            rows = conn.execute(
+                f"SELECT doc_id, blog_key, post_id, blog_name, title, date FROM minhash_docs "
+                f"WHERE doc_id IN ({','.join('?' * len(ids))}) ORDER BY date, doc_id",
+                ids,
+            ).fetchall()
+            out.append([{"doc_id": r[0], "blog_key": r[1], "post_id": r[2], "blog_name": r[3],
+                         "title": r[4], "date": r[5]} for r in rows])
+        return sorted(out, key=len, reverse=True)
+    finally:
+        conn.close()
+
+
+def mark_clusters(groups: list[list[dict]]) -> int:
+    # 묶음마다 가장 먼저 쓴 글을 원본으로 두고 나머지를 dup_of 로 표시
+    conn = get_conn()
+    n = 0
+    try:
+        for g in groups:
+            root = g[0]["doc_id"]
+            for m in g[1:]:
+                conn.execute("UPDATE minhash_docs SET dup_of = ? WHERE doc_id = ? AND dup_of IS NULL", (root, m["doc_id"]))
+                n += 1
+        conn.commit()
+    finally:
+        conn.close()
+    return n
+
+
+def _blog_url_for_path(path: str) -> str:
+    return f"https://blog.naver.com/{dbm.blog_id_from_db_path(path)}"
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="MinHash/LSH near-duplicate index over posts_*.db")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("index", help="index new posts of every posts_*.db")
+    cl = sub.add_parser("clusters", help="group near-duplicate posts across all indexed blogs")
+    cl.add_argument("--threshold", type=float, default=THRESHOLD)
+    cl.add_argument("--mark", action="store_true", help="묶음의 첫 글 외에는 중복으로 표시")
+    args = ap.parse_args(argv)
+
+    if args.cmd == "index":
+        for path in dbm.list_post_db_paths():
+            url = _blog_url_for_path(path)
+            n = index_blog(url)
+            print(f"{os.path.basename(path)}: indexed {n}, flagged {len(duplicate_post_ids(url))}")
+    elif args.cmd == "clusters":
+        groups = clusters(args.threshold)
+        for g in groups:
+            print(f"- {len(g)} posts")
+            for m in g:
+                print(f"    [{m['blog_name']}] {m['date']} {m['title']}")
+        print(f"{len(groups)} clusters, {sum(len(g) for g in groups)} posts")
+        if args.mark:
+            print(f"marked {mark_clusters(groups)} posts as duplicates")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+import threading
+from collections import OrderedDict
+from datetime import date
+
+import activity_stats
+import db_manager as dbm
+
+# 너무 큰 결과는 캐시하지 않는다 (메모리 보호)
+MAX_CACHED_ROWS = 20000
+
+
+class LRUCache:
+    def __init__(self, maxsize: int = 64):
+        self.maxsize = maxsize
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return True, self._data[key]
+            self.misses += 1
+            return False, None
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._data), "hits": self.hits, "misses": self.misses}
+
+
+_cache = LRUCache(64)
+
+
+def _copy(value):
+    # 호출한 쪽이 결과(리스트나 행 dict)를 고쳐도 캐시는 그대로 남도록 복사해서 돌려준다
+    if isinstance(value, list):
+        return [dict(r) if isinstance(r, dict) else r for r in value]
+    return value
+
+
+def _cached(key, loader):
+    hit, value = _cache.get(key)
+    if hit:
+        return _copy(value)
+    value = loader()
+    if not isinstance(value, list) or len(value) <= MAX_CACHED_ROWS:
+        _cache.put(key, value)
+        return _copy(value)
+    return value
+
+
+def load_blogs() -> list[dict]:
+    path = dbm.blog_db_path()
+    return _cached(("blogs", path, dbm.write_generation(path)), dbm.load_blogs)
+
+
+def query_posts_for_blog(blog_url: str | None, start_date: date, end_date: date, keyword: str) -> list[dict]:
+    # 페이지 이동처럼 조건이 같은 rerun 은 DB(및 ensure/마이그레이션 확인)를 건너뛴다.
+    if not blog_url:
+        return dbm.query_posts_for_blog(blog_url, start_date, end_date, keyword)
+    path = dbm.post_db_path_for(blog_url)
+    key = (
+        "posts", path, dbm.write_generation(path),
+        start_date.isoformat(), end_date.isoformat(), (keyword or "").strip(),
+    )
+    return _cached(key, lambda: dbm.query_posts_for_blog(blog_url, start_date, end_date, keyword))
+
+
+def load_activity() -> list[tuple]:
+    # 어느 posts DB 에든 쓰기가 있으면 키가 바뀐다
+    paths = dbm.list_post_db_paths()
+    key = ("activity",) + tuple((p, dbm.write_generation(p)) for p in paths)
+    return _cached(key, lambda: activity_stats.load_daily(paths))
+
+
+def cache_stats() -> dict:
+    return _cache.stats()
+
+
+def clear():
+    _cache.clear()
@@ -0,0 +1,226 @@
+import argparse
+import difflib
+import hashlib
+import json
+import sqlite3
+import zlib
+from datetime import datetime, timedelta, timezone
+
+import bm25_index
+import db_manager as dbm
+import enrichment
+import keyword_trends
+import near_dup
+import scraper
+import semantic_index
+
+# 저장한 글을 다시 확인해서 수정된 글만 제자리에서 갱신한다.
+# 조건부 요청(ETag/Last-Modified)으로 304 면 본문을 받지 않고, 200 이어도 본문 지문이 같으면 쓰지 않는다.
+# 바뀐 글은 이전 내용을 되돌릴 수 있는 압축 diff 로 post_revisions 에 남긴다.
+RECHECK_AFTER = timedelta(days=7)
+DEFAULT_LIMIT = 30
+
+
+def fingerprint(title: str, content: str) -> str:
+    return hashlib.sha1(f"{title}\n{content}".encode("utf-8")).hexdigest()
+
+
+def ensure_tables(conn):
+    conn.executescript(
+        """
+        CREATE TABLE IF NOT EXISTS post_fingerprints (
+            post_id INTEGER PRIMARY KEY,
+            fingerprint TEXT NOT NULL,
+            etag TEXT,
+            last_modified TEXT,
+            checked_at TEXT,
+            changed_at TEXT,
+            revision INTEGER NOT NULL DEFAULT 0
+        );
+        CREATE TABLE IF NOT EXISTS post_revisions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            post_id INTEGER NOT NULL,
+            revision INTEGER NOT NULL,
+            changed_at TEXT NOT NULL,
+            old_title TEXT NOT NULL,
+            diff BLOB NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS post_revisions_post ON post_revisions(post_id, revision);
+        """
+    )
+
+
+def backfill(conn) -> int:
+    # 지문이 없는 글은 지금 저장된 내용으로 채운다 (요청 없음)
+    rows = conn.execute(
+        "SELECT p.id, p.title, p.content FROM posts p LEFT JOIN post_fingerprints f ON f.post_id = p.id "
+        "WHERE f.post_id IS NULL"
+    ).fetchall()
+    conn.executemany(
+        "INSERT INTO post_fingerprints(post_id, fingerprint) VALUES (?, ?)",
+        [(pid, fingerprint(t, c)) for pid, t, c in rows],
+    )
+    conn.commit()
+    return len(rows)
+
+
+def make_diff(old: str, new: str) -> bytes:
+    # new 에서 old 를 복원하는 줄 단위 diff: 같은 구간은 위치만, 다른 구간은 old 의 줄을 저장
+    a, b = old.split("\n"), new.split("\n")
+    ops = []
+    for tag, i1, i2, j1, j2 in difflib.SequenceMatcher(None, a, b, autojunk=False).get_opcodes():
+        ops.append([j1, j2] if tag == "equal" else [j1, j2, a[i1:i2]])
+    return zlib.compress(json.dumps(ops, ensure_ascii=False).encode("utf-8"), 9)
+
+
+def apply_diff(new: str, diff: bytes) -> str:
+    b = new.split("\n")
+    out = []
+    for op in json.loads(zlib.decompress(diff)):
+        out.extend(b[op[0]:op[1]] if len(op) == 2 else op[2])
+    return "\n".join(out)
+
+
+def candidates(conn, limit: int = DEFAULT_LIMIT, older_than: timedelta = RECHECK_AFTER,
+               sample: float | None = None) -> list[tuple]:
+    # (id, link, fingerprint, etag, last_modified, revision). 본문은 바뀐 글만 revalidate_blog 에서 읽는다.
+    # 한 번도 확인 안 한 글 -> 가장 오래 전에 확인한 글 순. 같은 조건이면 최근 글 먼저 (수정이 잦다)
+    cutoff = (datetime.now(timezone.utc) - older_than).isoformat()
+    src = ("FROM posts p JOIN post_fingerprints f ON f.post_id = p.id "
+           "WHERE f.checked_at IS NULL OR f.checked_at < ?")
+    order = "f.checked_at IS NOT NULL, f.checked_at, p.date DESC"
+    if sample:
+        # 대상 중 sample 비율만 무작위로: 개수만 세고 고르기는 SQL 에 맡긴다
+        total = conn.execute(f"SELECT COUNT(*) {src}", (cutoff,)).fetchone()[0]
+        limit = min(limit, max(1, int(total * sample))) if total else 0
+        order = "RANDOM()"
+    return conn.execute(
+        f"SELECT p.id, p.link, f.fingerprint, f.etag, f.last_modified, f.revision {src} ORDER BY {order} LIMIT ?",
+        (cutoff, limit),
+    ).fetchall()
+
+
+def _apply_change(conn, post_id: int, revision: int, old_title: str, old_content: str, title: str,
+                  content: str, now: str):
+    conn.execute(
+        "INSERT INTO post_revisions(post_id, revision, changed_at, old_title, diff) VALUES (?, ?, ?, ?, ?)",
+        (post_id, revision + 1, now, old_title, make_diff(old_content, content)),
+    )
+    conn.execute("UPDATE posts SET title = ?, content = ? WHERE id = ?", (title, content, post_id))
+    # 이 글의 BM25 청크/키워드/요약은 다시 만든다
+    enrichment.forget_posts(conn, [post_id])
+
+
+def revalidate_blog(blog_url: str, limit: int = DEFAULT_LIMIT, older_than: timedelta = RECHECK_AFTER,
+                    sample: float | None = None, log_cb=None, should_stop_cb=None) -> dict:
+    dbm.ensure_posts_table_for(blog_url)
+    conn = dbm.get_post_conn_for(blog_url)
+    conn.execute("PRAGMA busy_timeout=30000")
+    stats = {"checked": 0, "not_modified": 0, "unchanged": 0, "changed": 0, "failed": 0}
+    changed_ids = []
+    try:
+        ensure_tables(conn)
+        backfill(conn)
+        for pid, link, fp, etag, last_mod, revision in candidates(conn, limit, older_than, sample):
+            if should_stop_cb and should_stop_cb():
+                break
+            now = datetime.now(timezone.utc).isoformat()
+            try:
+                status, html, etag, last_mod = scraper.fetch_conditional(link, etag, last_mod, log_cb=log_cb)
+            except Exception:
+                # fetch_conditional 이 이미 log_cb 로 남겼다
+                stats["failed"] += 1
+                continue
+            stats["checked"] += 1
+            if status == 304:
+                stats["not_modified"] += 1
+            else:
+                title, _d, content = scraper.parse_post(html)
+                new_fp = fingerprint(title, content)
+                if new_fp == fp or not content.strip():
+                    stats["unchanged"] += 1
+                else:
+                    old_title, old_content = conn.execute(
+                        "SELECT title, content FROM posts WHERE id = ?", (pid,)
+                    ).fetchone()
+                    try:
+                        _apply_change(conn, pid, revision, old_title, old_content, title, content, now)
+                    except sqlite3.IntegrityError:
+                        # 바뀐 제목이 다른 글과 (제목, 날짜) 가 겹침
+                        conn.rollback()
+                        stats["failed"] += 1
+                        continue
+                    conn.execute(
+                        "UPDATE post_fingerprints SET fingerprint = ?, changed_at = ?, revision = revision + 1 "
+                        "WHERE post_id = ?",
+                        (new_fp, now, pid),
+                    )
+                    changed_ids.append(pid)
+                    stats["changed"] += 1
+                    if log_cb:
+                        log_cb(f"Updated: {title} (revision {revision + 1})")
+            conn.execute(
+                "UPDATE post_fingerprints SET etag = ?, last_modified = ?, checked_at = ? WHERE post_id = ?",
+                (etag, last_mod, now, pid),
+            )
+            conn.commit()
+    finally:
+        conn.close()
+    if changed_ids:
+        dbm.bump_write_generation(dbm.post_db_path_for(blog_url))
+        bm25_index.reindex_posts(blog_url, changed_ids)
+        near_dup.reindex_posts(blog_url, changed_ids)
+        # 임베딩/키워드 행렬은 제자리 갱신이 없어서 통째로 다시 만든다
+        semantic_index.rebuild(blog_url)
+        keyword_trends.rebuild(blog_url)
+    return stats
+
+
+def history(blog_url: str, post_id: int) -> list[dict]:
+    # 최신 -> 과거 순으로 각 revision 의 (제목, 본문)을 diff 를 거꾸로 적용해 복원
+    conn = dbm.get_post_conn_for(blog_url)
+    try:
+        ensure_tables(conn)
+        row = conn.execute("SELECT title, content FROM posts WHERE id = ?", (post_id,)).fetchone()
+        if not row:
+            return []
+        revs = conn.execute(
+            "SELECT revision, changed_at, old_title, diff FROM post_revisions WHERE post_id = ? ORDER BY revision DESC",
+            (post_id,),
+        ).fetchall()
+    finally:
+        conn.close()
+    title, content = row
+    out = [{"revision": revs[0][0] if revs else 0, "changed_at": revs[0][1] if revs else None,
+            "title": title, "content": content}]
+    for i, (rev, _changed_at, old_title, diff) in enumerate(revs):
+        content = apply_diff(content, diff)
+        out.append({"revision": rev - 1, "changed_at": revs[i + 1][1] if i + 1 < len(revs) else None,
+                    "title": old_title, "content": content})
+    return out
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Re-check stored posts and update the ones that were edited")
+    ap.add_argument("--blog", action="append", help="blog url (default: every blog in data.db)")
+    ap.add_argument("--limit", type=int, default=DEFAULT_LIMIT, help="블로그당 확인할 글 수")
+    ap.add_argument("--older-than", type=float, default=RECHECK_AFTER.days, help="마지막 확인 후 지난 일 수")
+    ap.add_argument("--sample", type=float, help="대상 중 이 비율만 무작위로 확인 (0~1)")
+    ap.add_argument("--history", type=int, metavar="POST_ID", help="글의 수정 이력 출력 (--blog 하나와 함께)")
+    args = ap.parse_args(argv)
+
+    if args.history is not None:
+        if not args.blog or len(args.blog) != 1:
+            ap.error("--history needs exactly one --blog")
+        for h in history(args.blog[0], args.history):
+            print(f"--- revision {h['revision']} {h['changed_at'] or ''} {h['title']}")
+            print(h["content"][:500])
+        return
+    urls = args.blog or [b.url for b in dbm.iter_blogs()]
+    for url in urls:
+        stats = revalidate_blog(url, args.limit, timedelta(days=args.older_than), args.sample, log_cb=print)
+        print(url, stats)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,15 +4,22 @@ from datetime import datetime, date
 from urllib.parse import urlparse, parse_qs
 import time
 import random
-import sys
 
-import requests
 from bs4 import BeautifulSoup
 import db_manager as dbm
+import http_transport
 import xml.etree.ElementTree as ET
 from email.utils import parsedate_to_datetime
 
-HTTP_SESSION = requests.Session()
+# 요청 전 대기 / 글 저장 후 대기 (초, 균등분포). crawl_planner 가 소요 시간 추정에 쓴다
+FETCH_DELAY = (5.0, 20.0)
+SAVE_DELAY = (5.0, 20.0)
+
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+    "Referer": "https://blog.naver.com/",
+    "Accept-Language": "ko-KR,ko;q=0.9,en-US;q=0.8,en;q=0.7",
+}
 
 
 def get_conn():
@@ -69,8 +76,44 @@ def precise_sleep(seconds: float):
         time.sleep(min(0.1, end - now))
 
 
-def fetch(url: str, log_cb=None) -> str:
-    delay = random.uniform(5, 20)
+# 글 페이지는 본문 영역(div.se-main-container / #postViewArea)이 닫히면 그 뒤(댓글, 추천 글, 스크립트)는 받지 않는다.
+# 제목/날짜 메타는 <head> 와 본문 앞에 있으므로 이미 받은 상태다
+_REGION_START_RE = re.compile(
+    r"""<div\b[^>]*?(?:class=["'][^"']*\bse-main-container\b|id=["']postViewArea["'])""", re.I)
+_DIV_TAG_RE = re.compile(r"<(/?)div\b", re.I)
+
+
+class PostRegionDetector:
+    # http_transport.get_stream 의 stop 콜백. 새로 받은 텍스트를 넘기면 본문 영역의 </div> 를 만난 뒤 True
+    def __init__(self):
+        self.depth = None
+        self._tail = ""
+
+    def __call__(self, text: str) -> bool:
+        buf = self._tail + text
+        pos = 0
+        if self.depth is None:
+            m = _REGION_START_RE.search(buf)
+            if not m:
+                # 시작 태그가 청크 경계에 걸칠 수 있다
+                self._tail = buf[-512:]
+                return False
+            self.depth = 1
+            pos = m.end()
+        last = pos
+        for m in _DIV_TAG_RE.finditer(buf, pos):
+            self.depth += -1 if m.group(1) else 1
+            last = m.end()
+            if self.depth == 0:
+                return True
+        # 경계에 걸친 "</di" 같은 조각만 남긴다 (이미 센 태그는 다시 세지 않는다)
+        self._tail = buf[max(last, len(buf) - 5):]
+        return False
+
+
+def _get(url: str, headers: dict, log_cb=None, stop=None, ok: tuple[int, ...] = (200,)):
+    # fetch / fetch_conditional 공통: 요청 전 무작위 대기, 로그, ok 가 아닌 상태는 RuntimeError
+    delay = random.uniform(*FETCH_DELAY)
     if log_cb:
         try:
             log_cb(f"Delay {delay:.2f}s before GET {url}")
@@ -78,24 +121,20 @@ def fetch(url: str, log_cb=None) -> str:
             pass
     precise_sleep(delay)
     try:
-        r = HTTP_SESSION.get(
-            url,
-            headers={
-                "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-                "Referer": "https://blog.naver.com/",
-                "Accept-Language": "ko-KR,ko;q=0.9,en-US;q=0.8,en;q=0.7",
-            },
-            timeout=15,
-        )
-        if r.status_code == 200:
-            return r.text
-        else:
-            if log_cb:
+        r = http_transport.get_transport().get_stream(url, headers=headers, timeout=15, stop=stop)
+        if r.status_code in ok:
+            if r.capped and log_cb:
                 try:
-                    log_cb(f"Status {r.status_code} for {url}")
+                    log_cb(f"Size cap reached after {len(r.text)} chars for {url}")
                 except Exception:
                     pass
-            raise RuntimeError(f"HTTP {r.status_code} for {url}")
+            return r
+        if log_cb:
+            try:
+                log_cb(f"Status {r.status_code} for {url}")
+            except Exception:
+                pass
+        raise RuntimeError(f"HTTP {r.status_code} for {url}")
     except BaseException as e:
         if log_cb:
             try:
@@ -105,6 +144,35 @@ def fetch(url: str, log_cb=None) -> str:
         raise
 
 
+def fetch(url: str, log_cb=None, stop=None, allow_capped: bool = True) -> str | None:
+    # 본문은 Content-Type 별 크기 제한까지만 받는다. stop 이 있으면 필요한 부분을 받은 뒤 끊는다.
+    # allow_capped=False 면 크기 제한에 걸려 잘린 응답은 None
+    r = _get(url, HEADERS, log_cb=log_cb, stop=stop)
+    return None if r.capped and not allow_capped else r.text
+
+
+def fetch_post_html(url: str, log_cb=None) -> str | None:
+    # 본문 영역이 끝나기 전에 크기 제한에 걸린 글은 잘린 본문을 저장하지 않는다
+    return fetch(url, log_cb=log_cb, stop=PostRegionDetector(), allow_capped=False)
+
+
+def fetch_conditional(url: str, etag: str | None = None, last_modified: str | None = None,
+                      log_cb=None) -> tuple[int, str | None, str | None, str | None]:
+    # 이전 응답의 ETag/Last-Modified 로 조건부 요청. (status, 본문, etag, last_modified), 304 면 본문 None
+    headers = dict(HEADERS)
+    if etag:
+        headers["If-None-Match"] = etag
+    if last_modified:
+        headers["If-Modified-Since"] = last_modified
+    r = _get(url, headers, log_cb=log_cb, stop=PostRegionDetector(), ok=(200, 304))
+    if r.status_code == 304:
+        return 304, None, etag, last_modified
+    if r.capped:
+        # 잘린 본문으로 저장된 글을 덮어쓰지 않는다
+        raise RuntimeError(f"Page over size cap: {url}")
+    return 200, r.text, r.headers.get("ETag"), r.headers.get("Last-Modified")
+
+
 def find_post_links(html: str, blog_id_hint: str | None = None) -> list[str]:
     soup = BeautifulSoup(html, "html.parser")
     links = []
@@ -190,172 +258,152 @@ def parse_title_from_soup(soup: BeautifulSoup) -> str | None:
     return None
 
 
-def collect_blog_posts(blog_name: str, blog_url: str, start_date: date, end_date: date, progress_cb=None, log_cb=None, should_stop_cb=None) -> dict:
-    conn = None
-    try:
-        ensure_posts_table(blog_url)
-        conn = dbm.get_post_conn_for(blog_url)
-        cur = conn.cursor()
+def parse_post(post_html: str) -> tuple[str, date | None, str]:
+    # 글 페이지에서 (제목, 날짜, 본문). 제목이 없으면 본문 첫 줄
+    soup = BeautifulSoup(post_html, "html.parser")
+    d = parse_date_from_soup(soup)
+    title = parse_title_from_soup(soup) or ""
+    content = extract_text_only(soup)
+    if not title:
+        title = content.split("\n")[0][:80]
+    return title, d, content
+
+
+def discover_post_items(blog_url: str, start_date: date, end_date: date, log_cb=None) -> list[tuple[str, date | None]]:
+    # 블로그 첫 화면/글 목록/RSS 에서 기간 안의 글 링크를 찾는다. [(link, RSS 날짜 힌트)]
+    mobile_url = normalize_to_mobile(blog_url)
+    html = fetch(mobile_url, log_cb=log_cb)
+    if not html:
+        base_html = fetch(blog_url, log_cb=log_cb)
+        if base_html:
+            iframe_src = extract_iframe_src(base_html)
+            if iframe_src:
+                html = fetch(iframe_src, log_cb=log_cb)
+    if not html:
+        return []
+
+    blog_id_hint = get_blog_id_from_url(mobile_url)
+
+    links = find_post_links(html, blog_id_hint)
+    if not links and blog_id_hint:
+        alt_links = fetch_post_list_links(blog_id_hint, max_pages=10, log_cb=log_cb)
+        if alt_links:
+            links = alt_links
+    items_ordered: list[tuple[str, date | None]] = []
+    if blog_id_hint:
+        rss_items = fetch_rss_items(blog_id_hint, log_cb=log_cb)
+        if rss_items:
+            items_ordered = sorted(rss_items, key=lambda x: (x[1] is not None, x[1]), reverse=True)
+    if items_ordered:
+        filtered_items: list[tuple[str, date | None]] = []
+        for li, dd in items_ordered:
+            if dd is None:
+                continue
+            if dd < start_date:
+                break
+            if dd <= end_date:
+                filtered_items.append((li, dd))
+        iter_items = filtered_items
+    else:
+        iter_items = [(li, None) for li in links]
+    if log_cb:
+        try:
+            log_cb(f"Found {len(iter_items)} post links")
+        except Exception:
+            pass
+    return iter_items
 
-        mobile_url = normalize_to_mobile(blog_url)
-        html = fetch(mobile_url, log_cb=log_cb)
-        if not html:
-            base_html = fetch(blog_url, log_cb=log_cb)
-            if base_html:
-                iframe_src = extract_iframe_src(base_html)
-                if iframe_src:
-                    html = fetch(iframe_src, log_cb=log_cb)
-        if not html:
-            conn.close()
-            return {"total": 0, "saved": 0}
-
-        blog_id_hint = get_blog_id_from_url(mobile_url)
-
-        links = find_post_links(html, blog_id_hint)
-        if not links and blog_id_hint:
-            alt_links = fetch_post_list_links(blog_id_hint, max_pages=10, log_cb=log_cb)
-            if alt_links:
-                links = alt_links
-        rss_date_map: dict[str, date] = {}
-        items_ordered: list[tuple[str, date | None]] = []
-        if blog_id_hint:
-            rss_items = fetch_rss_items(blog_id_hint, log_cb=log_cb)
-            if rss_items:
-                for li, dd in rss_items:
-                    rss_date_map[li] = dd
-                items_ordered = sorted(rss_items, key=lambda x: (x[1] is not None, x[1]), reverse=True)
-        if items_ordered:
-            filtered_items: list[tuple[str, date | None]] = []
-            for li, dd in items_ordered:
-                if dd is None:
-                    continue
-                if dd < start_date:
-                    break
-                if dd <= end_date:
-                    filtered_items.append((li, dd))
-            iter_items = filtered_items
-            total = len(iter_items)
-        else:
-            iter_items = [(li, None) for li in links]
-            total = len(iter_items)
+
+def process_post(writer, blog_name: str, link: str, dd_hint: date | None, start_date: date, end_date: date,
+                 near_checker=None, near_mode: str = "off", log_cb=None) -> str:
+    # 글 하나를 받아 저장한다. "saved" / "duplicate" / "skipped"
+    post_html = fetch_post_html(link, log_cb=log_cb)
+    if not post_html:
         if log_cb:
             try:
-                log_cb(f"Found {total} post links")
+                log_cb("Skip: page empty or over size cap")
             except Exception:
                 pass
-        saved = 0
-        duplicates = 0
-        for i, (link, dd_hint) in enumerate(iter_items):
-            if should_stop_cb and should_stop_cb():
-                if log_cb:
-                    try:
-                        log_cb("Cancelled by user")
-                    except Exception:
-                        pass
-                break
-            if progress_cb:
-                progress_cb(int((i / max(total, 1)) * 100))
-            if log_cb:
-                try:
-                    log_cb(f"Processing [{i+1}/{total}] {link}")
-                except Exception:
-                    pass
-            post_html = fetch(link, log_cb=log_cb)
-            if not post_html:
-                continue
-            soup = BeautifulSoup(post_html, "html.parser")
-            d = parse_date_from_soup(soup)
-            if not d and dd_hint is not None:
-                d = dd_hint
-            if not d:
-                if log_cb:
-                    try:
-                        log_cb("Skip: date parse failed")
-                    except Exception:
-                        pass
-                continue
-            if d < start_date or d > end_date:
-                if log_cb:
-                    try:
-                        log_cb(f"Skip: {d.isoformat()} out of range")
-                    except Exception:
-                        pass
-                continue
-            title = parse_title_from_soup(soup) or ""
-            content = extract_text_only(soup)
-            d_str = d.isoformat()
-            if not title:
-                title = content.split("\n")[0][:80]
-            
-            if log_cb:
-                try:
-                    log_cb(f"Title: {title}")
-                except Exception:
-                    pass
+        return "skipped"
+    title, d, content = parse_post(post_html)
+    if not d and dd_hint is not None:
+        d = dd_hint
+    if not d:
+        if log_cb:
+            try:
+                log_cb("Skip: date parse failed")
+            except Exception:
+                pass
+        return "skipped"
+    if d < start_date or d > end_date:
+        if log_cb:
+            try:
+                log_cb(f"Skip: {d.isoformat()} out of range")
+            except Exception:
+                pass
+        return "skipped"
+    d_str = d.isoformat()
 
-            # [중복 수집 방지]
-            # 이미 DB에 (블로그명, 제목, 날짜)가 동일한 글이 있다면
-            # 내용은 비교하지 않고 건너뜁니다.
-            if is_duplicate(cur, blog_name, title, d_str):
-                duplicates += 1
-                if log_cb:
-                    try:
-                        log_cb("Skip duplicate (Same title & date)")
-                    except Exception:
-                        pass
-                continue
-                
-            save_post(cur, blog_name, title, d_str, content, link)
-            saved += 1
-            delay = random.uniform(5, 20)
-            if log_cb:
-                try:
-                    log_cb(f"Sleep {delay:.2f}s")
-                except Exception:
-                    pass
-            end = time.monotonic() + delay
-            while True:
-                if should_stop_cb and should_stop_cb():
-                    if log_cb:
-                        try:
-                            log_cb("Cancelled during sleep")
-                        except Exception:
-                            pass
-                    conn.commit()
-                    conn.close()
-                    if progress_cb:
-                        progress_cb(100)
-                    return {"total": total, "saved": saved, "duplicates": duplicates}
-                now = time.monotonic()
-                if now >= end:
-                    break
-                time.sleep(min(0.1, end - now))
-
-        conn.commit()
-        conn.close()
-        if progress_cb:
-            progress_cb(100)
-        return {"total": total, "saved": saved, "duplicates": duplicates}
-    except BaseException as e:
+    if log_cb:
         try:
-            if log_cb:
-                try:
-                    log_cb(f"Fatal {e.__class__.__name__}: {e}")
-                except Exception:
-                    pass
-        finally:
+            log_cb(f"Title: {title}")
+        except Exception:
+            pass
+
+    # [중복 수집 방지]
+    # 이미 DB에 (블로그명, 제목, 날짜)가 동일한 글이 있다면
+    # 내용은 비교하지 않고 건너뜁니다.
+    if writer.is_duplicate(blog_name, title, d_str):
+        if log_cb:
             try:
-                if conn:
-                    try:
-                        conn.close()
-                    except Exception:
-                        pass
-            finally:
-                try:
-                    HTTP_SESSION.close()
-                except Exception:
-                    pass
-        sys.exit(1)
+                log_cb("Skip duplicate (Same title & date)")
+            except Exception:
+                pass
+        return "duplicate"
+
+    # [유사 중복] 제목/날짜가 달라도 본문이 거의 같은 글 (재게시, 다른 블로그 퍼옴 등)
+    near = near_checker.check(content) if near_checker else None
+    if near and log_cb:
+        try:
+            src = f"[{near['blog_name']}] " if near["blog_name"] else ""
+            action = "Skip" if near_mode == "skip" else "Flag"
+            log_cb(f"{action} near-duplicate of {src}{near['title']} (sim {near['similarity']:.2f})")
+        except Exception:
+            pass
+    if near and near_mode == "skip":
+        return "duplicate"
+
+    writer.save_post(blog_name, title, d_str, content, link)
+    if near_checker:
+        near_checker.add(title, content)
+    return "saved"
+
+
+def collect_blog_posts(blog_name: str, blog_url: str, start_date: date, end_date: date, progress_cb=None, log_cb=None, should_stop_cb=None) -> dict:
+    # 블로그 하나를 예산 없이 바로 수집: crawl_planner.plan() + execute() 를 그대로 쓴다
+    import crawl_planner
+
+    def blog_log(_name, msg):
+        if log_cb:
+            try:
+                log_cb(msg)
+            except Exception:
+                pass
+
+    def on_progress(frac, _eta):
+        if progress_cb:
+            progress_cb(int(frac * 100))
+
+    try:
+        p = crawl_planner.plan([{"name": blog_name, "url": blog_url}], start_date, end_date, log_cb=blog_log)
+        res = crawl_planner.execute(p, on_progress, blog_log, should_stop_cb)
+    except Exception as e:
+        blog_log(blog_name, f"Fatal {e.__class__.__name__}: {e}")
+        return {"total": 0, "saved": 0, "duplicates": 0, "error": f"{e.__class__.__name__}: {e}"}
+    r = res["blogs"][blog_name]
+    # 이미 저장된 링크(known)는 받지 않고 중복으로 센다
+    return {"total": r["found"], "saved": r["saved"], "duplicates": r["known"] + r["duplicates"], "failed": r["failed"]}
+
 
 def get_blog_id_from_url(u: str) -> str | None:
     try:
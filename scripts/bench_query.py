@@ -0,0 +1,93 @@
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db_manager as dbm  # noqa: E402
+
+BLOG_URL = "https://blog.naver.com/benchblog"
+
+
+def fill(rows: int, content_size: int):
+    dbm.ensure_blogs_table()
+    dbm.add_blog("bench", BLOG_URL, "2024-01-01T00:00:00")
+    dbm.ensure_posts_table_for(BLOG_URL)
+    conn = dbm.get_post_conn_for(BLOG_URL)
+    words = ["금리", "환율", "반도체", "수출", "인플레이션", "연준", "유동성", "실적", "밸류에이션", "경기"]
+    start = date(2020, 1, 1)
+    batch = []
+    for i in range(rows):
+        body = " ".join(random.choice(words) for _ in range(content_size // 4))[:content_size]
+        d = (start + timedelta(days=i % 1800)).isoformat()
+        batch.append(("bench", f"title {i}", d, body, f"https://m.blog.naver.com/benchblog/{i}", d))
+        if len(batch) >= 5000:
+            conn.executemany("INSERT INTO posts(blog_name, title, date, content, link, created_at) VALUES(?,?,?,?,?,?)", batch)
+            batch = []
+    if batch:
+        conn.executemany("INSERT INTO posts(blog_name, title, date, content, link, created_at) VALUES(?,?,?,?,?,?)", batch)
+    conn.commit()
+    conn.close()
+
+
+def measure(label: str, fn):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    n = fn()
+    elapsed = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<28} {elapsed * 1000:10.1f} ms   peak {peak / 1e6:8.1f} MB   rows {n}")
+    return elapsed, peak
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Compare pandas read path vs db_manager iterators")
+    ap.add_argument("--rows", type=int, default=50000)
+    ap.add_argument("--content-size", type=int, default=2000)
+    ap.add_argument("--chunk-size", type=int, default=dbm.DEFAULT_CHUNK_SIZE)
+    args = ap.parse_args(argv)
+
+    import pandas as pd
+
+    start, end = date(2000, 1, 1), date(2100, 1, 1)
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        random.seed(0)
+        fill(args.rows, args.content_size)
+        print(f"rows={args.rows} content_size={args.content_size} chunk_size={args.chunk_size}")
+
+        def pandas_path():
+            conn = sqlite3.connect(dbm._post_db_path(BLOG_URL))
+            try:
+                sql, params = dbm._posts_sql(start, end, "")
+                df = pd.read_sql_query(sql, conn, params=params)
+                return len(df.to_dict("records"))
+            finally:
+                conn.close()
+
+        def list_path():
+            return len(dbm.query_posts_for_blog(BLOG_URL, start, end, ""))
+
+        def stream_path():
+            n = 0
+            total = 0
+            for r in dbm.iter_posts_for_blog(BLOG_URL, start, end, "", args.chunk_size):
+                total += len(r.content)
+                n += 1
+            return n
+
+        measure("pandas read_sql + to_dict", pandas_path)
+        measure("query_posts_for_blog (list)", list_path)
+        measure("iter_posts_for_blog (stream)", stream_path)
+        os.chdir("/")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db_manager as dbm  # noqa: E402
+import semantic_index as si  # noqa: E402
+
+BLOG_URL = "https://blog.naver.com/benchsemantic"
+WORDS = ["금리", "인하", "환율", "반도체", "수출", "인플레이션", "연준", "유동성", "실적", "밸류에이션",
+         "경기", "침체", "부동산", "채권", "달러", "원자재", "유가", "배당", "성장주", "가치주"]
+
+
+def synthetic_text(n_words: int = 120) -> str:
+    return " ".join(random.choice(WORDS) + random.choice(["은", "는", "이", "가", "의", ""]) for _ in range(n_words))
+
+
+def build_matrix(rows: int, posts_per_day: int = 20):
+    # 인코더를 거치지 않고 정규화된 랜덤 벡터로 파일을 채운다 (검색 지연만 측정)
+    files = si._files(dbm.post_db_path_for(BLOG_URL))
+    rng = np.random.default_rng(0)
+    start_day = date(2015, 1, 1).toordinal()
+    block = 100000
+    for s in range(0, rows, block):
+        n = min(block, rows - s)
+        v = rng.standard_normal((n, si.DIM)).astype(np.float32)
+        v /= np.linalg.norm(v, axis=1, keepdims=True)
+        q, scale = si.quantize(v)
+        ids = np.arange(s, s + n, dtype=np.int64) // 4 + 1
+        days = (start_day + ids // posts_per_day).astype(np.int32)
+        for k, arr in (("vec", q), ("scale", scale), ("days", days), ("ids", ids)):
+            with open(files[k], "ab") as f:
+                f.write(arr.tobytes())
+    si._commit(files, rows)
+
+
+def percentile(xs, p):
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(len(xs) * p))]
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Latency benchmark for the int8 semantic index")
+    ap.add_argument("--rows", type=int, default=1_000_000)
+    ap.add_argument("--queries", type=int, default=30)
+    ap.add_argument("--encode-samples", type=int, default=2000)
+    args = ap.parse_args(argv)
+
+    random.seed(0)
+    texts = [synthetic_text() for _ in range(args.encode_samples)]
+    t0 = time.perf_counter()
+    si.encode(texts)
+    enc = time.perf_counter() - t0
+    print(f"encode: {args.encode_samples / enc:,.0f} chunks/s")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        t0 = time.perf_counter()
+        build_matrix(args.rows)
+        print(f"built {args.rows:,} rows in {time.perf_counter() - t0:.1f}s "
+              f"({args.rows * si.DIM / 1e6:.0f} MB int8)")
+        for label, rng in (("all dates", (None, None)), ("1-year window", (date(2016, 1, 1), date(2016, 12, 31)))):
+            lat = []
+            for _ in range(args.queries):
+                q = " ".join(random.sample(WORDS, 3))
+                t0 = time.perf_counter()
+                si.search(BLOG_URL, q, rng[0], rng[1], k=20)
+                lat.append((time.perf_counter() - t0) * 1000)
+            print(f"search {label:<14} p50 {percentile(lat, 0.5):7.1f} ms   p95 {percentile(lat, 0.95):7.1f} ms")
+        os.chdir("/")
+
+
+if __name__ == "__main__":
+    main()
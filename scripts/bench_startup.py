@@ -0,0 +1,83 @@
+import argparse
+import glob
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY = ["pandas", "pyarrow", "numpy", "requests", "bs4", "google.generativeai", "psycopg2"]
+
+
+def child(reruns: int):
+    # 새 프로세스에서: streamlit import -> 첫 렌더 -> 재실행 시간, 그리고 앱이 불러온 무거운 모듈
+    sys.path.insert(0, ROOT)
+    t0 = time.perf_counter()
+    from streamlit.testing.v1 import AppTest
+    import_s = time.perf_counter() - t0
+    before = set(sys.modules)
+    at = AppTest.from_file(os.path.join(ROOT, "app.py"), default_timeout=120)
+    t0 = time.perf_counter()
+    at.run()
+    first_s = time.perf_counter() - t0
+    loaded = [m for m in HEAVY if m in sys.modules and m not in before]
+    rerun = []
+    for _ in range(reruns):
+        t0 = time.perf_counter()
+        at.run()
+        rerun.append(time.perf_counter() - t0)
+    print(json.dumps({
+        "import_streamlit_s": import_s,
+        "first_render_s": first_s,
+        "rerun_s": sorted(rerun)[len(rerun) // 2] if rerun else None,
+        "heavy_modules": loaded,
+        "exceptions": [str(e.value) for e in at.exception],
+    }))
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Cold import time, first render and rerun latency of app.py")
+    ap.add_argument("--runs", type=int, default=3, help="새 프로세스로 반복할 횟수")
+    ap.add_argument("--reruns", type=int, default=5)
+    ap.add_argument("--data-dir", help="이 디렉터리의 *.db 를 복사해서 사용 (기본: 빈 디렉터리)")
+    ap.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = ap.parse_args(argv)
+    if args.child:
+        child(args.reruns)
+        return
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.data_dir:
+            for p in glob.glob(os.path.join(args.data_dir, "*.db")):
+                shutil.copy(p, tmp)
+        for _ in range(args.runs):
+            t0 = time.perf_counter()
+            out = subprocess.run([sys.executable, os.path.abspath(__file__), "--child", "--reruns", str(args.reruns)],
+                                 cwd=tmp, capture_output=True, text=True)
+            wall = time.perf_counter() - t0
+            line = out.stdout.strip().splitlines()[-1] if out.stdout.strip() else ""
+            if out.returncode != 0 or not line.startswith("{"):
+                raise SystemExit(out.stderr[-2000:])
+            r = json.loads(line)
+            r["process_s"] = wall
+            results.append(r)
+
+    def med(k):
+        xs = sorted(r[k] for r in results)
+        return xs[len(xs) // 2]
+
+    print(f"process (python start -> exit)  {med('process_s') * 1000:8.0f} ms")
+    print(f"import streamlit                {med('import_streamlit_s') * 1000:8.0f} ms")
+    print(f"first render (app imports+run)  {med('first_render_s') * 1000:8.0f} ms")
+    print(f"rerun (median)                  {med('rerun_s') * 1000:8.0f} ms")
+    print(f"heavy modules loaded by app     {', '.join(results[-1]['heavy_modules']) or '-'}")
+    if results[-1]["exceptions"]:
+        print("exceptions:", results[-1]["exceptions"])
+
+
+if __name__ == "__main__":
+    main()
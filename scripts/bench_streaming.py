@@ -0,0 +1,68 @@
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import ai_client  # noqa: E402
+
+
+def percentile(xs, p):
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(len(xs) * p))]
+
+
+def measure(models, parts):
+    # (첫 청크까지, 첫 섹션 완성까지, 전체) 초
+    t0 = time.perf_counter()
+    first = first_section = None
+    buf = ""
+    for text in ai_client.stream_with_fallback(models, parts):
+        now = time.perf_counter() - t0
+        if first is None:
+            first = now
+        buf += text
+        if first_section is None and "---" in buf:
+            first_section = now
+    total = time.perf_counter() - t0
+    return first, first_section or total, total
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Time-to-first-token for streamed vs. blocking AI answers")
+    ap.add_argument("--runs", type=int, default=5)
+    ap.add_argument("--first-token-delay", type=float, default=0.8)
+    ap.add_argument("--chunk-delay", type=float, default=0.04)
+    ap.add_argument("--fail-first", action="store_true", help="첫 모델이 실패하고 다음 모델로 넘어가는 경우")
+    ap.add_argument("--live", action="store_true", help="GEMINI_API_KEY 로 실제 Gemini 를 호출")
+    args = ap.parse_args(argv)
+
+    parts = ai_client.build_parts("벤치마크", "금리 인하와 환율", "핵심 논거를 정리해 주세요")
+    if args.live:
+        api_key = os.environ.get("GEMINI_API_KEY")
+        if not api_key:
+            raise SystemExit("No GEMINI_API_KEY in env")
+        models = ai_client.gemini_models(api_key)
+    else:
+        models = [ai_client.FakeModel("fake-a", first_token_delay=args.first_token_delay,
+                                      chunk_delay=args.chunk_delay, fail=args.fail_first),
+                  ai_client.FakeModel("fake-b", first_token_delay=args.first_token_delay,
+                                      chunk_delay=args.chunk_delay)]
+
+    ttft, section, total = [], [], []
+    for _ in range(args.runs):
+        a, b, c = measure(models, parts)
+        ttft.append(a)
+        section.append(b)
+        total.append(c)
+    # 스트리밍이 아니면 전체 응답이 와야 처음 화면에 그려진다
+    print(f"{'':<22}{'p50':>8}{'p95':>8}")
+    for label, xs in (("first chunk", ttft), ("first section", section), ("full answer", total)):
+        print(f"{label:<22}{percentile(xs, 0.5):8.2f}{percentile(xs, 0.95):8.2f}  s")
+    print(f"blocking call shows first text after ~{percentile(total, 0.5):.2f}s; "
+          f"streaming after ~{percentile(ttft, 0.5):.2f}s")
+
+
+if __name__ == "__main__":
+    main()
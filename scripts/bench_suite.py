@@ -0,0 +1,276 @@
+import argparse
+import json
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import db_manager as dbm  # noqa: E402
+import synth_data  # noqa: E402
+
+# 파싱/중복 확인/저장/키워드 검색 마이크로 벤치마크. 결과를 JSON 으로 남기고,
+# --baseline 과 비교해서 threshold 이상 느려진 항목이 있으면 종료 코드 1
+GROUPS = ("parse", "dedup", "insert", "query")
+DEFAULT_THRESHOLD = 0.25
+
+
+def run(fn, setup=None, rounds: int = 5) -> dict:
+    # setup() 이 돌려준 항목마다 fn 을 부른다 (setup 시간은 재지 않는다). 라운드별 항목당 시간의 중앙값
+    per_op = []
+    n = 0
+    for _ in range(rounds):
+        items = setup() if setup else [None]
+        n = len(items)
+        t0 = time.perf_counter()
+        for it in items:
+            fn(it)
+        per_op.append((time.perf_counter() - t0) / max(n, 1))
+    med = statistics.median(per_op)
+    return {"us_per_op": med * 1e6, "ops_per_s": 1 / med if med else None, "n": n, "rounds": rounds,
+            "min_us": min(per_op) * 1e6}
+
+
+def bench_parse(rounds: int, docs: int = 50) -> dict:
+    from bs4 import BeautifulSoup
+    import scraper
+
+    rng = random.Random(0)
+    pool = synth_data.sentence_pool()
+    pages = [synth_data.post_html(rng, pool, "synthblog", 223000000000 + i, f"합성 글 {i}",
+                                  synth_data.START_DATE + timedelta(days=i), chars=rng.randint(1500, 6000))
+             for i in range(docs)]
+    listings = [synth_data.listing_html(rng, "synthblog", 30) for _ in range(docs)]
+
+    def chunks(html, size=16 * 1024):
+        return [html[i:i + size] for i in range(0, len(html), size)]
+
+    def detect(page_chunks):
+        det = scraper.PostRegionDetector()
+        for c in page_chunks:
+            if det(c):
+                break
+
+    return {
+        "parse.soup": run(lambda h: BeautifulSoup(h, "html.parser"), lambda: pages, rounds),
+        # extract_text_only 는 soup 를 바꾸므로 라운드마다 새로 만든다
+        "parse.extract_text_only": run(scraper.extract_text_only,
+                                       lambda: [BeautifulSoup(h, "html.parser") for h in pages], rounds),
+        "parse.parse_date_from_soup": run(scraper.parse_date_from_soup,
+                                          lambda: [BeautifulSoup(h, "html.parser") for h in pages], rounds),
+        "parse.parse_title_from_soup": run(scraper.parse_title_from_soup,
+                                           lambda: [BeautifulSoup(h, "html.parser") for h in pages], rounds),
+        "parse.parse_post": run(scraper.parse_post, lambda: pages, rounds),
+        "parse.find_post_links": run(lambda h: scraper.find_post_links(h, "synthblog"), lambda: listings, rounds),
+        "parse.region_detector": run(detect, lambda: [chunks(h) for h in pages], rounds),
+    }
+
+
+def bench_dedup(rounds: int, rows: int, blog_id: str, lookups: int = 2000) -> dict:
+    conn = dbm.get_post_conn_for(synth_data.blog_url_for(blog_id))
+    try:
+        rng = random.Random(1)
+        sample = conn.execute(
+            "SELECT blog_name, title, date FROM posts WHERE id IN (%s)"
+            % ",".join(str(rng.randint(1, rows)) for _ in range(lookups))
+        ).fetchall()
+        misses = [(b, t + " (없음)", d) for b, t, d in sample]
+        cur = conn.cursor()
+        return {
+            "dedup.is_duplicate.hit": run(lambda r: dbm.is_duplicate(cur, *r), lambda: sample, rounds),
+            "dedup.is_duplicate.miss": run(lambda r: dbm.is_duplicate(cur, *r), lambda: misses, rounds),
+        }
+    finally:
+        conn.close()
+
+
+def bench_insert(rounds: int, batch: int = 2000) -> dict:
+    import ingest_writer
+
+    rows = list(synth_data.post_rows(batch, "insertblog", "insertblog", chars=600, seed=2))
+    counter = iter(range(10**9))
+
+    def fresh_db():
+        # 라운드마다 빈 DB (스키마/인덱스/트리거는 실제와 같다)
+        url = synth_data.blog_url_for(f"insert{next(counter)}")
+        dbm.ensure_posts_table_for(url)
+        return dbm.post_db_path_for(url)
+
+    def save_post_round():
+        conn = sqlite3.connect(fresh_db())
+        cur = conn.cursor()
+        for r in rows:
+            dbm.save_post(cur, *r[:5])
+        dbm.commit_posts(conn)
+        conn.close()
+
+    def ingest_round():
+        w = ingest_writer.IngestWriter(fresh_db())
+        try:
+            for r in rows:
+                w.submit(*r)
+            w.flush()
+        finally:
+            w.close()
+
+    out = {}
+    # 저장 DB 는 --data-dir 와 따로 매번 새 임시 디렉터리에 만든다 (다시 실행해도 같은 조건)
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        try:
+            for name, fn in (("insert.save_post", save_post_round), ("insert.ingest_writer", ingest_round)):
+                res = run(lambda _: fn(), None, rounds)
+                # 한 라운드 = batch 개 저장
+                res["us_per_op"] /= batch
+                res["min_us"] /= batch
+                res["ops_per_s"] = 1e6 / res["us_per_op"]
+                res["n"] = batch
+                out[name] = res
+        finally:
+            os.chdir(cwd)
+    return out
+
+
+def bench_query(rounds: int, blog_id: str) -> dict:
+    url = synth_data.blog_url_for(blog_id)
+    end = synth_data.START_DATE + timedelta(days=synth_data.DAYS)
+    month = (end - timedelta(days=30), end)
+    cases = {
+        # 전체 기간에서 드문 단어 (LIKE 가 모든 글을 훑는다)
+        "query.keyword_rare": (synth_data.START_DATE, end, synth_data.RARE_TERM),
+        # 최근 30일 안에서 흔한 단어
+        "query.keyword_month": (*month, "금리"),
+        "query.month_all": (*month, ""),
+    }
+    out = {}
+    for name, (s, e, kw) in cases.items():
+        n_rows = []
+        res = run(lambda _: n_rows.append(len(dbm.query_posts_for_blog(url, s, e, kw))), None, rounds)
+        res["rows"] = n_rows[-1]
+        out[name] = res
+    return out
+
+
+def git_rev() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> list[str]:
+    # us_per_op 가 baseline * (1 + threshold) 보다 크면 회귀
+    regressions = []
+    print(f"\n{'benchmark':<32}{'baseline':>12}{'current':>12}{'change':>9}")
+    for name, cur in current["benchmarks"].items():
+        base = baseline.get("benchmarks", {}).get(name)
+        if not base:
+            print(f"{name:<32}{'-':>12}{cur['us_per_op']:>10.1f}us{'new':>9}")
+            continue
+        ratio = cur["us_per_op"] / base["us_per_op"] if base["us_per_op"] else 1.0
+        flag = ratio > 1 + threshold
+        if flag:
+            regressions.append(name)
+        print(f"{name:<32}{base['us_per_op']:>10.1f}us{cur['us_per_op']:>10.1f}us{ratio - 1:>+8.0%}"
+              + (" REGRESSION" if flag else ""))
+    return regressions
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Micro-benchmarks for parsing, dedup, inserts and keyword queries")
+    ap.add_argument("--scale", choices=synth_data.SCALES, default="10k", help="posts DB 크기")
+    ap.add_argument("--rows", type=int, help="--scale 대신 직접 지정")
+    ap.add_argument("--chars", type=int, default=600, help="합성 글 본문 길이 (글자)")
+    ap.add_argument("--only", help=f"쉼표로 구분한 그룹만 실행 ({','.join(GROUPS)})")
+    ap.add_argument("--rounds", type=int, default=5)
+    ap.add_argument("--data-dir", help="합성 DB 를 만들고 다시 쓸 디렉터리 (기본: 임시 디렉터리, 끝나면 삭제)")
+    ap.add_argument("--out", help="결과 JSON 파일")
+    ap.add_argument("--baseline", help="비교할 이전 결과 JSON")
+    ap.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="허용하는 느려짐 비율 (0.25 = 25%%)")
+    args = ap.parse_args(argv)
+
+    rows = args.rows or synth_data.SCALES[args.scale]
+    groups = [g.strip() for g in args.only.split(",")] if args.only else list(GROUPS)
+    blog_id = f"synth{rows}"
+    out_path = os.path.abspath(args.out) if args.out else None
+    baseline_path = os.path.abspath(args.baseline) if args.baseline else None
+    cwd = os.getcwd()
+
+    tmp = None
+    if args.data_dir:
+        os.makedirs(args.data_dir, exist_ok=True)
+        data_dir = args.data_dir
+    else:
+        tmp = tempfile.TemporaryDirectory()
+        data_dir = tmp.name
+    results = {}
+    try:
+        os.chdir(data_dir)
+        if {"dedup", "query"} & set(groups):
+            t0 = time.perf_counter()
+            print(f"posts DB: {rows:,} rows in {data_dir}")
+            synth_data.fill_posts_db(rows, blog_id, args.chars)
+            print(f"  ready in {time.perf_counter() - t0:.1f}s")
+        for g in groups:
+            t0 = time.perf_counter()
+            if g == "parse":
+                results.update(bench_parse(args.rounds))
+            elif g == "dedup":
+                results.update(bench_dedup(args.rounds, rows, blog_id))
+            elif g == "insert":
+                results.update(bench_insert(args.rounds))
+            elif g == "query":
+                results.update(bench_query(args.rounds, blog_id))
+            else:
+                raise SystemExit(f"unknown group: {g}")
+            print(f"  {g} done in {time.perf_counter() - t0:.1f}s")
+    finally:
+        os.chdir(cwd)
+        if tmp:
+            tmp.cleanup()
+
+    for name, r in results.items():
+        extra = f"   rows {r['rows']}" if "rows" in r else ""
+        print(f"{name:<32}{r['us_per_op']:>12.1f} us/op {r['ops_per_s']:>12,.0f} ops/s{extra}")
+
+    report = {
+        "meta": {
+            "rows": rows,
+            "chars": args.chars,
+            "rounds": args.rounds,
+            "git": git_rev(),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "created_at": datetime.now(timezone.utc).isoformat(),
+        },
+        "benchmarks": results,
+    }
+    if out_path:
+        with open(out_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"wrote {out_path}")
+    if baseline_path:
+        with open(baseline_path, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("meta", {}).get("rows") != rows:
+            print(f"warning: baseline rows {baseline.get('meta', {}).get('rows')} != {rows}")
+        regressions = compare(report, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) over {args.threshold:.0%}: {', '.join(regressions)}")
+            sys.exit(1)
+        print(f"\nno regressions over {args.threshold:.0%}")
+
+
+if __name__ == "__main__":
+    main()
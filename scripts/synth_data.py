@@ -0,0 +1,188 @@
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import time
+from datetime import date, datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db_manager as dbm  # noqa: E402
+
+# 벤치마크용 합성 데이터: 네이버 모바일 글 페이지와 비슷한 HTML, 블로그 첫 화면, 그리고 posts_*.db.
+# 같은 seed 면 같은 데이터가 나온다
+SCALES = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+WORDS = ["금리", "인하", "환율", "반도체", "수출", "인플레이션", "연준", "유동성", "실적", "밸류에이션",
+         "경기", "침체", "부동산", "채권", "달러", "원자재", "유가", "배당", "성장주", "가치주",
+         "중국", "일본", "엔화", "고용", "소비", "재정", "적자", "국채", "금값", "비트코인"]
+PARTICLES = ["은", "는", "이", "가", "을", "를", "의", "에", "와", "도", ""]
+ENDINGS = ["다.", "습니다.", "겠습니다.", "입니다.", "네요.", "죠.", "라고 봅니다."]
+TOPICS = ["주간 시황", "메모", "경제 공부", "투자 일기", "해외 뉴스", "질문 답변"]
+# 드물게 나오는 키워드 (전체 글의 약 0.1%): 결과가 적은 LIKE 검색용
+RARE_TERM = "희토류"
+RARE_RATE = 0.001
+START_DATE = date(2020, 1, 1)
+DAYS = 5 * 365
+
+
+def sentence(rng: random.Random) -> str:
+    words = [rng.choice(WORDS) + rng.choice(PARTICLES) for _ in range(rng.randint(5, 12))]
+    return " ".join(words) + " " + rng.choice(["오르", "내리", "보이", "움직이", "버티"]) + rng.choice(ENDINGS)
+
+
+def sentence_pool(seed: int = 0, size: int = 5000) -> list[str]:
+    rng = random.Random(seed)
+    return [sentence(rng) for _ in range(size)]
+
+
+def paragraphs(rng: random.Random, pool: list[str], chars: int) -> list[str]:
+    out, n = [], 0
+    while n < chars:
+        p = " ".join(rng.choice(pool) for _ in range(rng.randint(1, 4)))
+        out.append(p)
+        n += len(p)
+    return out
+
+
+def post_html(rng: random.Random, pool: list[str], blog_id: str, log_no: int, title: str, d: date,
+              chars: int = 3000) -> str:
+    # SmartEditor ONE 글 페이지 모양: head 메타 -> 제목/날짜 -> se-main-container -> 댓글/추천 글/스크립트
+    comps = []
+    for i, p in enumerate(paragraphs(rng, pool, chars)):
+        if i % 5 == 4:
+            comps.append(
+                '<div class="se-component se-image"><div class="se-component-content"><div class="se-module se-module-image">'
+                f'<img src="https://postfiles.pstatic.net/{blog_id}/{log_no}_{i}.png?type=w800" alt=""></div></div></div>'
+            )
+        comps.append(
+            '<div class="se-component se-text"><div class="se-component-content"><div class="se-section se-section-text">'
+            f'<div class="se-module se-module-text"><p class="se-text-paragraph"><span>{p}</span></p></div></div></div></div>'
+        )
+    comments = "".join(
+        f'<li class="u_cbox_comment"><div class="u_cbox_area"><span class="u_cbox_contents">{rng.choice(pool)}</span></div></li>'
+        for _ in range(rng.randint(0, 30))
+    )
+    related = "".join(
+        f'<li><a href="/{blog_id}/{log_no - k}">{rng.choice(TOPICS)} {log_no - k}</a></li>' for k in range(1, 11)
+    )
+    return (
+        '<!DOCTYPE html><html lang="ko"><head><meta charset="utf-8">'
+        f'<title>{title} : 네이버 블로그</title>'
+        f'<meta property="og:title" content="{title}">'
+        f'<meta property="og:url" content="https://m.blog.naver.com/{blog_id}/{log_no}">'
+        f'<meta property="article:published_time" content="{d.isoformat()}T09:00:00+09:00">'
+        '<link rel="stylesheet" href="https://blogimgs.pstatic.net/static/mobile/post.css">'
+        '</head><body><div id="ct"><div class="se-viewer se-theme-default">'
+        '<div class="se-component se-documentTitle"><div class="se-component-content"><div class="se-title-text">'
+        f'<h3 class="se_title_text">{title}</h3></div>'
+        f'<span class="se_publishDate">{d.strftime("%Y. %m. %d. 9:00")}</span></div></div>'
+        f'<div class="se-main-container">{"".join(comps)}</div></div>'
+        f'<div class="comment_area"><ul class="u_cbox_list">{comments}</ul></div>'
+        f'<div class="related_post"><ul>{related}</ul></div>'
+        + '<script>window.__BLOG_STATE__ = {"blogId": "%s", "logNo": %d};</script>' % (blog_id, log_no)
+        + '<script src="https://blogimgs.pstatic.net/static/mobile/post.js"></script>' * 4
+        + '</div></body></html>'
+    )
+
+
+def listing_html(rng: random.Random, blog_id: str, n_links: int = 30) -> str:
+    # 블로그 첫 화면: 모바일 링크, PostView.nhn 링크, 글이 아닌 링크가 섞여 있다
+    items = []
+    for i in range(n_links):
+        log_no = 224000000000 + rng.randint(0, 999999)
+        if i % 3 == 0:
+            href = f"https://blog.naver.com/PostView.nhn?blogId={blog_id}&logNo={log_no}"
+        else:
+            href = f"/{blog_id}/{log_no}"
+        items.append(f'<li class="item"><a href="{href}"><strong>{rng.choice(TOPICS)} {i}</strong></a>'
+                     f'<span class="date">{rng.randint(1, 23)}시간 전</span></li>')
+    nav = "".join(f'<a href="https://m.naver.com/{p}">{p}</a>' for p in ("news", "sports", "shopping", "cafe"))
+    return (
+        f'<!DOCTYPE html><html><head><meta charset="utf-8"><title>{blog_id} 블로그</title></head><body>'
+        f'<header>{nav}</header><ul class="list">{"".join(items)}</ul>'
+        f'<footer><a href="/{blog_id}?categoryNo=0">전체글</a></footer></body></html>'
+    )
+
+
+def blog_url_for(blog_id: str) -> str:
+    return f"https://blog.naver.com/{blog_id}"
+
+
+def post_rows(rows: int, blog_name: str, blog_id: str, chars: int = 600, seed: int = 0):
+    # (blog_name, title, date, content, link, created_at). 하루에 rows/DAYS 개 정도씩 5년에 걸쳐 분포
+    rng = random.Random(seed)
+    pool = sentence_pool(seed)
+    created = datetime(2025, 1, 1, tzinfo=timezone.utc).isoformat()
+    for i in range(rows):
+        d = START_DATE + timedelta(days=i * DAYS // rows)
+        content = "\n".join(paragraphs(rng, pool, chars))
+        if rng.random() < RARE_RATE:
+            content += f"\n{RARE_TERM} 공급망 이야기"
+        title = f"[{rng.choice(TOPICS)}] {rng.choice(WORDS)}와 {rng.choice(WORDS)} #{i}"
+        yield blog_name, title, d.isoformat(), content, f"https://m.blog.naver.com/{blog_id}/{223000000000 + i}", created
+
+
+def fill_posts_db(rows: int, blog_id: str = "synthblog", chars: int = 600, seed: int = 0, log=print) -> str:
+    # 현재 디렉터리의 posts_<blog_id>.db 를 rows 개로 채운다. 이미 같은 개수면 그대로 쓴다
+    blog_url = blog_url_for(blog_id)
+    dbm.ensure_posts_table_for(blog_url)
+    path = dbm.post_db_path_for(blog_url)
+    conn = sqlite3.connect(path)
+    try:
+        have = conn.execute("SELECT COUNT(*) FROM posts").fetchone()[0]
+        if have == rows:
+            return path
+        if have:
+            conn.execute("DELETE FROM posts")
+            conn.commit()
+        conn.execute("PRAGMA synchronous=OFF")
+        t0 = time.perf_counter()
+        batch = []
+        done = 0
+        for r in post_rows(rows, blog_id, blog_id, chars, seed):
+            batch.append(r)
+            if len(batch) >= 5000:
+                conn.executemany("INSERT INTO posts(blog_name, title, date, content, link, created_at) "
+                                 "VALUES(?,?,?,?,?,?)", batch)
+                conn.commit()
+                done += len(batch)
+                batch = []
+                if log and done % 100_000 == 0:
+                    log(f"  {done:,}/{rows:,} rows ({time.perf_counter() - t0:.0f}s)")
+        if batch:
+            conn.executemany("INSERT INTO posts(blog_name, title, date, content, link, created_at) "
+                             "VALUES(?,?,?,?,?,?)", batch)
+            conn.commit()
+    finally:
+        conn.close()
+    dbm.bump_write_generation(path)
+    return path
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Generate synthetic Korean blog posts into posts_*.db")
+    ap.add_argument("--scale", choices=SCALES, default="10k")
+    ap.add_argument("--rows", type=int, help="--scale 대신 직접 지정")
+    ap.add_argument("--blog-id", default="synthblog")
+    ap.add_argument("--chars", type=int, default=600, help="글 하나의 본문 길이 (글자)")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--out-dir", default=".", help="posts_<blog-id>.db 를 만들 디렉터리")
+    ap.add_argument("--html", metavar="FILE", help="글 페이지 HTML 하나를 이 파일로 저장")
+    args = ap.parse_args(argv)
+
+    if args.html:
+        rng = random.Random(args.seed)
+        with open(args.html, "w", encoding="utf-8") as f:
+            f.write(post_html(rng, sentence_pool(args.seed), args.blog_id, 223000000001, "합성 글", START_DATE))
+        return
+    rows = args.rows or SCALES[args.scale]
+    os.makedirs(args.out_dir, exist_ok=True)
+    os.chdir(args.out_dir)
+    t0 = time.perf_counter()
+    path = fill_posts_db(rows, args.blog_id, args.chars, args.seed)
+    print(f"{path}: {rows:,} rows, {os.path.getsize(path) / 1e6:.0f} MB in {time.perf_counter() - t0:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
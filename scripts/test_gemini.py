@@ -1,4 +1,14 @@
+import argparse
 import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import ai_client  # noqa: E402
+import model_router  # noqa: E402
+
 
 def load_env():
     try:
@@ -14,29 +24,104 @@ def load_env():
     except Exception:
         pass
 
-def main():
+
+class FlakyModel(ai_client.FakeModel):
+    # 첫 청크 지연이 가끔 길어지고(꼬리 지연), 일정 확률로 첫 청크 전에 실패하는 모델
+    def __init__(self, name, latency, fail_rate=0.0, tail_rate=0.0, tail_latency=0.0, rng=None):
+        super().__init__(name)
+        self.latency = latency
+        self.fail_rate = fail_rate
+        self.tail_rate = tail_rate
+        self.tail_latency = tail_latency
+        self.rng = rng or random.Random(0)
+        self.calls = 0
+
+    def stream(self, parts):
+        self.calls += 1
+        slow = self.rng.random() < self.tail_rate
+        fail = self.rng.random() < self.fail_rate
+        time.sleep(self.tail_latency if slow else self.latency)
+        if fail:
+            raise RuntimeError(f"{self.name} 503")
+        yield self.text
+
+
+SCENARIOS = {
+    # 첫 모델이 계속 실패: 순차 방식은 매번 실패 호출 1번을 치른다
+    "primary-down": lambda rng: [FlakyModel("flash-latest", 0.15, fail_rate=1.0, rng=rng),
+                                 FlakyModel("2.5-flash", 0.12, rng=rng),
+                                 FlakyModel("pro-latest", 0.30, rng=rng)],
+    # 첫 모델이 10% 확률로 긴 꼬리 지연: 헤지 요청이 p95 를 줄인다
+    "tail-latency": lambda rng: [FlakyModel("flash-latest", 0.10, tail_rate=0.1, tail_latency=1.0, rng=rng),
+                                 FlakyModel("2.5-flash", 0.12, rng=rng),
+                                 FlakyModel("pro-latest", 0.30, rng=rng)],
+}
+
+
+def percentile(xs, p):
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(len(xs) * p))]
+
+
+def run(scenario, mode, n, seed):
+    rng = random.Random(seed)
+    models = SCENARIOS[scenario](rng)
+    router = model_router.ModelRouter(hedge=(mode == "router+hedge"))
+    parts = ai_client.build_parts("벤치마크", "컨텍스트", "질문")
+    lat, errors = [], 0
+    for _ in range(n):
+        t0 = time.perf_counter()
+        try:
+            if mode == "sequential":
+                stream = ai_client.stream_with_fallback(models, parts)
+            else:
+                stream = router.stream(models, parts)
+            for _text in stream:
+                break
+            lat.append(time.perf_counter() - t0)
+        except Exception:
+            errors += 1
+    calls = sum(m.calls for m in models)
+    return lat, errors, calls
+
+
+def bench(args):
+    print(f"{'scenario':<14}{'mode':<15}{'p50':>7}{'p95':>7}{'calls/req':>11}{'errors':>8}")
+    for scenario in SCENARIOS:
+        for mode in ("sequential", "router", "router+hedge"):
+            lat, errors, calls = run(scenario, mode, args.requests, args.seed)
+            print(f"{scenario:<14}{mode:<15}{percentile(lat, 0.5):7.2f}{percentile(lat, 0.95):7.2f}"
+                  f"{calls / args.requests:11.2f}{errors:8d}")
+
+
+def live():
     import google.generativeai as genai
     load_env()
     api = os.environ.get('GEMINI_API_KEY')
     if not api:
         raise SystemExit('No GEMINI_API_KEY in env')
     genai.configure(api_key=api)
-    candidates = [
-        'models/gemini-flash-latest',
-        'models/gemini-2.5-flash',
-        'models/gemini-pro-latest',
-    ]
-    last_err = None
-    for name in candidates:
-        try:
-            m = genai.GenerativeModel(name)
-            r = m.generate_content('테스트 메시지입니다')
-            print('OK:', name)
-            print(getattr(r, 'text', None) or str(r))
-            return
-        except Exception as e:
-            last_err = e
-    raise SystemExit(f'All candidates failed: {last_err}')
+    router = model_router.get_router()
+    used = {}
+    t0 = time.perf_counter()
+    text = "".join(router.stream(ai_client.gemini_models(api), ['테스트 메시지입니다'],
+                                 on_model=lambda n: used.setdefault("model", n)))
+    print('OK:', used.get("model"), f"{time.perf_counter() - t0:.2f}s")
+    print(text)
+    print(router.stats())
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Benchmark the Gemini model router against local fake models")
+    ap.add_argument("--requests", type=int, default=30)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--live", action="store_true", help="실제 Gemini 모델로 한 번 호출해 본다")
+    args = ap.parse_args(argv)
+    if args.live:
+        live()
+    else:
+        bench(args)
+
 
 if __name__ == '__main__':
     main()
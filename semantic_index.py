@@ -0,0 +1,205 @@
+import json
+import math
+import os
+import zlib
+from collections import Counter
+from datetime import date
+
+import numpy as np
+
+import db_manager as dbm
+from text_utils import split_chunks, tokenize_ko
+
+DIM = 256
+CHUNK_CHARS = 600
+# 블록이 CPU 캐시에 들어가야 int8 -> float32 변환 + GEMV 가 빠르다
+BLOCK_ROWS = 8192
+
+# 파일 구성 (posts_<id>.db 옆):
+#   .emb.i8    int8 [rows, DIM]  양자화된 청크 벡터
+#   .emb.scale float32 [rows]    행별 역양자화 배율
+#   .emb.ids   int64 [rows]      행 -> posts.id
+#   .emb.days  int32 [rows]      행 -> 글 날짜 (date.toordinal)
+#   .emb.lock  이어 쓰는 동안 잡는 파일 잠금 (다른 프로세스와도 겹치지 않게)
+_SUFFIXES = {"vec": (".emb.i8", np.int8), "scale": (".emb.scale", np.float32),
+             "ids": (".emb.ids", np.int64), "days": (".emb.days", np.int32)}
+
+
+def _files(db_path: str) -> dict[str, str]:
+    base = os.path.splitext(db_path)[0]
+    files = {k: base + suf for k, (suf, _dt) in _SUFFIXES.items()}
+    files["meta"] = base + ".emb.json"
+    files["lock"] = base + ".emb.lock"
+    return files
+
+
+def _feature(tok: str) -> tuple[int, float]:
+    h = zlib.crc32(tok.encode("utf-8"))
+    return h % DIM, (1.0 if (h >> 16) & 1 else -1.0)
+
+
+def encode(texts: list[str]) -> np.ndarray:
+    # signed feature hashing 인코더: 토큰/바이그램을 DIM 차원에 해싱하고 log(1+tf) 가중 후 L2 정규화
+    out = np.zeros((len(texts), DIM), dtype=np.float32)
+    for i, t in enumerate(texts):
+        row = [0.0] * DIM
+        for tok, tf in Counter(tokenize_ko(t)).items():
+            j, sign = _feature(tok)
+            row[j] += sign * (1.0 + math.log(tf))
+        out[i] = row
+    norms = np.linalg.norm(out, axis=1, keepdims=True)
+    np.divide(out, norms, out=out, where=norms > 0)
+    return out
+
+
+def quantize(vecs: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    maxabs = np.abs(vecs).max(axis=1)
+    scale = np.where(maxabs > 0, maxabs / 127.0, 1.0).astype(np.float32)
+    q = np.clip(np.rint(vecs / scale[:, None]), -127, 127).astype(np.int8)
+    return q, scale
+
+
+def _row_count(files: dict[str, str]) -> int:
+    counts = []
+    for k, (_suf, dt) in _SUFFIXES.items():
+        try:
+            size = os.path.getsize(files[k])
+        except OSError:
+            return 0
+        width = DIM if k == "vec" else 1
+        counts.append(size // (np.dtype(dt).itemsize * width))
+    return min(counts)
+
+
+def _truncate(files: dict[str, str], rows: int):
+    for k, (_suf, dt) in _SUFFIXES.items():
+        width = DIM if k == "vec" else 1
+        size = rows * np.dtype(dt).itemsize * width
+        if os.path.exists(files[k]) and os.path.getsize(files[k]) != size:
+            with open(files[k], "r+b") as f:
+                f.truncate(size)
+
+
+def _open(files: dict[str, str], rows: int) -> dict[str, np.ndarray]:
+    arrays = {}
+    for k, (_suf, dt) in _SUFFIXES.items():
+        shape = (rows, DIM) if k == "vec" else (rows,)
+        arrays[k] = np.memmap(files[k], dtype=dt, mode="r", shape=shape)
+    return arrays
+
+
+def _committed_rows(files: dict[str, str]) -> int:
+    # .emb.json 의 rows 까지만 유효하다. 그 뒤는 기록 도중 중단된 잔여분.
+    try:
+        with open(files["meta"], "r", encoding="utf-8") as f:
+            rows = int(json.load(f).get("rows", 0))
+    except Exception:
+        rows = 0
+    return min(rows, _row_count(files))
+
+
+def _commit(files: dict[str, str], rows: int):
+    tmp = files["meta"] + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"rows": rows, "dim": DIM, "encoder": "hash-crc32-v1"}, f)
+    os.replace(tmp, files["meta"])
+
+
+def update_index(blog_url: str, batch_size: int = 500) -> int:
+    db_path = dbm.post_db_path_for(blog_url)
+    if not os.path.exists(db_path):
+        return 0
+    files = _files(db_path)
+    added = 0
+    with dbm.file_lock(files["lock"]):
+        rows = _committed_rows(files)
+        if _row_count(files) != rows:
+            _truncate(files, rows)
+        last_id = 0
+        if rows:
+            ids = np.memmap(files["ids"], dtype=np.int64, mode="r", shape=(rows,))
+            last_id = int(ids[rows - 1])
+            del ids
+        conn = dbm.get_post_conn_for(blog_url)
+        try:
+            while True:
+                posts = conn.execute(
+                    "SELECT id, date, title, content FROM posts WHERE id > ? ORDER BY id LIMIT ?",
+                    (last_id, batch_size),
+                ).fetchall()
+                if not posts:
+                    break
+                texts, ids, days = [], [], []
+                for pid, d, title, content in posts:
+                    try:
+                        day = date.fromisoformat(d).toordinal()
+                    except Exception:
+                        day = 0
+                    for i, chunk in enumerate(split_chunks(content or "", CHUNK_CHARS) or [""]):
+                        texts.append(f"{title}\n{chunk}" if i == 0 else chunk)
+                        ids.append(pid)
+                        days.append(day)
+                    last_id = pid
+                q, scale = quantize(encode(texts))
+                for k, arr in (("vec", q), ("scale", scale), ("days", np.asarray(days, dtype=np.int32)),
+                               ("ids", np.asarray(ids, dtype=np.int64))):
+                    with open(files[k], "ab") as f:
+                        f.write(np.ascontiguousarray(arr).tobytes())
+                rows += len(texts)
+                _commit(files, rows)
+                added += len(posts)
+        finally:
+            conn.close()
+    return added
+
+
+def rebuild(blog_url: str) -> int:
+    # 파일은 뒤에 붙이기만 하므로 이미 색인한 글이 바뀌면 비우고 처음부터 다시 만든다
+    db_path = dbm.post_db_path_for(blog_url)
+    files = _files(db_path)
+    with dbm.file_lock(files["lock"]):
+        _commit(files, 0)
+        _truncate(files, 0)
+    return update_index(blog_url)
+
+
+def search(blog_url: str, query: str, start_date: date | None = None, end_date: date | None = None,
+           k: int = 20) -> list[tuple[int, float]]:
+    # (post_id, score) 를 점수 내림차순으로, 글당 가장 높은 청크 점수 기준
+    db_path = dbm.post_db_path_for(blog_url)
+    files = _files(db_path)
+    rows = _committed_rows(files)
+    if rows == 0 or not (query or "").strip():
+        return []
+    qv = encode([query])[0]
+    if not qv.any():
+        return []
+    arrays = _open(files, rows)
+    scores = np.empty(rows, dtype=np.float32)
+    for s in range(0, rows, BLOCK_ROWS):
+        e = min(rows, s + BLOCK_ROWS)
+        scores[s:e] = arrays["vec"][s:e].astype(np.float32) @ qv
+    scores *= arrays["scale"]
+    if start_date or end_date:
+        days = arrays["days"]
+        lo = start_date.toordinal() if start_date else 0
+        hi = end_date.toordinal() if end_date else np.iinfo(np.int32).max
+        scores[(days < lo) | (days > hi)] = -np.inf
+    cand = min(rows, k * 8)
+    top = np.argpartition(-scores, cand - 1)[:cand]
+    top = top[np.argsort(-scores[top])]
+    out: list[tuple[int, float]] = []
+    seen = set()
+    ids = arrays["ids"]
+    for r in top:
+        sc = float(scores[r])
+        if sc == -np.inf or sc <= 0:
+            break
+        pid = int(ids[r])
+        if pid in seen:
+            continue
+        seen.add(pid)
+        out.append((pid, sc))
+        if len(out) >= k:
+            break
+    return out
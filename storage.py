@@ -0,0 +1,385 @@
+import csv
+import io
+import os
+import sqlite3
+import threading
+import uuid
+from abc import ABC, abstractmethod
+from datetime import date, datetime, timezone
+
+import db_manager as dbm
+import ingest_writer
+import query_cache
+
+
+class DuplicateBlogError(Exception):
+    pass
+
+
+class PostWriter(ABC):
+    # 한 번의 수집 작업 동안 열려 있는 쓰기 핸들. save_post 한 글은 commit() 해야 저장되고,
+    # commit() 없이 close() 하면 버려진다
+    @abstractmethod
+    def is_duplicate(self, blog_name: str, title: str, d: str) -> bool: ...
+
+    @abstractmethod
+    def save_post(self, blog_name: str, title: str, d: str, content: str, link: str): ...
+
+    @abstractmethod
+    def commit(self): ...
+
+    @abstractmethod
+    def close(self): ...
+
+
+class Storage(ABC):
+    @abstractmethod
+    def ensure_schema(self): ...
+
+    @abstractmethod
+    def load_blogs(self) -> list[dict]: ...
+
+    @abstractmethod
+    def add_blog(self, name: str, url: str, created_at: str): ...
+
+    @abstractmethod
+    def ensure_posts_for(self, blog_url: str): ...
+
+    @abstractmethod
+    def post_writer(self, blog_url: str) -> PostWriter: ...
+
+    @abstractmethod
+    def is_duplicate(self, blog_url: str, blog_name: str, title: str, d: str) -> bool: ...
+
+    @abstractmethod
+    def save_posts(self, blog_url: str, rows: list[tuple]) -> int:
+        # rows: (blog_name, title, date, content, link[, created_at]); returns number inserted
+        ...
+
+    @abstractmethod
+    def query_posts_for_blog(self, blog_url: str | None, start_date: date, end_date: date, keyword: str) -> list[dict]: ...
+
+    @abstractmethod
+    def iter_posts_for_blog(self, blog_url: str | None, start_date: date, end_date: date, keyword: str,
+                            chunk_size: int = 500):
+        # yields db_manager.PostRow in bounded-size chunks
+        ...
+
+    def close(self):
+        pass
+
+
+def _now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _like_filter(keyword: str) -> str | None:
+    kw = (keyword or "").strip()
+    return f"%{kw}%" if kw else None
+
+
+# ---------------------------------------------------------------- SQLite
+
+
+class SqlitePostWriter(PostWriter):
+    # 쓰기는 DB 마다 하나인 ingest_writer 스레드로 보낸다. 저장한 글은 commit() 전까지 이 writer 에만 쌓아 두고
+    # (close() 만 하면 버려진다), commit() 때 한꺼번에 넘긴다. 중복 확인은 읽기 전용 연결 + 쌓아 둔 글로 미리 걸러 내고,
+    # 다른 세션과 겹친 경우는 writer 가 INSERT 할 때 다시 걸러 낸다.
+    def __init__(self, blog_url: str):
+        self.blog_url = blog_url
+        self.conn = dbm.get_post_conn_for(blog_url)
+        self.cur = self.conn.cursor()
+        self.ingest = ingest_writer.get_writer(dbm.post_db_path_for(blog_url))
+        self.staged: list[tuple] = []
+        self.staged_keys: set[tuple] = set()
+        self.inserted = 0
+
+    def is_duplicate(self, blog_name, title, d):
+        if (blog_name, title, d) in self.staged_keys:
+            return True
+        return dbm.is_duplicate(self.cur, blog_name, title, d)
+
+    def stage(self, row: tuple):
+        # row: (blog_name, title, date, content, link[, created_at])
+        row = tuple(row[:6]) if len(row) >= 6 else (*row[:5], _now_iso())
+        self.staged.append(row)
+        self.staged_keys.add(row[:3])
+
+    def save_post(self, blog_name, title, d, content, link):
+        self.stage((blog_name, title, d, content, link))
+
+    def commit(self):
+        rows, self.staged, self.staged_keys = self.staged, [], set()
+        if rows:
+            futures = [self.ingest.submit(*r) for r in rows]
+            self.ingest.flush()
+            self.inserted += sum(1 for f in futures if f.result())
+        dbm.run_post_commit_hooks(self.blog_url)
+
+    def close(self):
+        # commit() 하지 않은 글은 저장하지 않는다
+        self.staged, self.staged_keys = [], set()
+        self.conn.close()
+
+
+class SqliteStorage(Storage):
+    # 기존 posts_<id>.db / data.db 파일 구성을 그대로 사용
+    def ensure_schema(self):
+        dbm.ensure_blogs_table()
+
+    def load_blogs(self):
+        return query_cache.load_blogs()
+
+    def add_blog(self, name, url, created_at):
+        try:
+            dbm.add_blog(name, url, created_at)
+        except sqlite3.IntegrityError as e:
+            raise DuplicateBlogError(url) from e
+
+    def ensure_posts_for(self, blog_url):
+        dbm.ensure_posts_table_for(blog_url)
+
+    def post_writer(self, blog_url):
+        return SqlitePostWriter(blog_url)
+
+    def is_duplicate(self, blog_url, blog_name, title, d):
+        conn = dbm.get_post_conn_for(blog_url)
+        try:
+            return dbm.is_duplicate(conn.cursor(), blog_name, title, d)
+        finally:
+            conn.close()
+
+    def save_posts(self, blog_url, rows):
+        writer = self.post_writer(blog_url)
+        try:
+            for r in rows:
+                writer.stage(r)
+            writer.commit()
+        finally:
+            writer.close()
+        return writer.inserted
+
+    def query_posts_for_blog(self, blog_url, start_date, end_date, keyword):
+        return query_cache.query_posts_for_blog(blog_url, start_date, end_date, keyword)
+
+    def iter_posts_for_blog(self, blog_url, start_date, end_date, keyword, chunk_size=500):
+        return dbm.iter_posts_for_blog(blog_url, start_date, end_date, keyword, chunk_size)
+
+
+# ---------------------------------------------------------------- Postgres
+
+
+# Supabase 와 같은 스키마: supabase_setup.sql 의 core tables 구간을 그대로 실행한다
+_SCHEMA_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "supabase_setup.sql")
+_SCHEMA_BEGIN = "-- >>> core tables"
+_SCHEMA_END = "-- <<< core tables"
+
+
+def pg_schema_sql() -> str:
+    with open(_SCHEMA_FILE, encoding="utf-8") as f:
+        text = f.read()
+    return text[text.index(_SCHEMA_BEGIN):text.index(_SCHEMA_END)]
+
+
+class PostgresPostWriter(PostWriter):
+    # 행을 모아 두었다가 commit() 때 COPY 한 번으로 넣는다. is_duplicate 는 버퍼까지 확인한다.
+    def __init__(self, storage: "PostgresStorage", blog_url: str):
+        self.storage = storage
+        self.blog_url = blog_url
+        self.buffer: list[tuple] = []
+        self.buffered_keys: set[tuple] = set()
+
+    def is_duplicate(self, blog_name, title, d):
+        if (blog_name, title, d) in self.buffered_keys:
+            return True
+        return self.storage.is_duplicate(self.blog_url, blog_name, title, d)
+
+    def save_post(self, blog_name, title, d, content, link):
+        self.buffer.append((blog_name, title, d, content, link, _now_iso()))
+        self.buffered_keys.add((blog_name, title, d))
+
+    def commit(self):
+        if self.buffer:
+            self.storage.save_posts(self.blog_url, self.buffer)
+        self.buffer = []
+        self.buffered_keys = set()
+
+    def close(self):
+        # commit() 하지 않은 글은 저장하지 않는다 (SqlitePostWriter 와 같다)
+        self.buffer = []
+        self.buffered_keys = set()
+
+
+class PostgresStorage(Storage):
+    def __init__(self, dsn: str, minconn: int = 1, maxconn: int = 10):
+        try:
+            from psycopg2.pool import ThreadedConnectionPool
+        except ImportError:
+            raise RuntimeError("PostgresStorage requires psycopg2 (pip install psycopg2-binary)")
+        import psycopg2
+        self._psycopg2 = psycopg2
+        self.pool = ThreadedConnectionPool(minconn, maxconn, dsn)
+        self._schema_ready = False
+        self._lock = threading.Lock()
+
+    def _conn(self):
+        return _PooledConn(self.pool)
+
+    def ensure_schema(self):
+        with self._lock:
+            if self._schema_ready:
+                return
+            with self._conn() as conn:
+                with conn.cursor() as cur:
+                    cur.execute(pg_schema_sql())
+            self._schema_ready = True
+
+    def load_blogs(self):
+        self.ensure_schema()
+        with self._conn() as conn:
+            with conn.cursor() as cur:
+                cur.execute("SELECT id, name, url FROM blogs ORDER BY id DESC")
+                return [{"id": r[0], "name": r[1], "url": r[2]} for r in cur.fetchall()]
+
+    def add_blog(self, name, url, created_at):
+        self.ensure_schema()
+        try:
+            with self._conn() as conn:
+                with conn.cursor() as cur:
+                    cur.execute(
+                        "INSERT INTO blogs(name, url, created_at) VALUES (%s, %s, %s)",
+                        (name, url, created_at),
+                    )
+        except self._psycopg2.IntegrityError as e:
+            raise DuplicateBlogError(url) from e
+
+    def ensure_posts_for(self, blog_url):
+        self.ensure_schema()
+
+    def post_writer(self, blog_url):
+        self.ensure_schema()
+        return PostgresPostWriter(self, blog_url)
+
+    def is_duplicate(self, blog_url, blog_name, title, d):
+        with self._conn() as conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    "SELECT 1 FROM posts WHERE blog_name = %s AND title = %s AND date = %s LIMIT 1",
+                    (blog_name, title, d),
+                )
+                return cur.fetchone() is not None
+
+    def save_posts(self, blog_url, rows):
+        if not rows:
+            return 0
+        self.ensure_schema()
+        buf = io.StringIO()
+        w = csv.writer(buf)
+        for r in rows:
+            created_at = r[5] if len(r) > 5 and r[5] else _now_iso()
+            w.writerow((r[0], r[1], r[2], r[3], r[4], created_at))
+        buf.seek(0)
+        with self._conn() as conn:
+            with conn.cursor() as cur:
+                # posts.blog_id 는 blogs 행을 가리킨다. 아직 없는 블로그면 글의 blog_name 으로 만든다
+                cur.execute(
+                    "INSERT INTO blogs(name, url) VALUES (%s, %s) ON CONFLICT (url) DO NOTHING",
+                    (rows[0][0], blog_url),
+                )
+                cur.execute("SELECT id FROM blogs WHERE url = %s", (blog_url,))
+                blog_id = cur.fetchone()[0]
+                # COPY 는 ON CONFLICT 를 지원하지 않으므로 임시 테이블을 거쳐 중복을 걸러낸다.
+                cur.execute(
+                    "CREATE TEMP TABLE _ingest_posts "
+                    "(blog_name TEXT, title TEXT, date DATE, content TEXT, link TEXT, created_at TIMESTAMPTZ) "
+                    "ON COMMIT DROP"
+                )
+                cur.copy_expert(
+                    "COPY _ingest_posts (blog_name, title, date, content, link, created_at) "
+                    "FROM STDIN WITH (FORMAT csv)",
+                    buf,
+                )
+                cur.execute(
+                    "INSERT INTO posts (blog_id, blog_name, title, date, content, link, created_at) "
+                    "SELECT DISTINCT ON (blog_name, title, date) %s, blog_name, title, date, content, link, created_at "
+                    "FROM _ingest_posts ON CONFLICT ON CONSTRAINT posts_dedup_key DO NOTHING",
+                    (blog_id,),
+                )
+                return cur.rowcount
+
+    def _post_query(self, blog_url, start_date, end_date, keyword):
+        where = ["date BETWEEN %s AND %s"]
+        params: list = [start_date, end_date]
+        if blog_url:
+            where.append("blog_id = (SELECT id FROM blogs WHERE url = %s)")
+            params.append(blog_url)
+        like = _like_filter(keyword)
+        if like:
+            where.append("(title LIKE %s OR content LIKE %s)")
+            params.extend([like, like])
+        sql = (
+            "SELECT blog_name, title, date, content, link, created_at FROM posts WHERE "
+            + " AND ".join(where)
+            + " ORDER BY date DESC, created_at DESC"
+        )
+        return sql, params
+
+    def iter_posts_for_blog(self, blog_url, start_date, end_date, keyword, chunk_size=500):
+        self.ensure_schema()
+        sql, params = self._post_query(blog_url, start_date, end_date, keyword)
+        with self._conn() as conn:
+            # named cursor = 서버 측 커서. itersize 만큼씩 가져오므로 결과 크기와 무관하게 메모리가 일정하다.
+            cur = conn.cursor(name=f"posts_{uuid.uuid4().hex}")
+            cur.itersize = chunk_size
+            try:
+                cur.execute(sql, params)
+                for r in cur:
+                    d = r[2].isoformat() if hasattr(r[2], "isoformat") else r[2]
+                    created = r[5].isoformat() if hasattr(r[5], "isoformat") else r[5]
+                    yield dbm.PostRow(r[0], r[1], d, r[3], r[4], created)
+            finally:
+                cur.close()
+
+    def query_posts_for_blog(self, blog_url, start_date, end_date, keyword):
+        return [r._asdict() for r in self.iter_posts_for_blog(blog_url, start_date, end_date, keyword)]
+
+    def close(self):
+        self.pool.closeall()
+
+
+class _PooledConn:
+    # with 블록 동안 풀에서 연결을 빌리고, 정상 종료 시 commit / 예외 시 rollback
+    def __init__(self, pool):
+        self.pool = pool
+        self.conn = None
+
+    def __enter__(self):
+        self.conn = self.pool.getconn()
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if exc_type is None:
+                self.conn.commit()
+            else:
+                self.conn.rollback()
+        finally:
+            self.pool.putconn(self.conn)
+        return False
+
+
+_storage: Storage | None = None
+_storage_lock = threading.Lock()
+
+
+def get_storage() -> Storage:
+    # STORAGE_URL=postgresql://... 이면 공유 Postgres, 아니면 로컬 SQLite 파일
+    global _storage
+    with _storage_lock:
+        if _storage is None:
+            url = os.environ.get("STORAGE_URL") or os.environ.get("DATABASE_URL") or ""
+            if url.startswith(("postgres://", "postgresql://")):
+                _storage = PostgresStorage(url, maxconn=int(os.environ.get("STORAGE_POOL_SIZE", "10")))
+            else:
+                _storage = SqliteStorage()
+        return _storage
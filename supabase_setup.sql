@@ -1,17 +1,17 @@
 -- Enable UUID extension
 create extension if not exists "uuid-ossp";
 
--- Create blogs table
-create table public.blogs (
+-- >>> core tables
+-- storage.PostgresStorage runs this block as-is on a plain Postgres (DATABASE_URL),
+-- so keep it idempotent and free of Supabase-only objects (auth users, RLS).
+create table if not exists public.blogs (
   id bigint generated by default as identity primary key,
   name text not null,
   url text not null unique,
-  created_at timestamp with time zone default timezone('utc'::text, now()) not null,
-  user_id uuid references auth.users not null
+  created_at timestamp with time zone default timezone('utc'::text, now()) not null
 );
 
--- Create posts table
-create table public.posts (
+create table if not exists public.posts (
   id bigint generated by default as identity primary key,
   blog_name text not null,
   title text not null,
@@ -19,9 +19,21 @@ create table public.posts (
   content text not null,
   link text not null,
   created_at timestamp with time zone default timezone('utc'::text, now()) not null,
-  blog_id bigint references public.blogs(id) on delete cascade
+  blog_id bigint references public.blogs(id) on delete cascade,
+  -- Same key as the local dedup check (db_manager.is_duplicate).
+  -- migrate_to_supabase.py upserts with on_conflict=blog_name,title,date, so re-runs never duplicate rows.
+  constraint posts_dedup_key unique (blog_name, title, date)
 );
 
+create index if not exists posts_blog_id_date on public.posts (blog_id, date desc);
+-- <<< core tables
+
+-- Owner of each blog (Supabase auth only)
+alter table public.blogs add column if not exists user_id uuid references auth.users not null;
+
+-- For a database created before posts_dedup_key existed:
+-- alter table public.posts add constraint posts_dedup_key unique (blog_name, title, date);
+
 -- Enable RLS
 alter table public.blogs enable row level security;
 alter table public.posts enable row level security;
@@ -0,0 +1,237 @@
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import time
+from datetime import datetime, timezone
+
+import db_manager as dbm
+from migrate_to_supabase import POST_COLUMNS, POST_CONFLICT_KEY, PostgrestClient, connect_from_env
+
+
+def _ensure_sync_state(conn):
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS sync_state (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            last_seq INTEGER NOT NULL DEFAULT 0,
+            last_synced_at TEXT,
+            pushed_total INTEGER NOT NULL DEFAULT 0
+        )
+        """
+    )
+
+
+def sync_db_paths() -> list[tuple[str, str]]:
+    # (path, table) : data.db 는 blogs, 나머지는 posts
+    out = []
+    if os.path.exists("data.db"):
+        out.append((os.path.abspath("data.db"), "blogs"))
+    for p in dbm.list_post_db_paths():
+        out.append((p, "posts"))
+    if os.path.exists("blog_data.db"):
+        out.append((os.path.abspath("blog_data.db"), "posts"))
+    return out
+
+
+def install(paths: list[tuple[str, str]] | None = None):
+    for path, table in paths or sync_db_paths():
+        conn = sqlite3.connect(path)
+        try:
+            cur = conn.cursor()
+            cur.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (table,))
+            if cur.fetchone() is None:
+                continue
+            dbm.ensure_sync_outbox(conn, table)
+            _ensure_sync_state(conn)
+            conn.commit()
+            print(f"Installed outbox triggers on {os.path.basename(path)}:{table}")
+        finally:
+            conn.close()
+
+
+def _has_outbox(conn) -> bool:
+    cur = conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='sync_outbox'")
+    return cur.fetchone() is not None
+
+
+def _parse_ts(s: str) -> datetime:
+    return datetime.fromisoformat(s.replace("Z", "+00:00"))
+
+
+def lag_status(path: str) -> dict:
+    conn = sqlite3.connect(path)
+    try:
+        if not _has_outbox(conn):
+            return {"db": os.path.basename(path), "installed": False}
+        pending, oldest = conn.execute("SELECT COUNT(*), MIN(changed_at) FROM sync_outbox").fetchone()
+        _ensure_sync_state(conn)
+        st = conn.execute("SELECT last_seq, last_synced_at, pushed_total FROM sync_state WHERE id = 1").fetchone()
+        lag = 0.0
+        if oldest:
+            lag = (datetime.now(timezone.utc) - _parse_ts(oldest)).total_seconds()
+        return {
+            "db": os.path.basename(path),
+            "installed": True,
+            "pending": pending,
+            "lag_seconds": round(max(lag, 0.0), 1),
+            "last_seq": st[0] if st else 0,
+            "last_synced_at": st[1] if st else None,
+            "pushed_total": st[2] if st else 0,
+        }
+    finally:
+        conn.close()
+
+
+class SyncWorker:
+    def __init__(self, client: PostgrestClient, user_id: str | None = None, batch_size: int = 500):
+        self.client = client
+        self.user_id = user_id
+        self.batch_size = batch_size
+        self._blog_ids: dict[str, int] | None = None
+
+    def blog_ids(self) -> dict[str, int]:
+        if self._blog_ids is None:
+            rows = self.client.select("blogs", {"select": "id,name"})
+            self._blog_ids = {b["name"]: b["id"] for b in rows or []}
+        return self._blog_ids
+
+    def _read_batch(self, conn):
+        # 같은 자연키에 대한 여러 변경은 마지막 것만 의미가 있다.
+        rows = conn.execute(
+            "SELECT seq, tbl, row_id, op, key FROM sync_outbox ORDER BY seq LIMIT ?",
+            (self.batch_size,),
+        ).fetchall()
+        latest: dict[tuple, tuple] = {}
+        for seq, tbl, row_id, op, key in rows:
+            latest[(tbl, key)] = (seq, row_id, op)
+        max_seq = rows[-1][0] if rows else 0
+        return max_seq, len(rows), latest
+
+    def _fetch_rows(self, conn, table: str, ids: list[int]) -> list[dict]:
+        if not ids:
+            return []
+        cols = POST_COLUMNS if table == "posts" else ["name", "url", "created_at"]
+        out = []
+        for i in range(0, len(ids), 500):
+            part = ids[i:i + 500]
+            cur = conn.execute(
+                f"SELECT {', '.join(cols)} FROM {table} WHERE id IN ({','.join('?' for _ in part)})",
+                part,
+            )
+            out.extend(dict(zip(cols, r)) for r in cur.fetchall())
+        return out
+
+    def _push(self, conn, latest: dict[tuple, tuple]) -> int:
+        deletes: dict[str, list[dict]] = {}
+        upsert_ids: dict[str, list[int]] = {}
+        for (tbl, key), (_seq, row_id, op) in latest.items():
+            if op == "delete":
+                deletes.setdefault(tbl, []).append(json.loads(key))
+            else:
+                upsert_ids.setdefault(tbl, []).append(row_id)
+
+        pushed = 0
+        blog_rows = self._fetch_rows(conn, "blogs", upsert_ids.get("blogs", []))
+        if blog_rows:
+            if self.user_id:
+                for b in blog_rows:
+                    b["user_id"] = self.user_id
+            self.client.upsert("blogs", blog_rows, on_conflict="url")
+            self._blog_ids = None
+            pushed += len(blog_rows)
+
+        post_rows = self._fetch_rows(conn, "posts", upsert_ids.get("posts", []))
+        if post_rows:
+            name_map = self.blog_ids()
+            by_key = {}
+            for p in post_rows:
+                p["blog_id"] = name_map.get(p["blog_name"])
+                by_key[(p["blog_name"], p["title"], p["date"])] = p
+            self.client.upsert("posts", list(by_key.values()), on_conflict=POST_CONFLICT_KEY)
+            pushed += len(by_key)
+
+        # DELETE 는 키 단위로 보낸다 (삭제는 드물고, 두 번 보내도 결과가 같다)
+        for tbl, keys in deletes.items():
+            for k in keys:
+                # 같은 배치에서 같은 키가 다시 삽입되었다면 latest 가 upsert 이므로 여기 오지 않는다.
+                self.client.delete(tbl, {c: f"eq.{v}" for c, v in k.items()})
+                pushed += 1
+        return pushed
+
+    def sync_db(self, path: str) -> dict:
+        conn = sqlite3.connect(path, timeout=30)
+        try:
+            if not _has_outbox(conn):
+                return {"db": os.path.basename(path), "pushed": 0, "changes": 0}
+            _ensure_sync_state(conn)
+            conn.execute("INSERT OR IGNORE INTO sync_state(id) VALUES (1)")
+            conn.commit()
+            pushed = 0
+            changes = 0
+            while True:
+                max_seq, n, latest = self._read_batch(conn)
+                if not n:
+                    break
+                batch_pushed = self._push(conn, latest)
+                pushed += batch_pushed
+                changes += n
+                # 원격 반영이 끝난 뒤에만 outbox 를 비운다. 여기서 중단되면 같은 배치를 다시 보내지만
+                # upsert/delete 는 멱등이므로 결과는 같다.
+                conn.execute("DELETE FROM sync_outbox WHERE seq <= ?", (max_seq,))
+                conn.execute(
+                    "UPDATE sync_state SET last_seq = ?, last_synced_at = ?, pushed_total = pushed_total + ? WHERE id = 1",
+                    (max_seq, datetime.now(timezone.utc).isoformat(), batch_pushed),
+                )
+                conn.commit()
+            return {"db": os.path.basename(path), "pushed": pushed, "changes": changes}
+        finally:
+            conn.close()
+
+    def sync_all(self) -> list[dict]:
+        # blogs 를 먼저 보내야 posts.blog_id 를 채울 수 있다.
+        return [self.sync_db(path) for path, _table in sync_db_paths()]
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Push local SQLite changes (sync_outbox) to Supabase")
+    ap.add_argument("command", choices=["install", "once", "run", "status"])
+    ap.add_argument("--interval", type=float, default=30.0, help="seconds between cycles for 'run'")
+    ap.add_argument("--batch-size", type=int, default=500)
+    ap.add_argument("--rest-url", default=os.environ.get("POSTGREST_URL"))
+    ap.add_argument("--user-id", default=os.environ.get("SUPABASE_USER_ID"))
+    ap.add_argument("--email", default=os.environ.get("SUPABASE_EMAIL"))
+    ap.add_argument("--password", default=os.environ.get("SUPABASE_PASSWORD"))
+    args = ap.parse_args(argv)
+
+    if args.command == "install":
+        install()
+        print("Set SUPABASE_SYNC=1 so newly created blog DBs get the triggers too.")
+        return 0
+    if args.command == "status":
+        for path, _table in sync_db_paths():
+            print(json.dumps(lag_status(path), ensure_ascii=False))
+        return 0
+
+    client, login_user_id = connect_from_env(args.rest_url, email=args.email, password=args.password)
+    worker = SyncWorker(client, user_id=args.user_id or login_user_id, batch_size=args.batch_size)
+    try:
+        while True:
+            started = time.monotonic()
+            results = worker.sync_all()
+            changes = sum(r["changes"] for r in results)
+            lag = max((lag_status(p).get("lag_seconds", 0.0) for p, _t in sync_db_paths()), default=0.0)
+            print(f"Synced {changes} changes in {time.monotonic() - started:.2f}s, max lag {lag:.1f}s")
+            if args.command == "once":
+                break
+            time.sleep(args.interval)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        client.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,13 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    # posts_*.db / data.db 는 현재 디렉터리에 생기므로 테스트마다 빈 디렉터리에서 돌린다
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
@@ -0,0 +1,68 @@
+import sqlite3
+import threading
+
+import bm25_index
+import db_manager as dbm
+
+BLOG_URL = "https://blog.naver.com/bm25test"
+
+
+def _fill(n):
+    dbm.ensure_posts_table_for(BLOG_URL)
+    conn = dbm.get_post_conn_for(BLOG_URL)
+    conn.executemany(
+        "INSERT INTO posts(blog_name, title, date, content, link, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+        [("bm25test", f"제목 {i}", f"2024-01-{i % 28 + 1:02d}", ("금리 환율 반도체 수출 " * 120) + str(i),
+          f"https://m.blog.naver.com/bm25test/{i}", "2024-01-01T00:00:00") for i in range(n)],
+    )
+    conn.commit()
+    conn.close()
+
+
+def test_concurrent_update_index_does_not_duplicate_chunks(workdir):
+    _fill(300)
+    start = threading.Barrier(3)
+    errors = []
+
+    def run():
+        try:
+            start.wait()
+            bm25_index.update_index(BLOG_URL, batch_size=50)
+        except Exception as e:  # pragma: no cover - 실패 원인을 assert 로 보여 준다
+            errors.append(e)
+
+    threads = [threading.Thread(target=run) for _ in range(3)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert errors == []
+
+    conn = sqlite3.connect(dbm.post_db_path_for(BLOG_URL))
+    try:
+        total, distinct = conn.execute(
+            "SELECT COUNT(*), COUNT(DISTINCT post_id || ':' || ord) FROM bm25_chunks").fetchone()
+        posts = conn.execute("SELECT COUNT(DISTINCT post_id) FROM bm25_chunks").fetchone()[0]
+        n_chunks = bm25_index._meta(conn, "n_chunks")
+        total_len = bm25_index._meta(conn, "total_len")
+        real_len = conn.execute("SELECT SUM(length) FROM bm25_chunks").fetchone()[0]
+    finally:
+        conn.close()
+    assert total == distinct
+    assert posts == 300
+    assert n_chunks == total
+    assert total_len == real_len
+
+
+def test_search_before_indexing_returns_nothing_without_creating_tables(workdir):
+    _fill(3)
+    assert bm25_index.search(BLOG_URL, "금리") == []
+    conn = dbm.get_post_conn_for(BLOG_URL)
+    try:
+        tables = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    finally:
+        conn.close()
+    assert "bm25_chunks" not in tables
+
+    bm25_index.update_index(BLOG_URL)
+    assert bm25_index.search(BLOG_URL, "금리")
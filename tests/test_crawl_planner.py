@@ -0,0 +1,68 @@
+from datetime import date
+
+import pytest
+
+import crawl_planner
+import db_manager as dbm
+import scraper
+
+BLOG = {"name": "plantest", "url": "https://blog.naver.com/plantest"}
+
+
+def _items(n):
+    return [(f"https://m.blog.naver.com/plantest/{2240000000 + i}", date(2025, 12, 1 + i % 28)) for i in range(n)]
+
+
+def test_budget_subtracts_discovery_time(workdir, monkeypatch):
+    monkeypatch.setattr(scraper, "discover_post_items", lambda *a, **k: _items(50))
+    clock = iter([0.0, 100.0])
+    monkeypatch.setattr(crawl_planner.time, "monotonic", lambda: next(clock))
+    per_post = crawl_planner.seconds_per_post()
+    p = crawl_planner.plan([BLOG], date(2025, 1, 1), date(2025, 12, 31), budget_seconds=100 + per_post * 10.5)
+    assert p["discover_seconds"] == 100.0
+    assert len(p["tasks"]) == 10
+    assert p["est_seconds"] + p["discover_seconds"] <= 100 + per_post * 10.5
+
+
+def _fake_fetch(url, log_cb=None, stop=None, allow_capped=True):
+    n = url.rsplit("/", 1)[1]
+    return (f'<html><head><meta property="og:title" content="t{n}">'
+            f'<meta property="article:published_time" content="2025-12-05"></head>'
+            f'<body><div class="se-main-container">본문 {n}</div></body></html>')
+
+
+def _fake_site(monkeypatch, n):
+    monkeypatch.setattr(scraper, "discover_post_items", lambda *a, **k: _items(n))
+    monkeypatch.setattr(scraper, "FETCH_DELAY", (0, 0))
+    monkeypatch.setattr(scraper, "SAVE_DELAY", (0, 0))
+    monkeypatch.setenv("NEAR_DUP_MODE", "off")
+    monkeypatch.setattr(scraper, "fetch", _fake_fetch)
+
+
+def test_collect_blog_posts_runs_the_planner(workdir, monkeypatch):
+    _fake_site(monkeypatch, 3)
+    res = scraper.collect_blog_posts(BLOG["name"], BLOG["url"], date(2025, 1, 1), date(2025, 12, 31))
+    assert res == {"total": 3, "saved": 3, "duplicates": 0, "failed": 0}
+    # 두 번째는 이미 저장된 링크라 받지 않는다
+    res = scraper.collect_blog_posts(BLOG["name"], BLOG["url"], date(2025, 1, 1), date(2025, 12, 31))
+    assert res == {"total": 3, "saved": 0, "duplicates": 3, "failed": 0}
+
+
+class Rerun(BaseException):
+    # Streamlit 의 ScriptControlException 처럼 Exception 이 아닌 중단
+    pass
+
+
+def test_interrupted_execute_commits_posts_already_saved(workdir, monkeypatch):
+    _fake_site(monkeypatch, 10)
+    p = crawl_planner.plan([BLOG], date(2025, 1, 1), date(2025, 12, 31))
+
+    def progress(frac, _eta):
+        if frac >= 0.5:
+            raise Rerun()
+
+    with pytest.raises(Rerun):
+        crawl_planner.execute(p, progress_cb=progress)
+    conn = dbm.get_post_conn_for(BLOG["url"])
+    assert conn.execute("SELECT COUNT(*) FROM posts").fetchone()[0] == 5
+    conn.close()
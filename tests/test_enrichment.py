@@ -0,0 +1,64 @@
+from datetime import date
+
+import db_manager as dbm
+import enrichment
+
+BLOG_URL = "https://blog.naver.com/enrichtest"
+
+
+def test_build_context_falls_back_to_post_text_without_summaries(workdir, monkeypatch):
+    monkeypatch.delenv("ENRICH_SUMMARIES", raising=False)
+    dbm.ensure_posts_table_for(BLOG_URL)
+    conn = dbm.get_post_conn_for(BLOG_URL)
+    conn.executemany(
+        "INSERT INTO posts(blog_name, title, date, content, link, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+        [("enrichtest", "금리 전망", "2024-03-01", "연준이 금리를 내리면 환율이 먼저 움직입니다.", "l1", "x"),
+         ("enrichtest", "반도체 메모", "2024-03-02", "반도체 수출이 다시 늘고 있습니다.", "l2", "x")],
+    )
+    conn.commit()
+    conn.close()
+    enrichment.enrich_blog(BLOG_URL, summarize=False)
+
+    ec = enrichment.build_context(BLOG_URL, "금리 환율", date(2024, 1, 1), date(2024, 12, 31))
+    assert ec["posts"] == 2
+    assert ec["summarized"] == 0
+    assert "키워드:" not in ec["context"]
+    # 질문과 관련된 글이 먼저, 본문이 그대로 들어간다
+    assert ec["context"].index("연준이 금리를 내리면") < ec["context"].index("반도체 수출이")
+
+
+def test_failed_summaries_wait_for_cooldown_and_stop_after_max_attempts(workdir, monkeypatch):
+    dbm.ensure_posts_table_for(BLOG_URL)
+    conn = dbm.get_post_conn_for(BLOG_URL)
+    conn.execute(
+        "INSERT INTO posts(blog_name, title, date, content, link, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+        ("enrichtest", "요약 실패", "2024-03-01", "요약이 계속 실패하는 글입니다.", "l1", "x"),
+    )
+    conn.commit()
+    calls = []
+
+    def failing_summarize(models, d, title, content):
+        calls.append(title)
+        raise RuntimeError("quota")
+
+    monkeypatch.setattr(enrichment, "_summarize", failing_summarize)
+
+    def expire_cooldown():
+        conn.execute("UPDATE post_enrichment SET summary_failed_at = '2000-01-01T00:00:00+00:00'")
+        conn.commit()
+
+    assert enrichment.enrich_blog(BLOG_URL, summarize=True, models=object())["failed"] == 1
+    # 대기 시간 안에는 다시 시도하지 않는다
+    assert enrichment.enrich_blog(BLOG_URL, summarize=True, models=object())["failed"] == 0
+    for _ in range(enrichment.SUMMARY_MAX_ATTEMPTS):
+        expire_cooldown()
+        enrichment.enrich_blog(BLOG_URL, summarize=True, models=object())
+    assert len(calls) == enrichment.SUMMARY_MAX_ATTEMPTS
+    assert conn.execute("SELECT summary_attempts FROM post_enrichment").fetchone()[0] == enrichment.SUMMARY_MAX_ATTEMPTS
+
+    monkeypatch.setattr(enrichment, "_summarize", lambda models, d, title, content: ("요약", "v1"))
+    stats = enrichment.enrich_blog(BLOG_URL, summarize=True, models=object(), retry_failed=True)
+    assert stats["summaries"] == 1
+    assert conn.execute("SELECT summary, summary_attempts, summary_failed_at FROM post_enrichment").fetchone() \
+        == ("요약", 0, None)
+    conn.close()
@@ -0,0 +1,42 @@
+import json
+import sqlite3
+from datetime import date
+
+import db_manager as dbm
+import export_posts
+
+
+def _make_db(blog_id: str, rows: list[tuple]):
+    url = f"https://blog.naver.com/{blog_id}"
+    dbm.ensure_posts_table_for(url)
+    conn = sqlite3.connect(dbm.post_db_path_for(url))
+    conn.executemany(
+        "INSERT INTO posts(blog_name, title, date, content, link, created_at) VALUES (?, ?, ?, ?, ?, 'x')", rows)
+    conn.commit()
+    conn.close()
+
+
+def _exported(path) -> list[tuple]:
+    with open(path, encoding="utf-8") as f:
+        return sorted((r["source"], r["title"]) for r in map(json.loads, f))
+
+
+def test_id_selected_file_is_not_filtered_by_blog_names(workdir):
+    _make_db("alpha", [("알파", "a1", "2024-01-01", "본문", "l")])
+    _make_db("beta", [("베타", "b1", "2024-01-01", "본문", "l"), ("감마", "g1", "2024-01-02", "본문", "l")])
+
+    res = export_posts.export_posts("out.jsonl", blogs=["alpha", "감마"], log=None)
+    assert res["rows"] == 2
+    assert _exported("out.jsonl") == [("alpha", "a1"), ("beta", "g1")]
+
+
+def test_incremental_with_date_filter_keeps_rows_outside_the_window(workdir):
+    _make_db("alpha", [("알파", "old", "2023-06-01", "본문", "l"), ("알파", "new", "2024-06-01", "본문", "l")])
+
+    export_posts.export_posts("a.jsonl", start_date=date(2024, 1, 1), incremental=True, log=None)
+    assert _exported("a.jsonl") == [("alpha", "new")]
+    # 날짜 필터로 건너뛴 행은 필터 없는 증분 내보내기에서 빠지지 않는다
+    export_posts.export_posts("b.jsonl", incremental=True, log=None)
+    assert _exported("b.jsonl") == [("alpha", "new"), ("alpha", "old")]
+    export_posts.export_posts("c.jsonl", incremental=True, log=None)
+    assert _exported("c.jsonl") == []
@@ -0,0 +1,46 @@
+import sqlite3
+
+import pytest
+
+import db_manager as dbm
+import ingest_writer
+
+ROW = ("b", "t", "2024-01-01", "본문", "l")
+
+
+def test_connect_failure_fails_futures_instead_of_hanging(tmp_path):
+    w = ingest_writer.IngestWriter(str(tmp_path / "missing" / "posts_x.db"))
+    fut = w.submit(*ROW)
+    with pytest.raises(sqlite3.OperationalError):
+        fut.result(timeout=5)
+    assert w.alive
+    w.close()
+
+
+@pytest.mark.filterwarnings("ignore::pytest.PytestUnhandledThreadExceptionWarning")
+def test_dead_writer_thread_fails_waiters_and_is_replaced(workdir, monkeypatch):
+    url = "https://blog.naver.com/ingesttest"
+    dbm.ensure_posts_table_for(url)
+    path = dbm.post_db_path_for(url)
+    monkeypatch.setattr(ingest_writer, "WAIT_POLL", 0.05)
+
+    def die(_path):
+        raise SystemExit("writer thread killed")
+
+    monkeypatch.setattr(dbm, "bump_write_generation", die)
+    w = ingest_writer.get_writer(path)
+    fut = w.submit(*ROW)
+    with pytest.raises(RuntimeError):
+        w.flush()
+    with pytest.raises(RuntimeError):
+        fut.result(timeout=5)
+    w._thread.join(5)
+    assert not w.alive
+    with pytest.raises(RuntimeError):
+        w.submit(*ROW).result(timeout=5)
+
+    monkeypatch.undo()
+    w2 = ingest_writer.get_writer(path)
+    assert w2 is not w
+    assert w2.submit(*ROW).result(timeout=5) is False
+    w2.flush()
@@ -0,0 +1,64 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import migrate_to_supabase as mig
+
+
+@pytest.fixture
+def postgrest():
+    # 로컬 PostgREST 대신: 응답 상태 목록을 차례로 돌려주고 받은 요청을 기록한다
+    state = {"statuses": [], "calls": []}
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def _reply(self):
+            body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+            state["calls"].append((self.command, self.path, body))
+            status = state["statuses"].pop(0) if state["statuses"] else 200
+            out = json.dumps([{"ok": True}]).encode() if status == 200 else b'{"message": "nope"}'
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(out)))
+            self.end_headers()
+            self.wfile.write(out)
+
+        do_GET = do_POST = do_DELETE = _reply
+
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    state["url"] = f"http://127.0.0.1:{srv.server_port}"
+    yield state
+    srv.shutdown()
+    srv.server_close()
+
+
+def test_zero_retries_still_makes_one_request(postgrest):
+    client = mig.PostgrestClient(postgrest["url"], max_retries=0)
+    assert client.select("posts", {"select": "id"}) == [{"ok": True}]
+    assert len(postgrest["calls"]) == 1
+
+    postgrest["statuses"] = [503]
+    with pytest.raises(mig.PostgrestError):
+        client.select("posts", {"select": "id"})
+    assert len(postgrest["calls"]) == 2
+    client.close()
+
+
+def test_retries_server_errors_but_not_client_errors(postgrest, monkeypatch):
+    monkeypatch.setattr(mig.time, "sleep", lambda s: None)
+    client = mig.PostgrestClient(postgrest["url"], max_retries=3)
+    postgrest["statuses"] = [503, 429]
+    assert client.upsert("posts", [{"title": "t"}], on_conflict=mig.POST_CONFLICT_KEY) == [{"ok": True}]
+    assert [c[0] for c in postgrest["calls"]] == ["POST"] * 3
+    assert json.loads(postgrest["calls"][-1][2]) == [{"title": "t"}]
+
+    postgrest["statuses"] = [400]
+    with pytest.raises(mig.PostgrestError):
+        client.delete("posts", {"id": "eq.1"})
+    assert len(postgrest["calls"]) == 4
+    client.close()
@@ -0,0 +1,40 @@
+import time
+
+import pytest
+
+import model_router
+
+
+class FakeModel:
+    def __init__(self, name, first_delay, chunks=("a", "b")):
+        self.name = name
+        self.first_delay = first_delay
+        self.chunks = chunks
+
+    def stream(self, parts):
+        time.sleep(self.first_delay)
+        yield from self.chunks
+
+
+def test_empty_model_list_is_rejected():
+    with pytest.raises(ValueError):
+        model_router.ModelRouter().complete([], ["q"])
+
+
+def test_hedge_loser_latency_is_recorded(monkeypatch):
+    monkeypatch.setattr(model_router, "HEDGE_MIN_DELAY", 0.05)
+    router = model_router.ModelRouter(hedge=True)
+    for _ in range(model_router.HEDGE_MIN_SAMPLES):
+        router.record_success("slow", 0.01)
+    slow, fast = FakeModel("slow", 0.4), FakeModel("fast", 0.0)
+
+    text, used = router.complete([slow, fast], ["q"])
+    assert (text, used) == ("ab", "fast")
+    # 진 시도는 첫 청크가 나온 뒤에 기록한다
+    deadline = time.monotonic() + 2
+    while len(router._h("slow").samples) <= model_router.HEDGE_MIN_SAMPLES and time.monotonic() < deadline:
+        time.sleep(0.02)
+    samples = list(router._h("slow").samples)
+    assert len(samples) == model_router.HEDGE_MIN_SAMPLES + 1
+    assert samples[-1] >= 0.35
+    assert router.stats()["slow"]["successes"] == model_router.HEDGE_MIN_SAMPLES
@@ -0,0 +1,32 @@
+import sqlite3
+
+import numpy as np
+
+import near_dup
+
+
+def test_signature_matches_exact_integer_arithmetic():
+    text = " ".join(f"반도체 수출 {i}번째 메모, 환율 {i * 7 % 13}원" for i in range(40))
+    sig = near_dup.signature(text)
+    t = near_dup._WS_RE.sub(" ", text.lower()).strip()
+    p = int(near_dup._P)
+    shingles = {near_dup.zlib.crc32(t[i:i + near_dup.SHINGLE].encode("utf-8")) % p
+                for i in range(len(t) - near_dup.SHINGLE + 1)}
+    expected = [min((int(a) * x + int(b)) % p for x in shingles) for a, b in zip(near_dup._A, near_dup._B)]
+    assert sig.tolist() == expected
+
+
+def test_old_signatures_are_dropped_on_version_change(workdir):
+    conn = near_dup.get_conn()
+    conn.execute("INSERT INTO minhash_docs(blog_key, post_id, blog_name, title, date, sig) VALUES ('k', 1, 'b', 't', 'd', ?)",
+                 (np.zeros(near_dup.NUM_PERM, dtype=np.uint32).tobytes(),))
+    conn.execute("INSERT INTO minhash_state(blog_key, last_post_id) VALUES ('k', 1)")
+    conn.execute("PRAGMA user_version = 1")
+    conn.commit()
+    conn.close()
+
+    conn = near_dup.get_conn()
+    assert conn.execute("SELECT COUNT(*) FROM minhash_docs").fetchone()[0] == 0
+    assert conn.execute("SELECT COUNT(*) FROM minhash_state").fetchone()[0] == 0
+    conn.close()
+    assert sqlite3.connect(near_dup.DB_PATH).execute("PRAGMA user_version").fetchone()[0] == near_dup.SIG_VERSION
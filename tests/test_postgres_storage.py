@@ -0,0 +1,58 @@
+import os
+import uuid
+from datetime import date
+
+import pytest
+
+import storage
+
+DSN = os.environ.get("TEST_POSTGRES_DSN")
+pytestmark = pytest.mark.skipif(not DSN, reason="set TEST_POSTGRES_DSN to run against a local Postgres")
+
+
+@pytest.fixture
+def pg():
+    pytest.importorskip("psycopg2")
+    store = storage.PostgresStorage(DSN)
+    store.ensure_schema()
+    # 블로그 이름/URL 을 테스트마다 새로 만들어 다른 데이터와 겹치지 않게 한다
+    name = f"pgtest-{uuid.uuid4().hex[:8]}"
+    url = f"https://blog.naver.com/{name}"
+    store.add_blog(name, url, "2024-01-01T00:00:00+00:00")
+    yield store, name, url
+    with store._conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute("DELETE FROM blogs WHERE url = %s", (url,))
+    store.close()
+
+
+def _posts(store, url):
+    return store.query_posts_for_blog(url, date(2000, 1, 1), date(2100, 1, 1), "")
+
+
+def test_writer_close_without_commit_persists_nothing(pg):
+    store, name, url = pg
+    w = store.post_writer(url)
+    w.save_post(name, "a", "2024-01-01", "본문", "l1")
+    w.close()
+    assert _posts(store, url) == []
+
+
+def test_writer_commit_dedups_and_queries_by_blog(pg):
+    store, name, url = pg
+    w = store.post_writer(url)
+    try:
+        w.save_post(name, "a", "2024-01-01", "금리 본문", "l1")
+        assert w.is_duplicate(name, "a", "2024-01-01")
+        w.save_post(name, "b", "2024-01-02", "환율 본문", "l2")
+        w.commit()
+    finally:
+        w.close()
+    assert store.save_posts(url, [(name, "a", "2024-01-01", "x", "l1"), (name, "c", "2024-01-03", "x", "l3")]) == 1
+    posts = _posts(store, url)
+    assert [p["title"] for p in posts] == ["c", "b", "a"]
+    assert isinstance(posts[0]["created_at"], str)
+    assert [p["title"] for p in store.query_posts_for_blog(url, date(2000, 1, 1), date(2100, 1, 1), "금리")] == ["a"]
+    with pytest.raises(storage.DuplicateBlogError):
+        store.add_blog(name, url, "2024-01-01T00:00:00+00:00")
+
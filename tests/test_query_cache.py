@@ -0,0 +1,36 @@
+import sqlite3
+from datetime import date
+
+import db_manager as dbm
+import query_cache
+
+BLOG_URL = "https://blog.naver.com/cachetest"
+RANGE = (date(2024, 1, 1), date(2024, 12, 31))
+
+
+def test_cached_results_are_not_shared_with_callers(workdir):
+    dbm.ensure_posts_table_for(BLOG_URL)
+    conn = dbm.get_post_conn_for(BLOG_URL)
+    dbm.save_post(conn.cursor(), "cachetest", "t", "2024-02-01", "본문", "l")
+    dbm.commit_posts(conn)
+    conn.close()
+    query_cache.clear()
+
+    first = query_cache.query_posts_for_blog(BLOG_URL, *RANGE, "")
+    first[0]["title"] = "바뀜"
+    first.append({"title": "추가"})
+    again = query_cache.query_posts_for_blog(BLOG_URL, *RANGE, "")
+    assert [r["title"] for r in again] == ["t"]
+    assert query_cache.cache_stats()["hits"] >= 1
+
+
+def test_write_generation_moves_only_on_commit(workdir):
+    dbm.ensure_posts_table_for(BLOG_URL)
+    path = dbm.post_db_path_for(BLOG_URL)
+    conn = sqlite3.connect(path)
+    before = dbm.write_generation(path)
+    dbm.save_post(conn.cursor(), "cachetest", "t", "2024-02-01", "본문", "l")
+    assert dbm.write_generation(path)[0] == before[0]
+    dbm.commit_posts(conn)
+    assert dbm.write_generation(path)[0] == before[0] + 1
+    conn.close()
@@ -0,0 +1,61 @@
+import db_manager as dbm
+import keyword_trends
+import revalidate
+import scraper
+import semantic_index
+
+BLOG_URL = "https://blog.naver.com/revaltest"
+
+
+def test_changed_post_is_reindexed_in_semantic_and_keyword_indexes(workdir, monkeypatch):
+    dbm.ensure_posts_table_for(BLOG_URL)
+    conn = dbm.get_post_conn_for(BLOG_URL)
+    conn.executemany(
+        "INSERT INTO posts(blog_name, title, date, content, link, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+        [("revaltest", "시황", "2024-03-01", "반도체 수출이 늘었습니다.", "l1", "x"),
+         ("revaltest", "메모", "2024-03-02", "환율이 올랐습니다.", "l2", "x")],
+    )
+    conn.commit()
+    conn.close()
+    semantic_index.update_index(BLOG_URL)
+    keyword_trends.update_index(BLOG_URL)
+    assert keyword_trends.load(BLOG_URL).term_ids.get("희토류") is None
+
+    edited = "희토류 공급망이 흔들렸습니다."
+    monkeypatch.setattr(scraper, "fetch_conditional",
+                        lambda link, etag, last_mod, log_cb=None: (200, link, None, None))
+    monkeypatch.setattr(scraper, "parse_post",
+                        lambda html: ("시황", None, edited) if html == "l1" else ("메모", None, "환율이 올랐습니다."))
+    stats = revalidate.revalidate_blog(BLOG_URL)
+    assert stats["changed"] == 1
+
+    corpus = keyword_trends.load(BLOG_URL)
+    assert corpus.meta["docs"] == 2
+    assert "희토류" in corpus.term_ids
+    assert "반도체" not in corpus.term_ids
+    hits = semantic_index.search(BLOG_URL, "희토류 공급망")
+    assert hits and hits[0][0] == 1
+    assert semantic_index._committed_rows(semantic_index._files(dbm.post_db_path_for(BLOG_URL))) == 2
+
+
+def test_candidates_limit_and_sample_in_sql(workdir):
+    dbm.ensure_posts_table_for(BLOG_URL)
+    conn = dbm.get_post_conn_for(BLOG_URL)
+    conn.executemany(
+        "INSERT INTO posts(blog_name, title, date, content, link, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+        [("revaltest", f"글 {i}", f"2024-03-{i + 1:02d}", "본문" * 1000, f"l{i}", "x") for i in range(20)],
+    )
+    conn.commit()
+    revalidate.ensure_tables(conn)
+    revalidate.backfill(conn)
+    conn.execute("UPDATE post_fingerprints SET checked_at = '2000-01-01T00:00:00+00:00' WHERE post_id <= 10")
+    conn.commit()
+
+    rows = revalidate.candidates(conn, limit=5)
+    # 본문 없이 (id, link, fingerprint, etag, last_modified, revision) 만
+    assert all(len(r) == 6 for r in rows)
+    # 한 번도 확인 안 한 글의 최근 글부터
+    assert [r[0] for r in rows] == [20, 19, 18, 17, 16]
+    assert len(revalidate.candidates(conn, limit=30, sample=0.25)) == 5
+    assert len(revalidate.candidates(conn, limit=3, sample=0.5)) == 3
+    conn.close()
@@ -0,0 +1,73 @@
+import threading
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import http_transport
+import scraper
+
+HEAD = ('<html><head><meta property="og:title" content="제목">'
+        '<meta property="article:published_time" content="2024-05-01T10:00:00+09:00"></head><body>')
+PAGES = {
+    "/small": HEAD + '<div class="se-main-container"><p>짧은 본문</p></div></body></html>',
+    # 본문 영역이 크기 제한 안에서 끝나지 않는다
+    "/huge": HEAD + '<div class="se-main-container">' + "<p>긴 본문 문단</p>" * 20000 + "</div></body></html>",
+}
+
+
+class FakeWriter:
+    def __init__(self):
+        self.saved = []
+
+    def is_duplicate(self, blog_name, title, d):
+        return False
+
+    def save_post(self, *row):
+        self.saved.append(row)
+
+
+@pytest.fixture
+def site(monkeypatch):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            data = PAGES[self.path].encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            try:
+                self.wfile.write(data)
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    monkeypatch.setattr(scraper, "FETCH_DELAY", (0, 0))
+    monkeypatch.setitem(http_transport.SIZE_CAPS, "text/html", 64 * 1024)
+    yield f"http://127.0.0.1:{srv.server_port}"
+    srv.shutdown()
+    srv.server_close()
+
+
+def test_post_page_over_size_cap_is_skipped_not_saved(site):
+    writer = FakeWriter()
+    logs = []
+    args = (date(2024, 1, 1), date(2024, 12, 31))
+    assert scraper.process_post(writer, "b", site + "/huge", None, *args, log_cb=logs.append) == "skipped"
+    assert writer.saved == []
+    assert any("Size cap reached" in m for m in logs)
+
+    assert scraper.process_post(writer, "b", site + "/small", None, *args) == "saved"
+    assert writer.saved[0][3] == "짧은 본문"
+
+
+def test_conditional_fetch_refuses_capped_page(site):
+    with pytest.raises(RuntimeError, match="size cap"):
+        scraper.fetch_conditional(site + "/huge")
+    assert scraper.fetch_conditional(site + "/small")[0] == 200
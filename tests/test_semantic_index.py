@@ -0,0 +1,46 @@
+import multiprocessing
+
+import numpy as np
+
+import db_manager as dbm
+import keyword_trends
+import semantic_index
+
+BLOG_URL = "https://blog.naver.com/semtest"
+
+
+def _fill(n):
+    dbm.ensure_posts_table_for(BLOG_URL)
+    conn = dbm.get_post_conn_for(BLOG_URL)
+    conn.executemany(
+        "INSERT INTO posts(blog_name, title, date, content, link, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+        [("semtest", f"제목 {i}", f"2024-01-{i % 28 + 1:02d}", f"금리 환율 반도체 수출 {i}", f"l{i}", "x")
+         for i in range(n)],
+    )
+    conn.commit()
+    conn.close()
+
+
+def _update(start):
+    start.wait()
+    semantic_index.update_index(BLOG_URL, batch_size=20)
+    keyword_trends.update_index(BLOG_URL, batch_size=20)
+
+
+def test_update_index_from_several_processes_appends_each_post_once(workdir):
+    _fill(200)
+    ctx = multiprocessing.get_context("fork")
+    start = ctx.Barrier(3)
+    procs = [ctx.Process(target=_update, args=(start,)) for _ in range(3)]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join(60)
+        assert p.exitcode == 0
+
+    files = semantic_index._files(dbm.post_db_path_for(BLOG_URL))
+    rows = semantic_index._committed_rows(files)
+    assert rows == semantic_index._row_count(files) == 200
+    assert np.array_equal(np.fromfile(files["ids"], dtype=np.int64), np.arange(1, 201))
+    corpus = keyword_trends.load(BLOG_URL)
+    assert np.array_equal(corpus.ids, np.arange(1, 201))
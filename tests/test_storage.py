@@ -0,0 +1,62 @@
+import sqlite3
+import time
+
+import pytest
+
+import db_manager as dbm
+import storage
+
+BLOG_URL = "https://blog.naver.com/writertest"
+
+
+def _count(url=BLOG_URL):
+    conn = sqlite3.connect(dbm.post_db_path_for(url))
+    try:
+        return conn.execute("SELECT COUNT(*) FROM posts").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_sqlite_writer_close_without_commit_persists_nothing(workdir):
+    store = storage.SqliteStorage()
+    store.ensure_posts_for(BLOG_URL)
+    w = store.post_writer(BLOG_URL)
+    for i in range(5):
+        w.save_post("writertest", f"title {i}", "2024-01-01", "본문", f"https://m.blog.naver.com/writertest/{i}")
+    # writer 스레드의 배치 대기 시간보다 충분히 기다려도 디스크에는 없다
+    time.sleep(0.3)
+    assert _count() == 0
+    w.close()
+    time.sleep(0.3)
+    assert _count() == 0
+
+
+def test_sqlite_writer_commit_persists_and_dedups(workdir):
+    store = storage.SqliteStorage()
+    store.ensure_posts_for(BLOG_URL)
+    w = store.post_writer(BLOG_URL)
+    try:
+        w.save_post("writertest", "a", "2024-01-01", "본문", "https://m.blog.naver.com/writertest/1")
+        assert w.is_duplicate("writertest", "a", "2024-01-01")
+        w.save_post("writertest", "b", "2024-01-02", "본문", "https://m.blog.naver.com/writertest/2")
+        w.commit()
+    finally:
+        w.close()
+    assert w.inserted == 2
+    assert _count() == 2
+    assert store.save_posts(BLOG_URL, [("writertest", "a", "2024-01-01", "x", "l"),
+                                       ("writertest", "c", "2024-01-03", "x", "l")]) == 1
+    assert _count() == 3
+
+
+def test_storage_bases_are_abstract():
+    with pytest.raises(TypeError):
+        storage.Storage()
+    with pytest.raises(TypeError):
+        storage.PostWriter()
+
+
+def test_postgres_schema_is_the_supabase_core_block():
+    sql = storage.pg_schema_sql()
+    assert "auth." not in sql
+    assert "constraint posts_dedup_key unique (blog_name, title, date)" in sql
@@ -0,0 +1,41 @@
+import sqlite3
+
+import db_manager as dbm
+import sync_supabase
+
+BLOG_URL = "https://blog.naver.com/synctest"
+
+
+class RecordingClient:
+    def __init__(self):
+        self.upserts = []
+
+    def select(self, table, params):
+        return [{"id": 7, "name": "synctest"}]
+
+    def upsert(self, table, rows, on_conflict, ignore_duplicates=False, returning=False):
+        self.upserts.append((table, rows))
+        return []
+
+    def delete(self, table, filters):
+        return []
+
+
+def test_pushed_total_counts_rows_sent_not_outbox_changes(workdir):
+    dbm.ensure_posts_table_for(BLOG_URL)
+    path = dbm.post_db_path_for(BLOG_URL)
+    sync_supabase.install([(path, "posts")])
+    conn = sqlite3.connect(path)
+    conn.execute("INSERT INTO posts(blog_name, title, date, content, link, created_at) "
+                 "VALUES ('synctest', 't', '2024-01-01', 'v1', 'l', 'x')")
+    conn.execute("UPDATE posts SET content = 'v2'")
+    conn.execute("UPDATE posts SET content = 'v3'")
+    conn.commit()
+    conn.close()
+
+    client = RecordingClient()
+    res = sync_supabase.SyncWorker(client).sync_db(path)
+    assert res["changes"] == 3
+    assert res["pushed"] == 1
+    assert client.upserts[0][1][0]["content"] == "v3"
+    assert sync_supabase.lag_status(path)["pushed_total"] == 1
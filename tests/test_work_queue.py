@@ -0,0 +1,150 @@
+import multiprocessing
+import os
+import signal
+import sqlite3
+import time
+from datetime import date
+
+import pytest
+
+import scraper
+import work_queue as wq
+
+BLOG_URL = "https://blog.naver.com/queuetest"
+N = 12
+VICTIM = 5
+
+
+def _fake_fetch(url, log_cb=None, stop=None, allow_capped=True):
+    time.sleep(0.02)
+    if url.endswith("/queuetest"):
+        return "".join(f'<a href="/queuetest/{2240000000 + i}">x</a>' for i in range(N))
+    n = int(url.rsplit("/", 1)[1]) - 2240000000
+    if n == VICTIM and not os.path.exists("victim.pid"):
+        # 이 글을 처리하는 워커는 lease 를 잡은 채 멈춘다 (테스트가 SIGKILL 로 죽인다)
+        with open("victim.pid", "w") as f:
+            f.write(str(os.getpid()))
+        time.sleep(60)
+    return (f'<html><head><meta property="og:title" content="t{n}">'
+            f'<meta property="article:published_time" content="2025-12-0{n % 5 + 1}"></head>'
+            f'<body><div class="se-main-container">글 {n} 본문</div></body></html>')
+
+
+def _worker():
+    wq.run_worker(idle_exit=3, lease_seconds=2, heartbeat_seconds=0.5, save_delay=(0, 0), log=lambda m: None)
+
+
+@pytest.mark.skipif("fork" not in multiprocessing.get_all_start_methods(), reason="needs fork")
+def test_killed_worker_task_is_redone_without_double_save(workdir, monkeypatch):
+    monkeypatch.setattr(scraper, "fetch", _fake_fetch)
+    monkeypatch.setattr(scraper, "fetch_rss_items", lambda *a, **k: [])
+    monkeypatch.setattr(scraper, "FETCH_DELAY", (0, 0))
+    monkeypatch.setenv("NEAR_DUP_MODE", "off")
+    job_id = wq.enqueue_job("queuetest", BLOG_URL, date(2025, 12, 1), date(2025, 12, 31))
+
+    ctx = multiprocessing.get_context("fork")
+    procs = [ctx.Process(target=_worker) for _ in range(2)]
+    for p in procs:
+        p.start()
+    deadline = time.monotonic() + 30
+    while not os.path.exists("victim.pid") or not open("victim.pid").read():
+        assert time.monotonic() < deadline, "no worker reached the victim task"
+        time.sleep(0.05)
+    victim = int(open("victim.pid").read())
+    os.kill(victim, signal.SIGKILL)
+    for p in procs:
+        p.join(60)
+        assert not p.is_alive()
+    assert sorted(p.exitcode for p in procs) == [-signal.SIGKILL, 0]
+
+    conn = wq.get_conn()
+    try:
+        summary = wq.job_summary(conn, job_id)
+        redone = conn.execute(
+            "SELECT attempts, status FROM crawl_tasks WHERE url LIKE ?", (f"%/{2240000000 + VICTIM}",)
+        ).fetchone()
+    finally:
+        conn.close()
+    assert summary["status"] == "done"
+    assert summary["tasks"] == {"saved": N}
+    # 죽은 워커의 lease 가 만료된 뒤 다른 워커가 다시 처리했다
+    assert tuple(redone) == (2, "done")
+
+    posts = sqlite3.connect("posts_queuetest.db")
+    try:
+        total, distinct = posts.execute("SELECT COUNT(*), COUNT(DISTINCT link) FROM posts").fetchone()
+    finally:
+        posts.close()
+    assert total == distinct == N
+
+
+@pytest.mark.skipif(not os.environ.get("TEST_POSTGRES_DSN"), reason="set TEST_POSTGRES_DSN to run against a local Postgres")
+def test_postgres_queue_leases_each_task_once():
+    pytest.importorskip("psycopg2")
+    import storage
+
+    store = storage.PostgresStorage(os.environ["TEST_POSTGRES_DSN"])
+    q = wq.PostgresQueue(store)
+    job_id = q.enqueue_job("pgqueue", BLOG_URL, date(2025, 12, 1), date(2025, 12, 31))
+    try:
+        job = q.lease_job("w1")
+        assert job["id"] == job_id and job["attempts"] == 1
+        other = q.lease_job("w2")
+        assert other is None or other["id"] != job_id
+        assert q.add_tasks(job, "w1", [(f"{BLOG_URL}/{i}", None) for i in range(3)])
+
+        leased = [q.lease_task(w) for w in ("w1", "w2", "w1")]
+        assert sorted(t["url"] for t in leased) == [f"{BLOG_URL}/{i}" for i in range(3)]
+        assert q.heartbeat("crawl_tasks", leased[0]["id"], "w1")
+        assert not q.heartbeat("crawl_tasks", leased[0]["id"], "w2")
+        for t in leased[:2]:
+            assert q.complete_task(t, t["lease_owner"], "saved")
+        q.fail_task(leased[2], "w1", "boom")
+        # 실패한 task 는 다시 pending 이 되어 다른 워커가 가져간다
+        retry = q.lease_task("w2")
+        assert retry["id"] == leased[2]["id"] and retry["attempts"] == 2
+        q.complete_task(retry, "w2", "duplicate")
+
+        summary = q.job_summary(job_id)
+        assert summary["status"] == "done"
+        assert summary["tasks"] == {"saved": 2, "duplicate": 1}
+    finally:
+        with store._conn() as conn:
+            with conn.cursor() as cur:
+                cur.execute("DELETE FROM crawl_jobs WHERE id = %s", (job_id,))
+        store.close()
+
+
+def test_worker_indexes_commits_and_checks_near_dups_across_tasks(workdir, monkeypatch):
+    import db_manager as dbm
+    import indexing
+
+    body = "같은 내용을 제목만 바꿔 다시 올린 글입니다. " * 20
+
+    def fake_fetch(url, log_cb=None, stop=None, allow_capped=True):
+        if url.endswith("/queuetest"):
+            return "".join(f'<a href="/queuetest/{2240000000 + i}">x</a>' for i in range(2))
+        n = int(url.rsplit("/", 1)[1]) - 2240000000
+        return (f'<html><head><meta property="og:title" content="t{n}">'
+                f'<meta property="article:published_time" content="2025-12-0{n + 1}"></head>'
+                f'<body><div class="se-main-container">{body}</div></body></html>')
+
+    monkeypatch.setattr(scraper, "fetch", fake_fetch)
+    monkeypatch.setattr(scraper, "fetch_rss_items", lambda *a, **k: [])
+    monkeypatch.setattr(scraper, "FETCH_DELAY", (0, 0))
+    monkeypatch.setenv("NEAR_DUP_MODE", "skip")
+    monkeypatch.setattr(dbm, "_post_commit_hooks", [])
+    indexed = []
+    # 색인 없이도 같은 job 에서 먼저 저장한 글과 비교해야 한다
+    monkeypatch.setattr(indexing, "index_new_posts", indexed.append)
+    job_id = wq.enqueue_job("queuetest", BLOG_URL, date(2025, 12, 1), date(2025, 12, 31))
+
+    stats = wq.run_worker(idle_exit=0, save_delay=(0, 0), log=lambda m: None)
+
+    assert stats["saved"] == 1 and stats["duplicates"] == 1
+    conn = wq.get_conn()
+    try:
+        assert wq.job_summary(conn, job_id)["tasks"] == {"saved": 1, "duplicate": 1}
+    finally:
+        conn.close()
+    assert BLOG_URL in indexed
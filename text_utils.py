@@ -0,0 +1,85 @@
+import re
+from functools import lru_cache
+
+_TOKEN_RE = re.compile(r"[가-힣]+|[a-z][a-z0-9]*|[0-9]+(?:\.[0-9]+)?%?")
+
+_JOSA = {
+    "은", "는", "이", "가", "을", "를", "의", "에", "에서", "에게", "께서", "한테", "으로", "로",
+    "와", "과", "도", "만", "까지", "부터", "보다", "처럼", "이나", "나", "이란", "란", "이며",
+    "이다", "입니다", "였다", "했다", "한다", "하는", "하고", "하며", "해서", "에는", "에도",
+    "으로는", "로는", "이라는", "라는", "들", "들은", "들이", "들을",
+}
+# 긴 것부터 확인해야 '에서' 가 '에' 보다 먼저 잘린다.
+_JOSA_LENGTHS = sorted({len(j) for j in _JOSA}, reverse=True)
+
+STOPWORDS = {
+    "그리고", "그러나", "하지만", "그래서", "또한", "이런", "저런", "그런", "있다", "없다", "있는", "없는",
+    "것", "수", "등", "및", "더", "또", "좀", "잘", "이번", "지금", "오늘", "the", "and", "for", "of", "to", "in",
+}
+
+
+@lru_cache(maxsize=200000)
+def _strip_josa(word: str) -> str:
+    n = len(word)
+    for k in _JOSA_LENGTHS:
+        if n > k + 1 and word[-k:] in _JOSA:
+            return word[:-k]
+    return word
+
+
+def tokenize_ko(text: str, bigrams: bool = True) -> list[str]:
+    # 형태소 분석기 없이 쓰는 한국어 토크나이저:
+    # 어절에서 조사/어미를 떼어 낸 어간 + (붙여 쓴 복합어 대응용) 음절 바이그램
+    out: list[str] = []
+    for tok in _TOKEN_RE.findall((text or "").lower()):
+        if "가" <= tok[0] <= "힣":
+            stem = _strip_josa(tok)
+            if len(stem) >= 2 and stem not in STOPWORDS:
+                out.append(stem)
+            if bigrams and len(stem) >= 3:
+                out.extend(stem[i:i + 2] for i in range(len(stem) - 1))
+        elif len(tok) >= 2 and tok not in STOPWORDS:
+            out.append(tok)
+    return out
+
+
+def split_chunks(text: str, max_chars: int = 800) -> list[str]:
+    # 문단 단위로 나누고, 짧은 문단은 max_chars 까지 합치며, 긴 문단은 문장 경계에서 자른다.
+    paras = [p.strip() for p in re.split(r"\n+", text or "") if p.strip()]
+    chunks: list[str] = []
+    cur = ""
+    for p in paras:
+        pieces = [p]
+        if len(p) > max_chars:
+            pieces = []
+            buf = ""
+            for sent in re.split(r"(?<=[.!?。])\s+|(?<=다\.)\s*", p):
+                if not sent:
+                    continue
+                while len(sent) > max_chars:
+                    pieces.append(sent[:max_chars])
+                    sent = sent[max_chars:]
+                if buf and len(buf) + len(sent) + 1 > max_chars:
+                    pieces.append(buf)
+                    buf = sent
+                else:
+                    buf = f"{buf} {sent}" if buf else sent
+            if buf:
+                pieces.append(buf)
+        for piece in pieces:
+            if cur and len(cur) + len(piece) + 1 > max_chars:
+                chunks.append(cur)
+                cur = piece
+            else:
+                cur = f"{cur}\n{piece}" if cur else piece
+    if cur:
+        chunks.append(cur)
+    return chunks
+
+
+def estimate_tokens(text: str) -> int:
+    # Gemini 토크나이저 근사치: 한글은 음절당 약 0.7토큰, 그 외는 4글자당 1토큰
+    if not text:
+        return 0
+    hangul = sum(1 for ch in text if "가" <= ch <= "힣")
+    return int(hangul * 0.7 + (len(text) - hangul) / 4) + 1
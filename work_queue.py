@@ -0,0 +1,709 @@
+import argparse
+import multiprocessing
+import os
+import random
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from datetime import date, datetime
+
+# 블로그 단위 작업(job) -> 글 링크 찾기 후 글 단위 작업(task) 으로 나눈다.
+# 워커는 job/task 를 lease 로 가져가고, 처리 중에는 heartbeat 로 연장한다.
+# lease 가 만료되면 (워커가 죽었거나 멈춤) 다른 워커가 다시 가져간다.
+# SQLite 큐 파일은 한 호스트 안의 프로세스끼리만 공유한다: WAL 은 같은 머신의 공유 메모리를 쓰므로
+# NFS/SMB 같은 네트워크 드라이브 위에 두면 안 된다. 워커 여러 개는 --processes 로 늘린다.
+# 저장소가 Postgres(STORAGE_URL) 면 큐도 같은 DB 에 두므로 여러 호스트의 워커가 나눠 가질 수 있다.
+QUEUE_PATH = os.environ.get("WORK_QUEUE_PATH", "work_queue.db")
+LEASE_SECONDS = 60
+HEARTBEAT_SECONDS = 15
+MAX_ATTEMPTS = 3
+# 글 하나 저장 후 쉬는 시간 (워커마다 따로 적용)
+SAVE_DELAY = (5.0, 20.0)
+
+
+def _now() -> float:
+    return time.time()
+
+
+def get_conn(path: str | None = None):
+    conn = sqlite3.connect(path or QUEUE_PATH, timeout=30, isolation_level=None, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA busy_timeout=30000")
+    conn.row_factory = sqlite3.Row
+    conn.executescript(
+        """
+        CREATE TABLE IF NOT EXISTS crawl_jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            blog_name TEXT NOT NULL,
+            blog_url TEXT NOT NULL,
+            start_date TEXT NOT NULL,
+            end_date TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'pending',
+            lease_owner TEXT,
+            lease_expires REAL,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            total INTEGER,
+            error TEXT,
+            created_at TEXT NOT NULL,
+            finished_at TEXT
+        );
+        CREATE TABLE IF NOT EXISTS crawl_tasks (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            job_id INTEGER NOT NULL,
+            url TEXT NOT NULL,
+            date_hint TEXT,
+            status TEXT NOT NULL DEFAULT 'pending',
+            lease_owner TEXT,
+            lease_expires REAL,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            result TEXT,
+            error TEXT,
+            UNIQUE (job_id, url)
+        );
+        CREATE INDEX IF NOT EXISTS crawl_tasks_status ON crawl_tasks(status, lease_expires);
+        CREATE INDEX IF NOT EXISTS crawl_jobs_status ON crawl_jobs(status, lease_expires);
+        """
+    )
+    return conn
+
+
+def _lease(conn, table: str, worker: str, lease_seconds: float):
+    # BEGIN IMMEDIATE 로 쓰기 잠금을 잡은 뒤 고르고 표시해야 두 워커가 같은 행을 가져가지 않는다
+    now = _now()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        # 시도 횟수를 다 쓴 채 lease 가 만료된 것은 다시 주지 않고 실패로 돌린다
+        conn.execute(
+            f"UPDATE {table} SET status = 'failed', error = 'lease expired', lease_owner = NULL "
+            f"WHERE status = 'leased' AND lease_expires < ? AND attempts >= ?",
+            (now, MAX_ATTEMPTS),
+        )
+        row = conn.execute(
+            f"SELECT * FROM {table} WHERE status = 'pending' OR (status = 'leased' AND lease_expires < ?) "
+            f"ORDER BY id LIMIT 1",
+            (now,),
+        ).fetchone()
+        if row is not None:
+            conn.execute(
+                f"UPDATE {table} SET status = 'leased', lease_owner = ?, lease_expires = ?, attempts = attempts + 1 "
+                f"WHERE id = ?",
+                (worker, now + lease_seconds, row["id"]),
+            )
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    return None if row is None else dict(row) | {"attempts": row["attempts"] + 1}
+
+
+def lease_task(conn, worker: str, lease_seconds: float = LEASE_SECONDS) -> dict | None:
+    task = _lease(conn, "crawl_tasks", worker, lease_seconds)
+    if task is None:
+        # 남은 task 가 모두 끝났거나 실패한 job 정리
+        for (job_id,) in conn.execute("SELECT id FROM crawl_jobs WHERE status = 'running'").fetchall():
+            _finish_job_if_done(conn, job_id)
+    return task
+
+
+def lease_job(conn, worker: str, lease_seconds: float = LEASE_SECONDS) -> dict | None:
+    return _lease(conn, "crawl_jobs", worker, lease_seconds)
+
+
+def heartbeat(conn, table: str, item_id: int, worker: str, lease_seconds: float = LEASE_SECONDS) -> bool:
+    # 아직 내 lease 면 연장. False 면 만료되어 다른 워커가 가져간 것
+    cur = conn.execute(
+        f"UPDATE {table} SET lease_expires = ? WHERE id = ? AND status = 'leased' AND lease_owner = ?",
+        (_now() + lease_seconds, item_id, worker),
+    )
+    return cur.rowcount == 1
+
+
+def _finish_job_if_done(conn, job_id: int):
+    conn.execute(
+        "UPDATE crawl_jobs SET status = 'done', finished_at = ? WHERE id = ? AND status = 'running' "
+        "AND NOT EXISTS (SELECT 1 FROM crawl_tasks WHERE job_id = ? AND status IN ('pending', 'leased'))",
+        (datetime.now().isoformat(), job_id, job_id),
+    )
+
+
+def complete_task(conn, task: dict, worker: str, result: str) -> bool:
+    cur = conn.execute(
+        "UPDATE crawl_tasks SET status = 'done', result = ?, lease_owner = NULL, lease_expires = NULL "
+        "WHERE id = ? AND lease_owner = ?",
+        (result, task["id"], worker),
+    )
+    _finish_job_if_done(conn, task["job_id"])
+    return cur.rowcount == 1
+
+
+def fail_task(conn, task: dict, worker: str, error: str):
+    status = "failed" if task["attempts"] >= MAX_ATTEMPTS else "pending"
+    conn.execute(
+        "UPDATE crawl_tasks SET status = ?, error = ?, lease_owner = NULL, lease_expires = NULL "
+        "WHERE id = ? AND lease_owner = ?",
+        (status, error[:500], task["id"], worker),
+    )
+    _finish_job_if_done(conn, task["job_id"])
+
+
+def add_tasks(conn, job: dict, worker: str, items: list[tuple[str, date | None]]) -> bool:
+    # 링크 찾기가 끝난 job 을 task 들로 펼친다. 그 사이 lease 를 잃었으면 아무것도 하지 않는다
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        cur = conn.execute(
+            "UPDATE crawl_jobs SET status = 'running', total = ?, lease_owner = NULL, lease_expires = NULL "
+            "WHERE id = ? AND lease_owner = ? AND status = 'leased'",
+            (len(items), job["id"], worker),
+        )
+        if cur.rowcount == 1:
+            conn.executemany(
+                "INSERT OR IGNORE INTO crawl_tasks(job_id, url, date_hint) VALUES (?, ?, ?)",
+                [(job["id"], link, dd.isoformat() if dd else None) for link, dd in items],
+            )
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    _finish_job_if_done(conn, job["id"])
+    return cur.rowcount == 1
+
+
+def fail_job(conn, job: dict, worker: str, error: str):
+    status = "failed" if job["attempts"] >= MAX_ATTEMPTS else "pending"
+    conn.execute(
+        "UPDATE crawl_jobs SET status = ?, error = ?, lease_owner = NULL, lease_expires = NULL "
+        "WHERE id = ? AND lease_owner = ?",
+        (status, error[:500], job["id"], worker),
+    )
+
+
+def job_summary(conn, job_id: int) -> dict:
+    job = dict(conn.execute("SELECT * FROM crawl_jobs WHERE id = ?", (job_id,)).fetchone())
+    counts = dict(conn.execute(
+        "SELECT COALESCE(result, status), COUNT(*) FROM crawl_tasks WHERE job_id = ? GROUP BY 1", (job_id,)
+    ).fetchall())
+    return job | {"tasks": counts}
+
+
+class WorkQueue(ABC):
+    # job/task 를 보관하는 곳. get_queue() 가 저장소에 맞는 구현을 고른다
+    @abstractmethod
+    def enqueue_job(self, blog_name: str, blog_url: str, start_date: date, end_date: date) -> int: ...
+
+    @abstractmethod
+    def lease_task(self, worker: str, lease_seconds: float = LEASE_SECONDS) -> dict | None: ...
+
+    @abstractmethod
+    def lease_job(self, worker: str, lease_seconds: float = LEASE_SECONDS) -> dict | None: ...
+
+    @abstractmethod
+    def heartbeat(self, table: str, item_id: int, worker: str, lease_seconds: float = LEASE_SECONDS) -> bool: ...
+
+    @abstractmethod
+    def complete_task(self, task: dict, worker: str, result: str) -> bool: ...
+
+    @abstractmethod
+    def fail_task(self, task: dict, worker: str, error: str): ...
+
+    @abstractmethod
+    def add_tasks(self, job: dict, worker: str, items: list[tuple[str, date | None]]) -> bool: ...
+
+    @abstractmethod
+    def fail_job(self, job: dict, worker: str, error: str): ...
+
+    @abstractmethod
+    def get_job(self, job_id: int) -> dict: ...
+
+    @abstractmethod
+    def job_summary(self, job_id: int) -> dict: ...
+
+    @abstractmethod
+    def queue_stats(self) -> dict:
+        # {"jobs": {status: n}, "tasks": {status: n}}
+        ...
+
+    def for_thread(self) -> "WorkQueue":
+        # 다른 스레드(heartbeat)에서 쓸 큐
+        return self
+
+    def close(self):
+        pass
+
+
+# ---------------------------------------------------------------- SQLite
+
+
+class SqliteQueue(WorkQueue):
+    # 로컬 큐 파일 (한 호스트 전용, 맨 위 설명 참고). 연결은 처음 쓸 때 연다
+    def __init__(self, path: str | None = None):
+        self.path = path or QUEUE_PATH
+        self._conn = None
+
+    @property
+    def conn(self):
+        if self._conn is None:
+            self._conn = get_conn(self.path)
+        return self._conn
+
+    def enqueue_job(self, blog_name, blog_url, start_date, end_date):
+        cur = self.conn.execute(
+            "INSERT INTO crawl_jobs(blog_name, blog_url, start_date, end_date, created_at) VALUES (?, ?, ?, ?, ?)",
+            (blog_name, blog_url, start_date.isoformat(), end_date.isoformat(), datetime.now().isoformat()),
+        )
+        return cur.lastrowid
+
+    def lease_task(self, worker, lease_seconds=LEASE_SECONDS):
+        return lease_task(self.conn, worker, lease_seconds)
+
+    def lease_job(self, worker, lease_seconds=LEASE_SECONDS):
+        return lease_job(self.conn, worker, lease_seconds)
+
+    def heartbeat(self, table, item_id, worker, lease_seconds=LEASE_SECONDS):
+        return heartbeat(self.conn, table, item_id, worker, lease_seconds)
+
+    def complete_task(self, task, worker, result):
+        return complete_task(self.conn, task, worker, result)
+
+    def fail_task(self, task, worker, error):
+        fail_task(self.conn, task, worker, error)
+
+    def add_tasks(self, job, worker, items):
+        return add_tasks(self.conn, job, worker, items)
+
+    def fail_job(self, job, worker, error):
+        fail_job(self.conn, job, worker, error)
+
+    def get_job(self, job_id):
+        return dict(self.conn.execute("SELECT * FROM crawl_jobs WHERE id = ?", (job_id,)).fetchone())
+
+    def job_summary(self, job_id):
+        return job_summary(self.conn, job_id)
+
+    def queue_stats(self):
+        # 아직 큐 파일이 없으면 만들지 않는다
+        if self._conn is None and not os.path.exists(self.path):
+            return {"jobs": {}, "tasks": {}}
+        now = _now()
+        out = {}
+        for table in ("crawl_jobs", "crawl_tasks"):
+            out[table.removeprefix("crawl_")] = dict(self.conn.execute(
+                f"SELECT CASE WHEN status = 'leased' AND lease_expires < ? THEN 'expired' ELSE status END, COUNT(*) "
+                f"FROM {table} GROUP BY 1",
+                (now,),
+            ).fetchall())
+        return out
+
+    def for_thread(self):
+        # lease 의 BEGIN IMMEDIATE 와 섞이지 않도록 스레드마다 연결을 따로 쓴다
+        return SqliteQueue(self.path)
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+# ---------------------------------------------------------------- Postgres
+
+
+_PG_SCHEMA = """
+CREATE TABLE IF NOT EXISTS crawl_jobs (
+    id BIGSERIAL PRIMARY KEY,
+    blog_name TEXT NOT NULL,
+    blog_url TEXT NOT NULL,
+    start_date TEXT NOT NULL,
+    end_date TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    lease_owner TEXT,
+    lease_expires DOUBLE PRECISION,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    total INTEGER,
+    error TEXT,
+    created_at TEXT NOT NULL,
+    finished_at TEXT
+);
+CREATE TABLE IF NOT EXISTS crawl_tasks (
+    id BIGSERIAL PRIMARY KEY,
+    job_id BIGINT NOT NULL REFERENCES crawl_jobs(id) ON DELETE CASCADE,
+    url TEXT NOT NULL,
+    date_hint TEXT,
+    status TEXT NOT NULL DEFAULT 'pending',
+    lease_owner TEXT,
+    lease_expires DOUBLE PRECISION,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    result TEXT,
+    error TEXT,
+    UNIQUE (job_id, url)
+);
+CREATE INDEX IF NOT EXISTS crawl_tasks_status ON crawl_tasks(status, lease_expires);
+CREATE INDEX IF NOT EXISTS crawl_jobs_status ON crawl_jobs(status, lease_expires);
+"""
+
+_pg_schema_ready = False
+_pg_schema_lock = threading.Lock()
+
+
+class PostgresQueue(WorkQueue):
+    # PostgresStorage 의 연결 풀을 같이 쓴다. 행은 FOR UPDATE SKIP LOCKED 로 골라 표시하므로
+    # 여러 호스트의 워커가 동시에 가져가도 같은 행을 두 번 주지 않는다
+    def __init__(self, store):
+        from psycopg2.extras import RealDictCursor
+        self.store = store
+        self._dict_cursor = RealDictCursor
+        self._ensure_schema()
+
+    def _ensure_schema(self):
+        global _pg_schema_ready
+        with _pg_schema_lock:
+            if _pg_schema_ready:
+                return
+            with self.store._conn() as conn:
+                with conn.cursor() as cur:
+                    cur.execute(_PG_SCHEMA)
+            _pg_schema_ready = True
+
+    def _cursor(self, conn):
+        return conn.cursor(cursor_factory=self._dict_cursor)
+
+    def enqueue_job(self, blog_name, blog_url, start_date, end_date):
+        with self.store._conn() as conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    "INSERT INTO crawl_jobs(blog_name, blog_url, start_date, end_date, created_at) "
+                    "VALUES (%s, %s, %s, %s, %s) RETURNING id",
+                    (blog_name, blog_url, start_date.isoformat(), end_date.isoformat(), datetime.now().isoformat()),
+                )
+                return cur.fetchone()[0]
+
+    def _lease(self, table: str, worker: str, lease_seconds: float):
+        now = _now()
+        with self.store._conn() as conn:
+            with self._cursor(conn) as cur:
+                # 잠긴 행은 건너뛰어 워커끼리 서로 기다리거나 교착되지 않게 한다
+                cur.execute(
+                    f"UPDATE {table} SET status = 'failed', error = 'lease expired', lease_owner = NULL "
+                    f"WHERE id IN (SELECT id FROM {table} WHERE status = 'leased' AND lease_expires < %s "
+                    f"AND attempts >= %s FOR UPDATE SKIP LOCKED)",
+                    (now, MAX_ATTEMPTS),
+                )
+                cur.execute(
+                    f"UPDATE {table} SET status = 'leased', lease_owner = %s, lease_expires = %s, "
+                    f"attempts = attempts + 1 WHERE id = ("
+                    f"SELECT id FROM {table} WHERE status = 'pending' OR (status = 'leased' AND lease_expires < %s) "
+                    f"ORDER BY id LIMIT 1 FOR UPDATE SKIP LOCKED) RETURNING *",
+                    (worker, now + lease_seconds, now),
+                )
+                row = cur.fetchone()
+        return None if row is None else dict(row)
+
+    def lease_task(self, worker, lease_seconds=LEASE_SECONDS):
+        task = self._lease("crawl_tasks", worker, lease_seconds)
+        if task is None:
+            with self.store._conn() as conn:
+                with conn.cursor() as cur:
+                    cur.execute("SELECT id FROM crawl_jobs WHERE status = 'running'")
+                    for (job_id,) in cur.fetchall():
+                        self._finish_job_if_done(cur, job_id)
+        return task
+
+    def lease_job(self, worker, lease_seconds=LEASE_SECONDS):
+        return self._lease("crawl_jobs", worker, lease_seconds)
+
+    def heartbeat(self, table, item_id, worker, lease_seconds=LEASE_SECONDS):
+        with self.store._conn() as conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    f"UPDATE {table} SET lease_expires = %s WHERE id = %s AND status = 'leased' AND lease_owner = %s",
+                    (_now() + lease_seconds, item_id, worker),
+                )
+                return cur.rowcount == 1
+
+    @staticmethod
+    def _finish_job_if_done(cur, job_id: int):
+        cur.execute(
+            "UPDATE crawl_jobs SET status = 'done', finished_at = %s WHERE id = %s AND status = 'running' "
+            "AND NOT EXISTS (SELECT 1 FROM crawl_tasks WHERE job_id = %s AND status IN ('pending', 'leased'))",
+            (datetime.now().isoformat(), job_id, job_id),
+        )
+
+    def complete_task(self, task, worker, result):
+        with self.store._conn() as conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    "UPDATE crawl_tasks SET status = 'done', result = %s, lease_owner = NULL, lease_expires = NULL "
+                    "WHERE id = %s AND lease_owner = %s",
+                    (result, task["id"], worker),
+                )
+                done = cur.rowcount == 1
+                self._finish_job_if_done(cur, task["job_id"])
+        return done
+
+    def fail_task(self, task, worker, error):
+        status = "failed" if task["attempts"] >= MAX_ATTEMPTS else "pending"
+        with self.store._conn() as conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    "UPDATE crawl_tasks SET status = %s, error = %s, lease_owner = NULL, lease_expires = NULL "
+                    "WHERE id = %s AND lease_owner = %s",
+                    (status, error[:500], task["id"], worker),
+                )
+                self._finish_job_if_done(cur, task["job_id"])
+
+    def add_tasks(self, job, worker, items):
+        # job 상태 변경과 task 추가를 한 트랜잭션으로 (SQLite 의 BEGIN IMMEDIATE 구간과 같다)
+        with self.store._conn() as conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    "UPDATE crawl_jobs SET status = 'running', total = %s, lease_owner = NULL, lease_expires = NULL "
+                    "WHERE id = %s AND lease_owner = %s AND status = 'leased'",
+                    (len(items), job["id"], worker),
+                )
+                owned = cur.rowcount == 1
+                if owned:
+                    cur.executemany(
+                        "INSERT INTO crawl_tasks(job_id, url, date_hint) VALUES (%s, %s, %s) "
+                        "ON CONFLICT (job_id, url) DO NOTHING",
+                        [(job["id"], link, dd.isoformat() if dd else None) for link, dd in items],
+                    )
+                self._finish_job_if_done(cur, job["id"])
+        return owned
+
+    def fail_job(self, job, worker, error):
+        status = "failed" if job["attempts"] >= MAX_ATTEMPTS else "pending"
+        with self.store._conn() as conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    "UPDATE crawl_jobs SET status = %s, error = %s, lease_owner = NULL, lease_expires = NULL "
+                    "WHERE id = %s AND lease_owner = %s",
+                    (status, error[:500], job["id"], worker),
+                )
+
+    def get_job(self, job_id):
+        with self.store._conn() as conn:
+            with self._cursor(conn) as cur:
+                cur.execute("SELECT * FROM crawl_jobs WHERE id = %s", (job_id,))
+                return dict(cur.fetchone())
+
+    def job_summary(self, job_id):
+        job = self.get_job(job_id)
+        with self.store._conn() as conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    "SELECT COALESCE(result, status), COUNT(*) FROM crawl_tasks WHERE job_id = %s GROUP BY 1",
+                    (job_id,),
+                )
+                return job | {"tasks": dict(cur.fetchall())}
+
+    def queue_stats(self):
+        now = _now()
+        out = {}
+        with self.store._conn() as conn:
+            with conn.cursor() as cur:
+                for table in ("crawl_jobs", "crawl_tasks"):
+                    cur.execute(
+                        f"SELECT CASE WHEN status = 'leased' AND lease_expires < %s THEN 'expired' ELSE status END, "
+                        f"COUNT(*) FROM {table} GROUP BY 1",
+                        (now,),
+                    )
+                    out[table.removeprefix("crawl_")] = dict(cur.fetchall())
+        return out
+
+    # 연결 풀은 PostgresStorage 의 것이므로 close() 에서 닫지 않는다
+
+
+def get_queue(path: str | None = None) -> WorkQueue:
+    # 큐 파일을 지정하지 않았고 저장소가 Postgres(STORAGE_URL) 면 같은 DB 의 큐, 아니면 로컬 SQLite 파일
+    import storage
+
+    if path is None:
+        store = storage.get_storage()
+        if isinstance(store, storage.PostgresStorage):
+            return PostgresQueue(store)
+    return SqliteQueue(path)
+
+
+def enqueue_job(blog_name: str, blog_url: str, start_date: date, end_date: date, path: str | None = None) -> int:
+    q = get_queue(path)
+    try:
+        return q.enqueue_job(blog_name, blog_url, start_date, end_date)
+    finally:
+        q.close()
+
+
+def queue_stats(path: str | None = None) -> dict:
+    q = get_queue(path)
+    try:
+        return q.queue_stats()
+    finally:
+        q.close()
+
+
+class _Heartbeat:
+    # 처리하는 동안 별도 스레드에서 lease 를 연장한다
+    def __init__(self, q: "WorkQueue", table: str, item_id: int, worker: str, lease_seconds: float,
+                 interval: float):
+        self.lost = False
+        self._stop = threading.Event()
+        self._args = (q, table, item_id, worker, lease_seconds, interval)
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        q, table, item_id, worker, lease_seconds, interval = self._args
+        q = q.for_thread()
+        try:
+            while not self._stop.wait(interval):
+                if not q.heartbeat(table, item_id, worker, lease_seconds):
+                    self.lost = True
+                    return
+        finally:
+            q.close()
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+
+def run_worker(path: str | None = None, worker: str | None = None, idle_exit: float | None = None,
+               lease_seconds: float = LEASE_SECONDS, heartbeat_seconds: float = HEARTBEAT_SECONDS,
+               save_delay: tuple[float, float] = SAVE_DELAY, log=print) -> dict:
+    # task 를 먼저 처리하고, 없으면 job 의 링크 찾기를 맡는다. idle_exit 초 동안 일이 없으면 종료
+    import db_manager as dbm
+    import indexing
+    import near_dup
+    import scraper
+    import storage
+
+    worker = worker or default_worker_id()
+    q = get_queue(path)
+    store = storage.get_storage()
+    # 앱과 같이 커밋한 글을 바로 색인한다 (비슷한 글 검사도 이 색인을 본다)
+    dbm.register_post_commit_hook(indexing.index_new_posts)
+    near_mode = near_dup.mode()
+    # 비슷한 글 검사기는 job 마다 하나: 같은 job 에서 저장했지만 아직 색인 전인 글까지 비교한다
+    checker, checker_job = None, None
+    stats = {"tasks": 0, "saved": 0, "duplicates": 0, "failed": 0, "jobs": 0}
+    idle_since = time.monotonic()
+    try:
+        while True:
+            task = q.lease_task(worker, lease_seconds)
+            if task is not None:
+                idle_since = time.monotonic()
+                job = q.get_job(task["job_id"])
+                log(f"[{worker}] task {task['id']} {task['url']}")
+                try:
+                    with _Heartbeat(q, "crawl_tasks", task["id"], worker, lease_seconds, heartbeat_seconds) as hb:
+                        store.ensure_posts_for(job["blog_url"])
+                        writer = store.post_writer(job["blog_url"])
+                        if near_mode != "off" and checker_job != job["id"]:
+                            if checker:
+                                checker.close()
+                            checker, checker_job = near_dup.IngestChecker(), job["id"]
+                        try:
+                            result = scraper.process_post(
+                                writer, job["blog_name"], task["url"],
+                                date.fromisoformat(task["date_hint"]) if task["date_hint"] else None,
+                                date.fromisoformat(job["start_date"]), date.fromisoformat(job["end_date"]),
+                                checker, near_mode, lambda m: log(f"[{worker}] {m}"),
+                            )
+                            # lease 를 잃었으면 다른 워커가 같은 글을 처리하므로 저장하지 않는다
+                            if hb.lost:
+                                raise RuntimeError("lease lost")
+                            writer.commit()
+                        finally:
+                            writer.close()
+                    q.complete_task(task, worker, result)
+                    stats["tasks"] += 1
+                    stats["saved"] += result == "saved"
+                    stats["duplicates"] += result == "duplicate"
+                    if result == "saved":
+                        time.sleep(random.uniform(*save_delay))
+                except Exception as e:
+                    stats["failed"] += 1
+                    log(f"[{worker}] task {task['id']} failed: {e.__class__.__name__}: {e}")
+                    q.fail_task(task, worker, f"{e.__class__.__name__}: {e}")
+                continue
+
+            job = q.lease_job(worker, lease_seconds)
+            if job is not None:
+                idle_since = time.monotonic()
+                log(f"[{worker}] job {job['id']} discover {job['blog_url']}")
+                try:
+                    with _Heartbeat(q, "crawl_jobs", job["id"], worker, lease_seconds, heartbeat_seconds):
+                        items = scraper.discover_post_items(
+                            job["blog_url"], date.fromisoformat(job["start_date"]),
+                            date.fromisoformat(job["end_date"]), log_cb=lambda m: log(f"[{worker}] {m}"),
+                        )
+                    q.add_tasks(job, worker, items)
+                    stats["jobs"] += 1
+                except Exception as e:
+                    log(f"[{worker}] job {job['id']} failed: {e.__class__.__name__}: {e}")
+                    q.fail_job(job, worker, f"{e.__class__.__name__}: {e}")
+                continue
+
+            if idle_exit is not None and time.monotonic() - idle_since >= idle_exit:
+                return stats
+            time.sleep(1.0)
+    finally:
+        if checker:
+            checker.close()
+        q.close()
+
+
+def _worker_main(path, idle_exit, lease_seconds, heartbeat_seconds, save_delay):
+    stats = run_worker(path, idle_exit=idle_exit, lease_seconds=lease_seconds,
+                       heartbeat_seconds=heartbeat_seconds, save_delay=save_delay)
+    print(f"[{os.getpid()}] done {stats}", flush=True)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Crawl work queue: enqueue blog jobs and run lease-based workers")
+    ap.add_argument("--queue", default=None,
+                    help=f"SQLite queue db (default: Postgres queue if STORAGE_URL is Postgres, else {QUEUE_PATH})")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    en = sub.add_parser("enqueue", help="add a crawl job per blog")
+    en.add_argument("--blog", action="append", required=True, help="blog url (repeatable)")
+    en.add_argument("--name", action="append", help="blog name, same order as --blog (default: from data.db)")
+    en.add_argument("--start", required=True, type=date.fromisoformat)
+    en.add_argument("--end", default=date.today(), type=date.fromisoformat)
+    wk = sub.add_parser("worker", help="run crawl workers on this host (a SQLite queue file must be on a local disk)")
+    wk.add_argument("--processes", type=int, default=1)
+    wk.add_argument("--idle-exit", type=float, default=None, help="일이 없으면 이 초 뒤 종료 (기본: 계속 대기)")
+    wk.add_argument("--lease", type=float, default=LEASE_SECONDS)
+    wk.add_argument("--heartbeat", type=float, default=HEARTBEAT_SECONDS)
+    wk.add_argument("--save-delay", type=float, nargs=2, default=SAVE_DELAY, metavar=("MIN", "MAX"))
+    sub.add_parser("status", help="job/task counts")
+    args = ap.parse_args(argv)
+
+    if args.cmd == "enqueue":
+        import storage
+        names = {b["url"]: b["name"] for b in storage.get_storage().load_blogs()}
+        for i, url in enumerate(args.blog):
+            name = args.name[i] if args.name and i < len(args.name) else names.get(url, url)
+            print(f"job {enqueue_job(name, url, args.start, args.end, args.queue)}: {name} {args.start}..{args.end}")
+    elif args.cmd == "worker":
+        worker_args = (args.queue, args.idle_exit, args.lease, args.heartbeat, tuple(args.save_delay))
+        if args.processes == 1:
+            _worker_main(*worker_args)
+            return
+        procs = [multiprocessing.Process(target=_worker_main, args=worker_args) for _ in range(args.processes)]
+        for p in procs:
+            p.start()
+        for p in procs:
+            p.join()
+    elif args.cmd == "status":
+        print(queue_stats(args.queue))
+
+
+if __name__ == "__main__":
+    main()